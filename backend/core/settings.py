@@ -7,16 +7,26 @@ import os  # <--- MOVIDO PARA O TOPO (Essencial para funcionar o Banco)
 
 from datetime import timedelta # Para configuração do Simple JWT
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# --- AMBIENTE ---
+# DJANGO_ENV=production liga o perfil de produção (gunicorn + nginx, ver
+# gunicorn.conf.py e docker-compose.prod.yml). Sem ele, tudo como em desenvolvimento.
+DJANGO_ENV = os.environ.get('DJANGO_ENV', 'development')
+PRODUCTION = DJANGO_ENV == 'production'
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-=@9j4+@sae*tkq=6g3_y#(%yluard)h3517u2sp_vcanteccp('
+SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-=@9j4+@sae*tkq=6g3_y#(%yluard)h3517u2sp_vcanteccp(')
+if PRODUCTION and SECRET_KEY.startswith('django-insecure-'):
+    raise ImproperlyConfigured('Defina SECRET_KEY no ambiente de produção.')
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('DEBUG', str(not PRODUCTION)) == 'True'
 
-ALLOWED_HOSTS = ['*']
+ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', '*').split(',')
 
 # Application definition
 INSTALLED_APPS = [
@@ -35,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Por fora de tudo: mede a requisição inteira (store/metrics.py)
+    'store.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware', # Deve ser o primeiro ou logo após Security
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -43,6 +55,10 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Rota para o slow-query log e ?_profile=1 para staff (store/profiling.py)
+    'store.profiling.ProfilingMiddleware',
+    # Requisições que escrevem leem do primário, mesmo com réplica configurada
+    'store.db_router.PrimaryForWritesMiddleware',
 ]
 
 ROOT_URLCONF = 'core.urls'
@@ -74,9 +90,48 @@ DATABASES = {
         'PASSWORD': os.environ.get('DB_PASSWORD', ''),
         'HOST': os.environ.get('DB_HOST', ''),
         'PORT': os.environ.get('DB_PORT', ''),
+        # Conexão reaproveitada entre requisições (segundos; 0 = uma por requisição).
+        # Cada thread de cada worker do gunicorn mantém a sua.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        # Testa a conexão reaproveitada antes de usar (o banco pode ter reiniciado)
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Pool de conexões do psycopg 3 (DB_POOL=True; precisa de psycopg[pool] instalado).
+# As conexões ficam no pool do processo e são compartilhadas pelas threads;
+# o Django exige CONN_MAX_AGE = 0 nesse modo.
+if os.environ.get('DB_POOL', 'False') == 'True':
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        },
+    }
+elif os.environ.get('SERVER_INTERFACE', 'wsgi') == 'asgi':
+    # No uvicorn as views síncronas rodam em threads do sync_to_async que não são
+    # reaproveitadas de forma previsível: conexões persistentes ficam presas a
+    # threads ociosas até esgotar o max_connections. Uma conexão por requisição,
+    # ou o pool (DB_POOL=True), que é o recomendado nesse modo.
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
+# Réplica de leitura (opcional): leituras do catálogo vão para ela (store/db_router.py)
+if os.environ.get('DB_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['DB_REPLICA_HOST'],
+        'PORT': os.environ.get('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        # Nos testes, a "réplica" é o próprio banco de teste
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['store.db_router.ReplicaRouter']
+
+# Segundos, depois de uma invalidação do cache de respostas, em que os cache misses
+# leem do primário (store/response_cache.py); cubra o atraso típico da réplica
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     { 'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator', },
@@ -93,27 +148,118 @@ USE_TZ = True
 
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = 'static/'
-# Se precisar rodar collectstatic no futuro:
-# STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# Destino do collectstatic; em produção o nginx serve essa pasta direto
+STATIC_ROOT = os.environ.get('STATIC_ROOT', os.path.join(BASE_DIR, 'staticfiles'))
+
+if PRODUCTION:
+    # Nomes com hash do conteúdo: o nginx pode mandar cache de 1 ano nos estáticos
+    STORAGES = {
+        'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.ManifestStaticFilesStorage'},
+    }
 
 # --- CONFIGURAÇÃO DE ARQUIVOS DE MÍDIA (FOTOS) ---
+# Em desenvolvimento o Django serve /media/ (core/urls.py); em produção, o nginx.
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
+# --- PRODUÇÃO ATRÁS DO PROXY (nginx) ---
+if PRODUCTION:
+    # O nginx termina o HTTPS e avisa pelo X-Forwarded-Proto
+    SECURE_PROXY_SSL_HEADER = ('HTTP_X_FORWARDED_PROTO', 'https')
+    USE_X_FORWARDED_HOST = True
+    CSRF_TRUSTED_ORIGINS = [origin for origin in os.environ.get('CSRF_TRUSTED_ORIGINS', '').split(',') if origin]
+    SESSION_COOKIE_SECURE = CSRF_COOKIE_SECURE = os.environ.get('SECURE_COOKIES', 'True') == 'True'
+
+# --- IMPORTAÇÃO DO CATÁLOGO (POST /api/products/import/) ---
+# Hosts de onde o endpoint pode baixar fotos (https), no formato do ALLOWED_HOSTS
+# (ex: "cdn.minhaloja.com.br,.cloudfront.net"). Vazio: nenhuma foto por URL.
+IMPORT_IMAGE_HOSTS = [host for host in os.environ.get('IMPORT_IMAGE_HOSTS', '').split(',') if host]
+
+# --- FILA DE TAREFAS (store.Task) ---
+# Consumida por `python manage.py run_worker`. Com True, as tarefas rodam na hora,
+# dentro da requisição (útil em desenvolvimento sem worker).
+TASKS_ALWAYS_EAGER = os.environ.get('TASKS_ALWAYS_EAGER', 'False') == 'True'
+
+# --- CACHE ---
+# Sem REDIS_URL: memória local (cada processo tem o seu; é o que os testes usam).
+# Com REDIS_URL (ex: redis://redis:6379/0): Redis compartilhado entre os workers,
+# pelo backend nativo do Django (precisa do pacote 'redis' instalado).
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Cache de respostas do catálogo (store/response_cache.py)
+RESPONSE_CACHE_ENABLED = os.environ.get('RESPONSE_CACHE_ENABLED', 'True') == 'True'
+RESPONSE_CACHE_ALIAS = 'default'
+RESPONSE_CACHE_TIMEOUT = int(os.environ.get('RESPONSE_CACHE_TIMEOUT', 300))
+
+# --- MÉTRICAS (/metrics, formato Prometheus; ver store/metrics.py) ---
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+# Pasta compartilhada pelos workers do gunicorn; sem ela, cada processo mostra só os seus números
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = int(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+# Quem pode ler sem login (ex: o Prometheus), IPs ou redes separados por vírgula; staff sempre pode
+METRICS_ALLOWED_IPS = [ip for ip in os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1').split(',') if ip]
+
+# --- PERFIL SOB DEMANDA E SLOW-QUERY LOG (ver store/profiling.py) ---
+# Queries a partir deste tempo vão para o logger 'store.slow_queries' (0 desliga)
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+# ?_profile=1 / X-Profile: 1, só para staff
+PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'True') == 'True'
+PROFILING_SAMPLE_INTERVAL = float(os.environ.get('PROFILING_SAMPLE_INTERVAL', 0.001))
+# Onde gravar os perfis (.folded / .prof / .json); vazio = só na resposta
+PROFILING_DIR = os.environ.get('PROFILING_DIR') or None
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '{asctime} {levelname} {name}: {message}', 'style': '{'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'loggers': {
+        'store': {'handlers': ['console'], 'level': os.environ.get('STORE_LOG_LEVEL', 'INFO')},
+    },
+}
+
+# --- ESTOQUE ---
+# Tempo (segundos) que o checkout segura o estoque de um pedido não pago
+STOCK_RESERVATION_TTL = int(os.environ.get('STOCK_RESERVATION_TTL', 15 * 60))
 
 # --- CONFIGURAÇÃO DO USUÁRIO PERSONALIZADO ---
 AUTH_USER_MODEL = 'store.User'
 
 # --- CONFIGURAÇÃO DE CORS ---
-CORS_ALLOW_ALL_ORIGINS = True 
+# Em produção, só as origens listadas (ex: CORS_ALLOWED_ORIGINS=https://loja.com.br)
+CORS_ALLOW_ALL_ORIGINS = not PRODUCTION
+CORS_ALLOWED_ORIGINS = [origin for origin in os.environ.get('CORS_ALLOWED_ORIGINS', '').split(',') if origin]
 
 # --- DRF ---
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWT do simplejwt, com o usuário + profile em cache (store/authentication.py)
+        'store.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
 }
 
+# Segundos que cada worker guarda o usuário autenticado (0 desliga o cache)
+AUTH_USER_CACHE_TTL = int(os.environ.get('AUTH_USER_CACHE_TTL', 60))
+
 # --- CONFIGURAÇÃO JWT ---
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),  # Aumentado para 60 minutos (padrão era 5)
@@ -0,0 +1,54 @@
+"""
+Configuração do gunicorn para produção: `gunicorn -c gunicorn.conf.py`.
+
+Tudo pode ser ajustado por variável de ambiente:
+  SERVER_INTERFACE  wsgi (padrão: core.wsgi, workers gthread) ou asgi (core.asgi, workers uvicorn)
+  WEB_CONCURRENCY   número de processos (padrão: 2 x núcleos + 1)
+  WEB_THREADS       threads por processo no modo wsgi (padrão: 4)
+  FORWARDED_ALLOW_IPS  de quem aceitar X-Forwarded-* (padrão: 127.0.0.1; em produção, o nginx)
+  PORT, GUNICORN_TIMEOUT, GUNICORN_MAX_REQUESTS
+"""
+import multiprocessing
+import os
+import shutil
+
+interface = os.environ.get('SERVER_INTERFACE', 'wsgi')
+
+if interface == 'asgi':
+    wsgi_app = 'core.asgi:application'
+    # Cada worker roda um event loop; as views síncronas vão para o pool de threads do Django
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'core.wsgi:application'
+    # Threads: enquanto uma requisição espera o banco, outra usa o processo
+    worker_class = 'gthread'
+    threads = int(os.environ.get('WEB_THREADS') or 4)
+
+bind = f"0.0.0.0:{os.environ.get('PORT') or 8000}"
+workers = int(os.environ.get('WEB_CONCURRENCY') or multiprocessing.cpu_count() * 2 + 1)
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT') or 30)
+graceful_timeout = 30
+# O nginx mantém conexões abertas com o gunicorn
+keepalive = 5
+
+# Recicla cada worker depois de N requisições (com jitter para não reiniciarem juntos):
+# segura vazamentos de memória e os índices em memória (busca, facetas) que crescem
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS') or 2000)
+max_requests_jitter = max_requests // 10
+
+# Heartbeat dos workers em memória, não no disco do container
+worker_tmp_dir = '/dev/shm'
+# Só o proxy pode dizer o IP e o esquema do cliente; '*' deixaria qualquer um forjar
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS') or '127.0.0.1'
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def on_starting(server):
+    # Snapshots de métricas da execução anterior (store/metrics.py) não somam com os novos
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Address, SiteSettings, Category, ProductAttribute, AttributeValue, Product, ProductImage, CustomRequest
+from .models import User, Address, SiteSettings, Category, ProductAttribute, AttributeValue, Product, ProductImage, CustomRequest, Task, StockItem, StockReservation
 
 # --- 1. CONFIGURAÇÃO DE USUÁRIO ---
 admin.site.register(User, UserAdmin)
@@ -38,13 +38,19 @@ class ProductImageInline(admin.TabularInline):
     model = ProductImage
     extra = 1
 
+class StockItemInline(admin.TabularInline):
+    model = StockItem
+    extra = 0
+    fields = ('options', 'sku', 'available', 'variant_key')
+    readonly_fields = ('variant_key',)
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin): # CORRIGIDO AQUI
     list_display = ('name', 'base_price', 'category', 'is_active', 'is_featured')
     list_filter = ('category', 'is_active', 'is_featured', 'created_at')
     search_fields = ('name', 'description')
     prepopulated_fields = {'slug': ('name',)}
-    inlines = [ProductImageInline]
+    inlines = [ProductImageInline, StockItemInline]
     filter_horizontal = ('attributes',)
 
 # --- 6. PEDIDOS PERSONALIZADOS ---
@@ -52,4 +58,20 @@ class ProductAdmin(admin.ModelAdmin): # CORRIGIDO AQUI
 class CustomRequestAdmin(admin.ModelAdmin): # CORRIGIDO AQUI
     list_display = ('user', 'status', 'created_at')
     list_filter = ('status', 'created_at')
-    readonly_fields = ('user', 'description', 'reference_image')
\ No newline at end of file
+    readonly_fields = ('user', 'description', 'reference_image')
+
+# --- 7. FILA DE TAREFAS ---
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_after', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'idempotency_key')
+    readonly_fields = ('created_at', 'finished_at', 'locked_at', 'last_error')
+
+# --- 8. RESERVAS DE ESTOQUE ---
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    list_display = ('id', 'order', 'stock_item', 'quantity', 'status', 'expires_at')
+    list_filter = ('status',)
+    raw_id_fields = ('order', 'stock_item')
+    readonly_fields = ('created_at',)
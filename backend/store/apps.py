@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class StoreConfig(AppConfig):
     name = 'store'
+
+    def ready(self):
+        # Registra os signals que mantêm os índices em memória (busca, autocomplete, facetas)
+        # e os que enfileiram as derivadas de imagem, devolvem o estoque reservado
+        # e atualizam o consolidado de vendas e o cache de respostas do catálogo;
+        # metrics e profiling instalam os execute_wrappers em cada conexão nova
+        from . import authentication, facets, images, inventory, metrics, profiling, response_cache, search, stats, suggest  # noqa: F401
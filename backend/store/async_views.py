@@ -0,0 +1,137 @@
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.views import View
+from django_filters.filterset import filterset_factory
+from django_filters.rest_framework import FilterSet
+from rest_framework import filters
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+
+from . import suggest
+from .conditional import acollection_version, aobject_version, conditional
+from .filters import ProductFilter
+from .models import CATEGORY_TREE_CACHE_KEY, Category, Product, SiteSettings
+from .pagination import AsyncProductCursorPagination
+from .response_cache import CATEGORIES, PRODUCT, PRODUCTS, SITE_SETTINGS, cached_response, json_response
+from .search import ProductSearchFilter
+from .serializers import ProductListSerializer, ProductSerializer, SiteSettingsSerializer, build_category_tree
+from .views import CategoryViewSet, ProductViewSet
+
+
+# --- LEITURAS DO CATÁLOGO ASSÍNCRONAS (/api/async/...) ---
+# Mesmas respostas das rotas do DRF (mesmos serializers, filtros, paginação,
+# cache e ETag), mas como views async: rodando no uvicorn (SERVER_INTERFACE=asgi),
+# cada worker atende muitas requisições enquanto elas esperam o banco. As
+# queries usam o ORM assíncrono (aiterator, aget, aaggregate); o que ainda é só
+# síncrono (índices em memória da busca/facetas/sugestões) roda via sync_to_async.
+# Os serializers só leem o que já veio do banco (select/prefetch_related).
+CategoryRootFilter = filterset_factory(Category, filterset=FilterSet, fields=CategoryViewSet.filterset_fields)
+
+
+class InvalidFilters(Exception):
+    def __init__(self, errors):
+        self.errors = errors
+
+
+def not_found():
+    return json_response({'detail': str(NotFound.default_detail)}, status=404)
+
+
+class AsyncCatalogView(View):
+    """Base: só leitura; o request chega às views como Request do DRF (query_params, URLs absolutas)."""
+    http_method_names = ['get', 'head', 'options']
+    lookup_field = 'pk'
+    lookup_url_kwarg = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            return await super().dispatch(Request(request), *args, **kwargs)
+        except InvalidFilters as e:
+            return json_response(e.errors, status=400)
+
+
+class ProductListView(AsyncCatalogView):
+    ordering_fields = ProductViewSet.ordering_fields
+    # A paginação por cursor procura o OrderingFilter aqui para respeitar ?ordering=
+    filter_backends = ProductViewSet.filter_backends
+    products = None
+
+    def filter_products(self, request):
+        # Filtros, ordenação e busca: monta o queryset (só toca no cache e nos índices em memória)
+        filterset = ProductFilter(request.query_params, queryset=Product.objects.for_listing(), request=request)
+        if not filterset.is_valid():
+            raise InvalidFilters(filterset.errors)
+        queryset = filters.OrderingFilter().filter_queryset(request, filterset.qs, self)
+        return ProductSearchFilter().filter_queryset(request, queryset, self)
+
+    async def get_products(self, request):
+        if self.products is None:
+            self.products = await sync_to_async(self.filter_products)(request)
+        return self.products
+
+    async def version(self, request):
+        return await acollection_version(await self.get_products(request))
+
+    @cached_response(PRODUCTS)
+    @conditional(lambda view, request, **kwargs: view.version(request))
+    async def get(self, request):
+        paginator = AsyncProductCursorPagination()
+        page = await paginator.apaginate_queryset(await self.get_products(request), request, self)
+        data = ProductListSerializer(page, many=True, context={'request': request}).data
+        return json_response(paginator.get_paginated_response(data).data)
+
+
+class ProductDetailView(AsyncCatalogView):
+    @cached_response(PRODUCT, per_object=True)
+    @conditional(lambda view, request, pk=None, **kwargs: aobject_version(Product.objects.all(), pk))
+    async def get(self, request, pk):
+        try:
+            product = await Product.objects.for_detail().aget(pk=pk)
+        except Product.DoesNotExist:
+            return not_found()
+        return json_response(ProductSerializer(product, context={'request': request}).data)
+
+
+class ProductSuggestView(AsyncCatalogView):
+    async def get(self, request):
+        index = await sync_to_async(suggest.get_index)()
+        return json_response(ProductViewSet.suggestion_results(index, request))
+
+
+class CategoryTreeView(AsyncCatalogView):
+    @cached_response(CATEGORIES)
+    @conditional(lambda view, request, **kwargs: acollection_version(Category.objects.all()))
+    async def get(self, request):
+        origin = CategoryViewSet.tree_origin(request)
+        trees = await cache.aget(CATEGORY_TREE_CACHE_KEY) or {}
+        tree = trees.get(origin)
+        if tree is None:
+            categories = [category async for category in Category.objects.order_by('path')]
+            tree = build_category_tree(categories, {'request': request})
+            await cache.aset(CATEGORY_TREE_CACHE_KEY, {**trees, origin: tree}, CategoryViewSet.TREE_CACHE_TIMEOUT)
+        if any(field in request.query_params for field in CategoryViewSet.filterset_fields):
+            filterset = CategoryRootFilter(request.query_params, queryset=Category.objects.filter(parent__isnull=True))
+            if not filterset.is_valid():
+                raise InvalidFilters(filterset.errors)
+            root_ids = {pk async for pk in filterset.qs.values_list('id', flat=True)}
+            tree = [node for node in tree if node['id'] in root_ids]
+        return json_response(tree)
+
+
+class SiteSettingsListView(AsyncCatalogView):
+    @cached_response(SITE_SETTINGS)
+    @conditional(lambda view, request, **kwargs: acollection_version(SiteSettings.objects.all()))
+    async def get(self, request):
+        site_settings = [item async for item in SiteSettings.objects.all()]
+        return json_response(SiteSettingsSerializer(site_settings, many=True, context={'request': request}).data)
+
+
+class SiteSettingsDetailView(AsyncCatalogView):
+    @cached_response(SITE_SETTINGS)
+    @conditional(lambda view, request, pk=None, **kwargs: aobject_version(SiteSettings.objects.all(), pk))
+    async def get(self, request, pk):
+        try:
+            site_settings = await SiteSettings.objects.aget(pk=pk)
+        except SiteSettings.DoesNotExist:
+            return not_found()
+        return json_response(SiteSettingsSerializer(site_settings, context={'request': request}).data)
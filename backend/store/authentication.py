@@ -0,0 +1,105 @@
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import Profile, User
+
+
+# --- AUTENTICAÇÃO JWT COM USUÁRIO EM CACHE ---
+# O JWTAuthentication padrão busca o User no banco a cada requisição, e as
+# views ainda fazem outra query para o user.profile. Aqui o usuário (já com o
+# profile, via select_related) fica num cache do próprio processo por
+# AUTH_USER_CACHE_TTL segundos: requisições seguidas do mesmo usuário não
+# custam nenhuma query de identidade. Salvar/apagar User ou Profile descarta a
+# entrada na hora neste processo; nos outros workers, vale no máximo o TTL.
+class UserCache:
+    MAX_ENTRIES = 10000
+
+    def __init__(self):
+        self.entries = {}
+        self.lock = threading.Lock()
+        # Muda a cada descarte: uma leitura do banco que começou antes não grava dado velho
+        self.generation = 0
+
+    # Chave sempre em texto: o simplejwt grava o user_id do token como string
+    def get(self, user_id):
+        entry = self.entries.get(str(user_id))
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        # Cópia: cada requisição pode alterar o seu usuário (ex: user.profile.save())
+        return copy.deepcopy(entry[1])
+
+    def set(self, user_id, user, generation):
+        ttl = getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+        if ttl <= 0:
+            return
+        with self.lock:
+            if generation != self.generation:
+                return
+            if len(self.entries) >= self.MAX_ENTRIES:
+                now = time.monotonic()
+                self.entries = {key: entry for key, entry in self.entries.items() if entry[0] >= now}
+                if len(self.entries) >= self.MAX_ENTRIES:
+                    self.entries.clear()
+            self.entries[str(user_id)] = (time.monotonic() + ttl, copy.deepcopy(user))
+
+    def discard(self, user_id):
+        with self.lock:
+            self.generation += 1
+            self.entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication com o usuário (e o profile) vindo do user_cache."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = user_cache.get(user_id)
+        if user is None:
+            generation = user_cache.generation
+            try:
+                user = User.objects.select_related('profile').get(**{api_settings.USER_ID_FIELD: user_id})
+            except User.DoesNotExist as e:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found") from e
+            user_cache.set(user_id, user, generation)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and (
+            validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password)
+        ):
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def discard_cached_user(sender, instance, **kwargs):
+    user_cache.discard(getattr(instance, api_settings.USER_ID_FIELD))
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def discard_cached_profile(sender, instance, **kwargs):
+    user_cache.discard(instance.user_id)
@@ -0,0 +1,4 @@
+from .runner import compare, percentile, run, summarize
+from .scenarios import SCENARIOS, Fixture
+
+__all__ = ['SCENARIOS', 'Fixture', 'compare', 'percentile', 'run', 'summarize']
@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+
+import requests
+
+
+# --- EXECUÇÃO E ESTATÍSTICAS ---
+# N workers (threads), cada um com a sua sessão HTTP (keep-alive, como um
+# navegador) repetindo o cenário por --iterations visitas ou --duration segundos.
+# Toda requisição vira uma amostra (rota, segundos, status); o resumo traz
+# p50/p95/p99 e req/s do cenário inteiro e de cada rota.
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class Client:
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.samples = []
+        self.recording = True
+        self.token = None
+
+    def request(self, endpoint, method, path, record=True, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, urljoin(self.base_url, path), timeout=self.timeout, **kwargs)
+            status = response.status_code
+        except requests.RequestException:
+            response, status = None, 0
+        if record and self.recording:
+            self.samples.append((endpoint, time.perf_counter() - start, status))
+        if response is None or status >= 400:
+            return None
+        return response.json() if response.content else {}
+
+    def get(self, endpoint, path, params=None):
+        return self.request(endpoint, 'GET', path, params=params)
+
+    def post(self, endpoint, path, data):
+        return self.request(endpoint, 'POST', path, json=data)
+
+    def login(self, username, password, record=True):
+        tokens = self.request('token_obtain_pair', 'POST', '/api/token/', record=record,
+                              json={'username': username, 'password': password})
+        self.token = tokens and tokens['access']
+        if self.token:
+            self.session.headers['Authorization'] = f'Bearer {self.token}'
+
+    def close(self):
+        self.session.close()
+
+
+def run(base_url, scenario, fixture, concurrency=8, iterations=50, duration=None, warmup=1, seed=0, timeout=10):
+    """Roda um cenário e devolve (amostras, segundos de relógio da fase medida)."""
+    clients = [Client(base_url, timeout) for _ in range(concurrency)]
+    clock = {}
+
+    def start_clock():
+        clock['started'] = time.perf_counter()
+        clock['deadline'] = clock['started'] + (duration or 0)
+
+    # Todos aquecem (conexões, caches do servidor) antes de o relógio começar
+    barrier = threading.Barrier(concurrency + 1, action=start_clock)
+
+    def worker(index):
+        client = clients[index]
+        rng = random.Random(f'{seed}:{index}')
+        try:
+            client.recording = False
+            for _ in range(warmup):
+                scenario(client, fixture, rng)
+            client.recording = True
+        except BaseException:
+            barrier.abort()
+            raise
+        barrier.wait()
+        done = 0
+        while (time.perf_counter() < clock['deadline']) if duration else (done < iterations):
+            scenario(client, fixture, rng)
+            done += 1
+        client.close()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(worker, index) for index in range(concurrency)]
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        # Repassa a exceção de um worker que falhou
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - clock['started']
+    return [sample for client in clients for sample in client.samples], elapsed
+
+
+def stats(latencies, errors, elapsed):
+    if not latencies:
+        return {'requests': 0, 'errors': 0, 'rps': 0.0, 'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'max_ms': None}
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2),
+    }
+
+
+def summarize(samples, elapsed):
+    """Resumo do cenário + um por rota. Erro = status >= 400 ou falha de conexão (status 0)."""
+    by_endpoint = {}
+    for endpoint, seconds, status in samples:
+        by_endpoint.setdefault(endpoint, []).append((seconds, status))
+    summary = stats(
+        [seconds for _, seconds, _ in samples],
+        sum(1 for _, _, status in samples if not 0 < status < 400),
+        elapsed,
+    )
+    summary['elapsed_s'] = round(elapsed, 3)
+    summary['endpoints'] = {
+        endpoint: stats(
+            [seconds for seconds, _ in rows], sum(1 for _, status in rows if not 0 < status < 400), elapsed
+        )
+        for endpoint, rows in sorted(by_endpoint.items())
+    }
+    return summary
+
+
+def compare(previous, current, metrics=('rps', 'p50_ms', 'p95_ms', 'p99_ms')):
+    """Diferença percentual por cenário entre dois resultados (o JSON do --output)."""
+    rows = []
+    for name, result in current['scenarios'].items():
+        before = previous.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        changes = {}
+        for metric in metrics:
+            old, new = before.get(metric), result.get(metric)
+            changes[metric] = round((new - old) / old * 100, 1) if old and new is not None else None
+        rows.append((name, changes))
+    return rows
@@ -0,0 +1,97 @@
+from dataclasses import dataclass
+
+from django.contrib.auth import get_user_model
+
+from store.models import Category, Product
+
+
+# --- CENÁRIOS DO BENCHMARK ---
+# Cada cenário é uma "visita" de um cliente: uma função (client, fixture, rng)
+# que faz algumas requisições pelo client (que mede cada uma pelo nome da rota).
+# O rng é por worker e vem do --seed: a mesma semente repete as mesmas visitas.
+@dataclass
+class Fixture:
+    """Dados reais do banco para montar as requisições (ids, slugs, termos de busca)."""
+    products: list
+    # Produtos sem estoque controlado: o checkout não depende de variação nem esgota
+    checkout_products: list
+    categories: list
+    terms: list
+    username: str
+    password: str
+
+    @classmethod
+    def from_database(cls, username, password, create_user=True, limit=500):
+        products = Product.objects.filter(is_active=True).order_by('id')
+        names = products.values_list('name', flat=True)[:limit]
+        terms = sorted({word.lower() for name in names for word in name.split() if len(word) >= 4})
+        if create_user:
+            user, created = get_user_model().objects.get_or_create(
+                username=username, defaults={'email': f'{username}@bench.local'}
+            )
+            if created or not user.check_password(password):
+                user.set_password(password)
+                user.save()
+        return cls(
+            products=list(products.values_list('id', flat=True)[:limit]),
+            checkout_products=list(
+                products.filter(stock_items__isnull=True).values_list('id', flat=True)[:limit]
+            ),
+            categories=list(Category.objects.filter(parent__isnull=True).values_list('slug', flat=True)),
+            terms=terms,
+            username=username,
+            password=password,
+        )
+
+
+def browse(client, fixture, rng):
+    """Vitrine: home, árvore de categorias, uma categoria (2 páginas) e um produto."""
+    client.get('product-list', '/api/products/')
+    client.get('category-list', '/api/categories/')
+    if fixture.categories:
+        page = client.get('product-list', '/api/products/', {'category_tree': rng.choice(fixture.categories)})
+        if page and page.get('next'):
+            client.get('product-list', page['next'])
+    if fixture.products:
+        client.get('product-detail', f'/api/products/{rng.choice(fixture.products)}/')
+
+
+def search(client, fixture, rng):
+    if fixture.terms:
+        client.get('product-list', '/api/products/', {'search': rng.choice(fixture.terms)})
+
+
+def autocomplete(client, fixture, rng):
+    """O usuário digitando: uma requisição por letra, a partir da segunda."""
+    if fixture.terms:
+        term = rng.choice(fixture.terms)
+        for size in range(2, min(len(term), 6) + 1):
+            client.get('product-suggest', '/api/products/suggest/', {'q': term[:size]})
+
+
+def login(client, fixture, rng):
+    client.login(fixture.username, fixture.password)
+
+
+def checkout(client, fixture, rng):
+    """Produto -> pedido -> "meus pedidos", autenticado (o login fica fora, uma vez por worker)."""
+    if not fixture.checkout_products:
+        return
+    if not client.token:
+        client.login(fixture.username, fixture.password, record=False)
+    chosen = rng.sample(fixture.checkout_products, min(len(fixture.checkout_products), rng.randint(1, 3)))
+    client.get('product-detail', f'/api/products/{chosen[0]}/')
+    client.post('order-list', '/api/orders/', {
+        'address': 'Rua do Benchmark, 1',
+        'items_data': [{'product_id': pk, 'quantity': rng.randint(1, 2)} for pk in chosen],
+    })
+    client.get('order-list', '/api/orders/')
+
+
+SCENARIOS = {
+    'browse': browse,
+    'search': search,
+    'autocomplete': autocomplete,
+    'login': login,
+    'checkout': checkout,
+}
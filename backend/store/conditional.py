@@ -0,0 +1,127 @@
+import hashlib
+import inspect
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+
+# --- REQUISIÇÕES CONDICIONAIS (ETag / Last-Modified) ---
+# Antes de montar a resposta, uma query barata (um aggregate ou um values_list
+# pelo pk) descobre a versão do recurso a partir do updated_at. Se o cliente já
+# tem essa versão (If-None-Match / If-Modified-Since), devolve 304 sem
+# serializar nada. O cache de respostas guarda os validadores junto com os
+# dados: num HIT o 304 sai sem query nenhuma.
+VALIDATOR_HEADERS = ('ETag', 'Last-Modified')
+
+
+def collection_version(queryset):
+    """Versão de uma listagem: updated_at mais recente + quantidade (pega as exclusões)."""
+    return collection_marker(queryset.order_by().aggregate(last_modified=Max('updated_at'), count=Count('pk')))
+
+
+async def acollection_version(queryset):
+    return collection_marker(await queryset.order_by().aaggregate(last_modified=Max('updated_at'), count=Count('pk')))
+
+
+def collection_marker(row):
+    marker = f"{row['last_modified'].isoformat() if row['last_modified'] else '-'}:{row['count']}"
+    return row['last_modified'], marker
+
+
+def object_version(queryset, pk):
+    """Versão de um registro, ou None se não existe (a view segue e responde o 404)."""
+    try:
+        return object_marker(queryset.filter(pk=pk).values_list('updated_at', flat=True).first())
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+async def aobject_version(queryset, pk):
+    try:
+        return object_marker(await queryset.filter(pk=pk).values_list('updated_at', flat=True).afirst())
+    except (ValueError, TypeError, ValidationError):
+        return None
+
+
+def object_marker(last_modified):
+    if last_modified is None:
+        return None
+    return last_modified, last_modified.isoformat()
+
+
+def make_etag(request, marker):
+    """ETag fraco: a mesma versão em outro host/URL/query string é outra representação."""
+    query = sorted((name, value) for name in request.GET for value in request.GET.getlist(name))
+    raw = '|'.join([request.get_host(), request.path, repr(query), marker])
+    return f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+def conditional(version):
+    """
+    Decorator para list/retrieve de um ViewSet, aplicado por dentro do
+    cached_response (só roda quando a resposta não está em cache). version(view, request, **kwargs) devolve
+    (updated_at, marcador) ou None quando não há como validar. Numa view
+    assíncrona, version também é assíncrona (acollection_version, aobject_version).
+    """
+    def validators(request, current):
+        last_modified, marker = current
+        return make_etag(request, marker), int(last_modified.timestamp()) if last_modified else None
+
+    def decorator(method):
+        if inspect.iscoroutinefunction(method):
+            @wraps(method)
+            async def async_wrapper(self, request, *args, **kwargs):
+                if request.method not in ('GET', 'HEAD'):
+                    return await method(self, request, *args, **kwargs)
+                current = await version(self, request, **kwargs)
+                if current is None:
+                    return await method(self, request, *args, **kwargs)
+                etag, timestamp = validators(request, current)
+                response = not_modified(request, etag, timestamp)
+                if response is None:
+                    response = await method(self, request, *args, **kwargs)
+                    if response.status_code == 200:
+                        set_validators(response, etag, timestamp)
+                return response
+            return async_wrapper
+
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return method(self, request, *args, **kwargs)
+            current = version(self, request, **kwargs)
+            if current is None:
+                return method(self, request, *args, **kwargs)
+            etag, timestamp = validators(request, current)
+            response = not_modified(request, etag, timestamp)
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code == 200:
+                    set_validators(response, etag, timestamp)
+            return response
+        return wrapper
+    return decorator
+
+
+def not_modified(request, etag, timestamp):
+    """Um 304 (já com os validadores) se o cliente tem essa versão; senão None."""
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        set_validators(response, etag, timestamp)
+    return response
+
+
+def not_modified_from_headers(request, headers):
+    """Igual ao not_modified, a partir dos cabeçalhos guardados com uma resposta em cache."""
+    if not headers:
+        return None
+    return not_modified(request, headers.get('ETag'), parse_http_date_safe(headers.get('Last-Modified')))
+
+
+def set_validators(response, etag, timestamp):
+    response['ETag'] = etag
+    if timestamp is not None:
+        response['Last-Modified'] = http_date(timestamp)
@@ -0,0 +1,76 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+# --- RÉPLICA DE LEITURA ---
+# Ativado quando DB_REPLICA_HOST está definido (ver DATABASES em core/settings.py).
+# Só leituras "seguras" do catálogo vão para a réplica: produtos, categorias,
+# atributos, fotos e configurações do site, que toleram alguns segundos de atraso.
+# Pedidos, estoque, usuários e tudo mais continuam no primário. Dentro de uma
+# transação ou de uma requisição que escreve (POST/PUT/PATCH/DELETE), tudo vai
+# para o primário, para quem acabou de gravar ler o que gravou.
+REPLICA_DB_ALIAS = 'replica'
+CATALOG_MODELS = {'sitesettings', 'category', 'productattribute', 'attributevalue', 'product', 'productimage'}
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_primary = ContextVar('use_primary', default=False)
+
+
+@contextmanager
+def use_primary():
+    """Bloco em que todas as leituras vão para o primário."""
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label != 'store' or model._meta.model_name not in CATALOG_MODELS:
+            return None
+        if _use_primary.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Explícito: sem isso, um objeto lido da réplica seria salvo nela
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mesmo banco, duas conexões
+        return {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # A réplica recebe o schema pela replicação do Postgres
+        return db != REPLICA_DB_ALIAS
+
+
+class PrimaryForWritesMiddleware:
+    """Requisições que escrevem leem só do primário, do começo ao fim. Síncrono ou assíncrono."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.method in SAFE_METHODS:
+            return self.get_response(request)
+        with use_primary():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if request.method in SAFE_METHODS:
+            return await self.get_response(request)
+        # O ContextVar segue para as threads do sync_to_async (ORM, views síncronas)
+        with use_primary():
+            return await self.get_response(request)
@@ -0,0 +1,132 @@
+import csv
+import json
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import OrderItem, Product
+
+
+# --- EXPORTAÇÃO EM STREAMING (CSV / JSONL) ---
+# Cada linha sai do banco via iterator(chunk_size=...) já com os JOINs feitos
+# (values_list + relações), sem instanciar modelos nem fazer query por linha.
+# No Postgres o iterator usa cursor no servidor: a memória fica constante.
+CHUNK_SIZE = 2000
+FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+ORDER_COLUMNS = (
+    ('order_id', 'order_id'),
+    ('created_at', 'order__created_at'),
+    ('status', 'order__status'),
+    ('customer_email', 'order__customer__email'),
+    ('guest_name', 'order__guest_name'),
+    ('guest_email', 'order__guest_email'),
+    ('order_total', 'order__total'),
+    ('item_id', 'id'),
+    ('product_id', 'product_id'),
+    ('product_name', 'product__name'),
+    ('product_slug', 'product__slug'),
+    ('category', 'product__category__name'),
+    ('quantity', 'quantity'),
+    ('unit_price', 'price'),
+)
+
+PRODUCT_COLUMNS = (
+    ('id', 'id'),
+    ('name', 'name'),
+    ('slug', 'slug'),
+    ('category', 'category__name'),
+    ('base_price', 'base_price'),
+    ('promotional_price', 'promotional_price'),
+    ('is_active', 'is_active'),
+    ('is_featured', 'is_featured'),
+    ('created_at', 'created_at'),
+)
+
+
+def cell(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+# Texto que o Excel/LibreOffice executaria como fórmula (ex: um nome "=HYPERLINK(...)")
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def csv_cell(value):
+    """cell() para CSV: texto com cara de fórmula ganha um ' na frente e abre como texto."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return cell(value)
+
+
+def order_rows(orders):
+    """Uma linha por item de pedido, com os dados do pedido e do produto repetidos."""
+    items = OrderItem.objects.filter(order__in=orders.values('pk')).order_by('order_id', 'id')
+    return items.values_list(*(path for _, path in ORDER_COLUMNS)).iterator(chunk_size=CHUNK_SIZE)
+
+
+def product_rows(products=None):
+    products = Product.objects.all() if products is None else products
+    return products.order_by('id').values_list(*(path for _, path in PRODUCT_COLUMNS)).iterator(chunk_size=CHUNK_SIZE)
+
+
+class Echo:
+    """'Arquivo' cujo write devolve a linha, para o csv.writer alimentar um gerador."""
+    def write(self, value):
+        return value
+
+
+def render(columns, rows, export_format):
+    """Gera o arquivo linha a linha (str)."""
+    header = [name for name, _ in columns]
+    if export_format == 'jsonl':
+        for row in rows:
+            yield json.dumps(dict(zip(header, map(cell, row))), ensure_ascii=False) + '\n'
+        return
+    writer = csv.writer(Echo())
+    # BOM: o Excel só reconhece o CSV como UTF-8 com ele
+    yield '\ufeff' + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([csv_cell(value) for value in row])
+
+
+def write(out, columns, rows, export_format):
+    """Grava num arquivo aberto (usado pelos comandos export_*). Devolve quantas linhas de dados saíram."""
+    count = -1 if export_format == 'csv' else 0
+    for line in render(columns, rows, export_format):
+        out.write(line)
+        count += 1
+    return count
+
+
+async def iterate_async(lines):
+    """
+    Sob ASGI o Django consumiria um gerador síncrono inteiro (sync_to_async(list))
+    antes de mandar o primeiro byte. Aqui ele é puxado aos lotes, sempre na mesma
+    thread (thread_sensitive), que é a dona do cursor do banco.
+    """
+    take = sync_to_async(lambda: ''.join(islice(lines, CHUNK_SIZE)))
+    while chunk := await take():
+        yield chunk
+
+
+def streaming_response(columns, rows, export_format, filename, request=None):
+    content = render(columns, rows, export_format)
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        content = iterate_async(content)
+    response = StreamingHttpResponse(content, content_type=FORMATS[export_format])
+    stamp = timezone.localdate().strftime('%Y%m%d')
+    response['Content-Disposition'] = f'attachment; filename="{filename}-{stamp}.{export_format}"'
+    return response
@@ -0,0 +1,235 @@
+import logging
+import threading
+import time
+
+from django.db import connections
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import AttributeValue, Product, ProductAttribute
+
+logger = logging.getLogger(__name__)
+
+
+# Modos de combinação dos valores escolhidos em ?attributes=
+MATCH_FACET = 'facet'  # OU dentro do mesmo atributo, E entre atributos (padrão)
+MATCH_ALL = 'all'      # todos os valores
+MATCH_ANY = 'any'      # qualquer valor
+MATCH_MODES = (MATCH_FACET, MATCH_ALL, MATCH_ANY)
+
+
+def to_bitmap(product_ids):
+    """Conjunto de ids como um int onde o bit N indica o produto N."""
+    ids = list(product_ids)
+    if not ids:
+        return 0
+    bits = bytearray(max(ids) // 8 + 1)
+    for pk in ids:
+        bits[pk >> 3] |= 1 << (pk & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def parse_selection(raw):
+    """'3,7' ou ['3', '7'] -> [3, 7], ignorando lixo."""
+    if isinstance(raw, str):
+        raw = [raw]
+    ids = []
+    for chunk in raw:
+        for part in chunk.split(','):
+            part = part.strip()
+            if part.isdigit():
+                ids.append(int(part))
+    return ids
+
+
+# --- ÍNDICE DE FACETAS ---
+class FacetIndex:
+    """
+    Um bitmap de produtos por AttributeValue. Contar "quantos produtos Ouro 18k
+    existem no resultado atual" vira um AND de bitmaps + bit_count(), sem GROUP BY.
+    """
+    MAX_AGE = 300
+
+    def __init__(self):
+        self.values = {}
+        self.bitmaps = {}
+        self.built_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def build(cls):
+        index = cls()
+        for value in AttributeValue.objects.select_related('attribute').order_by('attribute__name', 'value'):
+            index.values[value.id] = {
+                'attribute_id': value.attribute_id,
+                'attribute_slug': value.attribute.slug,
+                'attribute_name': value.attribute.name,
+                'value': value.value,
+            }
+        postings = {value_id: [] for value_id in index.values}
+        through = Product.attributes.through.objects.values_list('attributevalue_id', 'product_id')
+        for value_id, product_id in through.iterator():
+            postings.setdefault(value_id, []).append(product_id)
+        index.bitmaps = {value_id: to_bitmap(ids) for value_id, ids in postings.items()}
+        return index
+
+    def is_stale(self):
+        return time.monotonic() - self.built_at > self.MAX_AGE
+
+    def add(self, product_id, value_ids):
+        with self.lock:
+            for value_id in value_ids:
+                self.bitmaps[value_id] = self.bitmaps.get(value_id, 0) | (1 << product_id)
+
+    def remove(self, product_id, value_ids=None):
+        mask = ~(1 << product_id)
+        with self.lock:
+            for value_id in (self.bitmaps if value_ids is None else value_ids):
+                if value_id in self.bitmaps:
+                    self.bitmaps[value_id] &= mask
+
+    def group(self, value_ids, match=MATCH_FACET):
+        """Agrupa a seleção: o resultado é um E entre grupos de OUs."""
+        value_ids = [value_id for value_id in dict.fromkeys(value_ids) if value_id in self.values]
+        if not value_ids:
+            return []
+        if match == MATCH_ALL:
+            return [[value_id] for value_id in value_ids]
+        if match == MATCH_ANY:
+            return [value_ids]
+        groups = {}
+        for value_id in value_ids:
+            groups.setdefault(self.values[value_id]['attribute_id'], []).append(value_id)
+        return list(groups.values())
+
+    def _union(self, value_ids):
+        bitmap = 0
+        for value_id in value_ids:
+            bitmap |= self.bitmaps.get(value_id, 0)
+        return bitmap
+
+    def counts(self, base_ids, selected=(), match=MATCH_FACET):
+        """
+        Contagem por valor dentro de base_ids (o resultado sem o filtro de atributos).
+        No modo 'facet' a contagem de um atributo ignora a seleção do próprio
+        atributo, para que marcar "Ouro 18k" não zere "Prata 925".
+        """
+        base = to_bitmap(base_ids)
+        with self.lock:
+            groups = self.group(selected, match)
+            group_bitmaps = [(group, self._union(group)) for group in groups]
+
+            facets = {}
+            for value_id, meta in self.values.items():
+                bitmap = base
+                for group, group_bitmap in group_bitmaps:
+                    own_group = match == MATCH_FACET and self.values[group[0]]['attribute_id'] == meta['attribute_id']
+                    if not own_group:
+                        bitmap &= group_bitmap
+                count = (bitmap & self.bitmaps.get(value_id, 0)).bit_count()
+                facet = facets.setdefault(meta['attribute_id'], {
+                    'attribute': meta['attribute_slug'],
+                    'name': meta['attribute_name'],
+                    'values': [],
+                })
+                facet['values'].append({
+                    'id': value_id,
+                    'value': meta['value'],
+                    'count': count,
+                    'selected': value_id in selected,
+                })
+        return list(facets.values())
+
+
+_index = None
+_index_lock = threading.Lock()
+_rebuild = None
+# Alterações vindas dos signals (ver suggest.py): descartam a reconstrução em andamento
+_changes = 0
+
+
+def get_index():
+    """Só a primeira consulta espera o build; um índice velho é servido enquanto uma thread monta o novo."""
+    global _index
+    index = _index
+    if index is None:
+        with _index_lock:
+            if _index is None:
+                _index = FacetIndex.build()
+            return _index
+    if index.is_stale():
+        start_rebuild()
+    return index
+
+
+def start_rebuild():
+    global _rebuild
+    with _index_lock:
+        if _rebuild is not None and _rebuild.is_alive():
+            return
+        _rebuild = threading.Thread(target=rebuild, args=(_changes,), name='store-facet-index', daemon=True)
+        _rebuild.start()
+
+
+def rebuild(changes):
+    global _index
+    try:
+        index = FacetIndex.build()
+        with _index_lock:
+            if _index is None:
+                return
+            if changes == _changes:
+                _index = index
+            else:
+                _index.built_at = time.monotonic()
+    except Exception:
+        logger.exception('Falha ao reconstruir o índice de facetas; o atual continua em uso')
+        with _index_lock:
+            if _index is not None:
+                _index.built_at = time.monotonic()
+    finally:
+        connections.close_all()
+
+
+def reset_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def mark_changed():
+    global _changes
+    with _index_lock:
+        _changes += 1
+
+
+@receiver(m2m_changed, sender=Product.attributes.through)
+def refresh_product_facets(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    mark_changed()
+    if _index is None:
+        return
+    if reverse or action == 'post_clear':
+        # Mudança pelo lado do AttributeValue ou clear(): mais simples reconstruir
+        reset_index()
+    elif action == 'post_add':
+        _index.add(instance.pk, pk_set)
+    elif action == 'post_remove':
+        _index.remove(instance.pk, pk_set)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    mark_changed()
+    if _index is not None:
+        _index.remove(instance.pk)
+
+
+@receiver(post_save, sender=AttributeValue)
+@receiver(post_delete, sender=AttributeValue)
+@receiver(post_save, sender=ProductAttribute)
+@receiver(post_delete, sender=ProductAttribute)
+def reset_on_attribute_change(sender, **kwargs):
+    mark_changed()
+    reset_index()
@@ -0,0 +1,80 @@
+import django_filters
+from django.db.models import Q
+
+from . import facets
+from .models import Category, Order, Product
+from .stats import day_bounds
+
+
+# --- FILTROS DE PRODUTOS ---
+class ProductFilter(django_filters.FilterSet):
+    # /products/?category_tree=aneis traz Anéis e todas as subcategorias
+    category_tree = django_filters.CharFilter(method='filter_category_tree')
+    # /products/?attributes=3,7&attributes_match=facet (ver store/facets.py)
+    attributes = django_filters.CharFilter(method='filter_attributes')
+    attributes_match = django_filters.ChoiceFilter(
+        choices=[(mode, mode) for mode in facets.MATCH_MODES],
+        method='filter_attributes_match',
+    )
+
+    class Meta:
+        model = Product
+        fields = {
+            'category__slug': ['exact'],
+            'promotional_price': ['isnull', 'lt', 'gt'],
+            'base_price': ['lt', 'gt'],
+            'attributes__value': ['exact'],
+        }
+
+    def filter_category_tree(self, queryset, name, value):
+        category_ids = Category.descendant_ids_by_slug().get(value)
+        if not category_ids:
+            return queryset.none()
+        return queryset.filter(category_id__in=category_ids)
+
+    def filter_attributes(self, queryset, name, value):
+        raw = self.data.getlist(name) if hasattr(self.data, 'getlist') else value
+        match = self.data.get('attributes_match') or facets.MATCH_FACET
+        groups = facets.get_index().group(facets.parse_selection(raw), match)
+        through = Product.attributes.through.objects
+        # Um subquery indexado por grupo: E entre grupos, OU dentro de cada um
+        for group in groups:
+            queryset = queryset.filter(
+                pk__in=through.filter(attributevalue_id__in=group).values('product_id')
+            )
+        return queryset
+
+    def filter_attributes_match(self, queryset, name, value):
+        # Só modifica o comportamento de filter_attributes
+        return queryset
+
+
+# --- FILTROS DE PEDIDOS (ADMIN) ---
+class OrderFilter(django_filters.FilterSet):
+    # /orders/?created_after=2026-01-01&created_before=2026-01-31 (datas inclusivas, no fuso da loja).
+    # Vira faixa de created_at em vez de DATE(created_at), para o índice ser usado.
+    created_after = django_filters.DateFilter(method='filter_created_after')
+    created_before = django_filters.DateFilter(method='filter_created_before')
+    guest_email = django_filters.CharFilter(field_name='guest_email', lookup_expr='iexact')
+    # "123" / "#123" busca pelo número do pedido; o resto, por email ou nome do cliente
+    search = django_filters.CharFilter(method='filter_search')
+
+    class Meta:
+        model = Order
+        fields = ['status', 'customer']
+
+    def filter_created_after(self, queryset, name, value):
+        return queryset.filter(created_at__gte=day_bounds(value)[0])
+
+    def filter_created_before(self, queryset, name, value):
+        return queryset.filter(created_at__lt=day_bounds(value)[1])
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip().lstrip('#')
+        if not value:
+            return queryset
+        if value.isdigit():
+            return queryset.filter(pk=int(value))
+        return queryset.filter(
+            Q(guest_email__icontains=value) | Q(customer__email__icontains=value) | Q(guest_name__icontains=value)
+        )
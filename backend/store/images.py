@@ -0,0 +1,137 @@
+import os
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps
+
+from .models import Category, ProductImage
+from .tasks import enqueue, task
+
+
+# --- DERIVADAS DE IMAGEM (THUMBNAILS / RESPONSIVO) ---
+DERIVATIVE_WIDTHS = (200, 600, 1200)
+THUMBNAIL_WIDTH = DERIVATIVE_WIDTHS[0]
+DERIVATIVE_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def derivative_name(source_name, width, extension):
+    """
+    products/anel.jpg -> products/derivatives/anel-jpg-200.webp. A extensão do
+    original entra no nome: anel.jpg e anel.png não podem disputar as mesmas derivadas.
+    """
+    folder, filename = os.path.split(source_name)
+    stem, source_extension = os.path.splitext(filename)
+    if source_extension:
+        stem = f'{stem}-{source_extension[1:].lower()}'
+    return os.path.join(folder, 'derivatives', f'{stem}-{width}.{extension}')
+
+
+def generate_derivatives(field_file):
+    """
+    Gera as versões redimensionadas de um ImageField com o Pillow e grava no
+    mesmo storage. Nunca amplia: larguras maiores que o original são puladas
+    (a menor é sempre gerada). Devolve o mapa salvo no campo *_derivatives.
+    """
+    storage = field_file.storage
+    with field_file.open('rb') as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+
+    widths = [w for w in DERIVATIVE_WIDTHS if w <= original.width] or [THUMBNAIL_WIDTH]
+    result = {'source': field_file.name, 'widths': {}}
+    for width in widths:
+        resized = original.copy()
+        resized.thumbnail((width, width * 4), Image.Resampling.LANCZOS)
+        result['widths'][str(width)] = {}
+        for extension, options in DERIVATIVE_FORMATS.items():
+            image = resized
+            if options['format'] == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            buffer = BytesIO()
+            image.save(buffer, **options)
+            name = derivative_name(field_file.name, width, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            result['widths'][str(width)][extension] = storage.save(name, ContentFile(buffer.getvalue()))
+    return result
+
+
+def needs_derivatives(field_file, derivatives):
+    return bool(field_file) and (derivatives or {}).get('source') != field_file.name
+
+
+def derivative_url(field_file, derivatives, width=THUMBNAIL_WIDTH, extension='jpeg'):
+    """URL de uma derivada, caindo para o original enquanto ela não existe."""
+    if not field_file:
+        return None
+    if not needs_derivatives(field_file, derivatives):
+        name = derivatives['widths'].get(str(width), {}).get(extension)
+        if name:
+            return field_file.storage.url(name)
+    return field_file.url
+
+
+def srcset(field_file, derivatives, build_uri=None):
+    """
+    Mapa no estilo srcset: {"webp": "url 200w, url 600w", "jpeg": "..."}.
+    Vazio enquanto as derivadas não foram geradas (o front usa a imagem original).
+    """
+    if not field_file or needs_derivatives(field_file, derivatives):
+        return {}
+    build_uri = build_uri or (lambda url: url)
+    result = {}
+    for extension in DERIVATIVE_FORMATS:
+        entries = [
+            f"{build_uri(field_file.storage.url(formats[extension]))} {width}w"
+            for width, formats in sorted(derivatives['widths'].items(), key=lambda item: int(item[0]))
+            if extension in formats
+        ]
+        result[extension] = ', '.join(entries)
+    return result
+
+
+# --- PROCESSAMENTO FORA DA REQUISIÇÃO ---
+@task(max_attempts=3)
+def process_model_image(model, pk, image_field, derivatives_field):
+    """
+    Gera as derivadas e grava com save(update_fields=...): o post_save invalida
+    caches (árvore de categorias, autocomplete) e não reagenda, pois a origem
+    já confere com o campo. Idempotente: sai cedo se já estiver feito.
+    """
+    instance = apps.get_model(model).objects.filter(pk=pk).first()
+    if instance is None:
+        return
+    field_file = getattr(instance, image_field)
+    if not needs_derivatives(field_file, getattr(instance, derivatives_field)):
+        return
+    setattr(instance, derivatives_field, generate_derivatives(field_file))
+    instance.save(update_fields=[derivatives_field])
+
+
+def schedule_derivatives(instance, image_field, derivatives_field):
+    """Enfileira a geração na fila de tarefas (executada pelo run_worker)."""
+    field_file = getattr(instance, image_field)
+    if not needs_derivatives(field_file, getattr(instance, derivatives_field)):
+        return
+    label = instance._meta.label
+    enqueue(
+        process_model_image,
+        key=f'derivatives:{label}:{instance.pk}:{field_file.name}',
+        model=label, pk=instance.pk, image_field=image_field, derivatives_field=derivatives_field,
+    )
+
+
+@receiver(post_save, sender=Category)
+def generate_category_image_derivatives(sender, instance, **kwargs):
+    schedule_derivatives(instance, 'image', 'image_derivatives')
+
+
+@receiver(post_save, sender=ProductImage)
+def generate_product_image_derivatives(sender, instance, **kwargs):
+    schedule_derivatives(instance, 'image', 'derivatives')
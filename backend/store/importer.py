@@ -0,0 +1,352 @@
+import csv
+import io
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.http.request import validate_host
+from django.db import transaction
+from django.utils.text import slugify
+from PIL import Image
+
+from . import facets, images, response_cache, search, suggest
+from .models import AttributeValue, Category, Product, ProductAttribute, ProductImage, touch
+
+
+# --- IMPORTAÇÃO EM LOTE DO CATÁLOGO (CSV / JSONL) ---
+# Colunas / chaves aceitas:
+#   name, slug (opcional: vem do nome), description, base_price, promotional_price,
+#   category ("Anéis > Solitários"), is_active, is_featured,
+#   attributes ("Material=Ouro 18k; Aro=16" ou, no JSONL, {"Material": ["Ouro 18k"]}),
+#   images ("https://...jpg | fotos/anel.jpg" ou lista no JSONL; a primeira vira capa).
+#     Caminhos locais só no import_products, dentro do --image-root; no endpoint HTTP,
+#     só URLs https dos hosts em IMPORT_IMAGE_HOSTS. Tudo passa pelo Pillow antes de gravar.
+# O produto é identificado pelo slug: linha com slug existente atualiza o produto.
+BATCH_SIZE = 1000
+IMAGE_WORKERS = 8
+IMAGE_TIMEOUT = 10
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+# Formato detectado pelo Pillow -> extensão gravada (a do arquivo/URL não vale)
+IMAGE_FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'WEBP': '.webp', 'GIF': '.gif'}
+MAX_REPORTED_ERRORS = 100
+PRODUCT_UPDATE_FIELDS = ['name', 'description', 'base_price', 'promotional_price', 'category', 'is_active', 'is_featured']
+TRUE_VALUES = {'1', 'true', 'sim', 'yes', 's', 'y'}
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+FORMATS = ('csv', 'jsonl')
+
+
+def read_rows(stream, import_format):
+    """
+    Linhas do arquivo, uma por vez (o arquivo nunca é carregado inteiro):
+    dicts no CSV, texto no JSONL (decodificado em run(), onde o erro vira erro da linha).
+    """
+    if import_format == 'jsonl':
+        yield from stream
+        return
+    yield from csv.DictReader(stream)
+
+
+def guess_format(filename, default='csv'):
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    return extension if extension in FORMATS else default
+
+
+def text_stream(uploaded_file):
+    """Arquivo enviado (bytes) -> texto, aceitando o BOM que o Excel coloca."""
+    return io.TextIOWrapper(getattr(uploaded_file, 'file', uploaded_file), encoding='utf-8-sig', newline='')
+
+
+def parse_decimal(value, field, required=False):
+    if value in (None, ''):
+        if required:
+            raise ImportRowError(f'{field} é obrigatório')
+        return None
+    try:
+        return Decimal(str(value).replace(',', '.')).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ImportRowError(f'{field} inválido: {value!r}')
+
+
+def parse_bool(value, default):
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def parse_attributes(value):
+    """'Material=Ouro 18k; Aro=16, 18' ou {"Material": "Ouro 18k"} -> [(atributo, valor), ...]"""
+    if not value:
+        return []
+    if isinstance(value, dict):
+        items = value.items()
+    else:
+        items = []
+        for chunk in str(value).split(';'):
+            if chunk.strip():
+                if '=' not in chunk:
+                    raise ImportRowError(f'atributo sem "=": {chunk.strip()!r}')
+                name, values = chunk.split('=', 1)
+                items.append((name, values.split(',')))
+    pairs = []
+    for name, values in items:
+        for value in ([values] if isinstance(values, str) else values):
+            if str(value).strip():
+                pairs.append((name.strip(), str(value).strip()))
+    return pairs
+
+
+def parse_images(value):
+    if not value:
+        return []
+    sources = value if isinstance(value, list) else str(value).split('|')
+    return [source.strip() for source in sources if source.strip()]
+
+
+def parse_row(raw):
+    name = (raw.get('name') or '').strip()
+    if not name:
+        raise ImportRowError('name é obrigatório')
+    category = (raw.get('category') or '').strip()
+    if not category:
+        raise ImportRowError('category é obrigatório')
+    slug = slugify(raw.get('slug') or name)
+    if not slug:
+        raise ImportRowError(f'não dá para gerar slug de {name!r}')
+    return {
+        'name': name,
+        'slug': slug,
+        'description': raw.get('description') or '',
+        'base_price': parse_decimal(raw.get('base_price'), 'base_price', required=True),
+        'promotional_price': parse_decimal(raw.get('promotional_price'), 'promotional_price'),
+        'category': tuple(part.strip() for part in category.split('>') if part.strip()),
+        'is_active': parse_bool(raw.get('is_active'), True),
+        'is_featured': parse_bool(raw.get('is_featured'), False),
+        # None = coluna ausente: mantém os atributos que o produto já tem
+        'attributes': parse_attributes(raw['attributes']) if 'attributes' in raw else None,
+        'images': parse_images(raw.get('images')),
+    }
+
+
+class ProductImporter:
+    """
+    Upsert do catálogo em lotes. Por lote: categorias e atributos novos são
+    criados uma vez (ficam em cache), os produtos vão num único
+    bulk_create(update_conflicts=True) pelo slug, os vínculos com atributos
+    num bulk_create da tabela M2M, e as fotos são baixadas/lidas em paralelo.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE, image_workers=IMAGE_WORKERS, image_root=None, image_hosts=None):
+        self.batch_size = batch_size
+        self.image_workers = image_workers
+        # Fotos por caminho só dentro desta pasta (None = só URLs; é o caso do endpoint HTTP)
+        self.image_root = os.path.realpath(image_root) if image_root else None
+        # Hosts aceitos nas URLs das fotos, no formato do ALLOWED_HOSTS (None = qualquer um)
+        self.image_hosts = image_hosts
+        self.categories = {}
+        self.attributes = {attribute.name.lower(): attribute for attribute in ProductAttribute.objects.all()}
+        self.values = {
+            (value.attribute_id, value.value.lower()): value.id
+            for value in AttributeValue.objects.all()
+        }
+        self.result = {'created': 0, 'updated': 0, 'images': 0, 'errors': [], 'error_count': 0}
+
+    def error(self, line, message):
+        self.result['error_count'] += 1
+        if len(self.result['errors']) < MAX_REPORTED_ERRORS:
+            self.result['errors'].append({'line': line, 'error': message})
+
+    def run(self, rows):
+        batch = []
+        for line, raw in enumerate(rows, start=1):
+            try:
+                if isinstance(raw, str):
+                    if not raw.strip():
+                        continue
+                    raw = json.loads(raw)
+                batch.append((line, parse_row(raw)))
+            except (ValueError, AttributeError, TypeError) as e:
+                self.error(line, str(e))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+        # bulk_create não dispara signals: os índices em memória são refeitos no próximo acesso
+        for index in (search, suggest, facets):
+            index.reset_index()
+        response_cache.invalidate(response_cache.PRODUCTS, response_cache.PRODUCT, response_cache.CATEGORIES)
+        return self.result
+
+    # --- Categorias e atributos (poucos, criados sob demanda e mantidos em cache) ---
+    def category_for(self, names):
+        if names in self.categories:
+            return self.categories[names]
+        parent = self.category_for(names[:-1]) if len(names) > 1 else None
+        category = Category.objects.filter(parent=parent, name__iexact=names[-1]).first()
+        if category is None:
+            # save() individual: mantém o path materializado da árvore
+            base = slug = slugify(' '.join(names))
+            suffix = 2
+            while Category.objects.filter(slug=slug).exists():
+                slug = f'{base}-{suffix}'
+                suffix += 1
+            category = Category.objects.create(name=names[-1], slug=slug, parent=parent)
+        self.categories[names] = category
+        return category
+
+    def value_ids_for(self, pairs):
+        # Atributo novo com slug já existente ("Matéria" x "Materia") reaproveita o existente
+        missing = {name.lower(): slugify(name) for name, _ in pairs if name.lower() not in self.attributes}
+        if missing:
+            names = {slug: name for name, _ in pairs for slug in [slugify(name)] if name.lower() in missing}
+            ProductAttribute.objects.bulk_create(
+                [ProductAttribute(name=name, slug=slug) for slug, name in names.items()], ignore_conflicts=True,
+            )
+            by_slug = {attribute.slug: attribute for attribute in ProductAttribute.objects.filter(slug__in=names)}
+            for lower, slug in missing.items():
+                self.attributes[lower] = by_slug[slug]
+
+        missing_values = {}
+        for name, value in pairs:
+            key = (self.attributes[name.lower()].id, value.lower())
+            if key not in self.values:
+                missing_values[key] = AttributeValue(attribute=self.attributes[name.lower()], value=value)
+        if missing_values:
+            for value in AttributeValue.objects.bulk_create(missing_values.values()):
+                if value.pk is None:
+                    value = AttributeValue.objects.filter(attribute=value.attribute, value=value.value).first()
+                self.values[(value.attribute_id, value.value.lower())] = value.id
+        return [self.values[(self.attributes[name.lower()].id, value.lower())] for name, value in pairs]
+
+    # --- Lote de produtos ---
+    def import_batch(self, batch):
+        # Slug repetido dentro do lote: vale a última linha
+        by_slug = {}
+        for line, record in batch:
+            by_slug[record['slug']] = (line, record)
+
+        products = []
+        for slug, (line, record) in list(by_slug.items()):
+            try:
+                category = self.category_for(record['category'])
+            except Exception as e:
+                self.error(line, f'categoria: {e}')
+                del by_slug[slug]
+                continue
+            products.append(Product(
+                slug=slug, category=category,
+                **{field: record[field] for field in PRODUCT_UPDATE_FIELDS if field != 'category'},
+            ))
+        if not products:
+            return
+
+        with transaction.atomic():
+            existing = set(Product.objects.filter(slug__in=by_slug).values_list('slug', flat=True))
+            Product.objects.bulk_create(
+                products, batch_size=self.batch_size,
+                update_conflicts=True, unique_fields=['slug'], update_fields=PRODUCT_UPDATE_FIELDS + ['updated_at'],
+            )
+            ids = dict(Product.objects.filter(slug__in=by_slug).values_list('slug', 'id'))
+            Product.objects.filter(pk__in=ids.values()).update_search_vector()
+
+            through = Product.attributes.through
+            with_attributes = {slug: record for slug, (_, record) in by_slug.items() if record['attributes'] is not None}
+            if with_attributes:
+                through.objects.filter(product_id__in=[ids[slug] for slug in with_attributes]).delete()
+                links = []
+                for slug, record in with_attributes.items():
+                    for value_id in dict.fromkeys(self.value_ids_for(record['attributes'])):
+                        links.append(through(product_id=ids[slug], attributevalue_id=value_id))
+                through.objects.bulk_create(links, batch_size=self.batch_size, ignore_conflicts=True)
+
+        self.result['created'] += len(ids.keys() - existing)
+        self.result['updated'] += len(existing)
+        self.import_images(by_slug, ids)
+
+    # --- Fotos: download/leitura e gravação no storage em paralelo ---
+    def fetch_image(self, source):
+        url = urlparse(source)
+        if url.scheme:
+            return self.download_image(url, source)
+        if self.image_root is None:
+            raise ImportRowError('caminho local não é aceito aqui; use uma URL https')
+        path = os.path.realpath(os.path.join(self.image_root, source))
+        # realpath resolve '..' e links: o arquivo tem de estar dentro da pasta das fotos
+        if os.path.commonpath([path, self.image_root]) != self.image_root:
+            raise ImportRowError('caminho fora da pasta das fotos')
+        with open(path, 'rb') as f:
+            return f.read(MAX_IMAGE_BYTES + 1)
+
+    def download_image(self, url, source):
+        restricted = self.image_hosts is not None
+        if url.scheme not in (('https',) if restricted else ('http', 'https')):
+            raise ImportRowError(f'esquema {url.scheme!r} não é aceito')
+        if restricted and not (url.hostname and validate_host(url.hostname, self.image_hosts)):
+            raise ImportRowError(f'host {url.hostname!r} fora de IMPORT_IMAGE_HOSTS')
+        # Sem seguir redirects quando os hosts são restritos: o destino poderia ser interno
+        with requests.get(source, timeout=IMAGE_TIMEOUT, stream=True, allow_redirects=not restricted) as response:
+            response.raise_for_status()
+            content = response.raw.read(MAX_IMAGE_BYTES + 1, decode_content=True)
+        return content
+
+    def store_image(self, slug, position, source):
+        content = self.fetch_image(source)
+        if len(content) > MAX_IMAGE_BYTES:
+            raise ImportRowError(f'imagem maior que {MAX_IMAGE_BYTES // (1024 * 1024)} MB')
+        try:
+            with Image.open(io.BytesIO(content)) as image:
+                image_format = image.format
+                image.verify()
+        except Exception:
+            raise ImportRowError('o arquivo não é uma imagem válida')
+        if image_format not in IMAGE_FORMATS:
+            raise ImportRowError(f'formato {image_format} não é aceito')
+        name = f'{slug}-{position + 1}{IMAGE_FORMATS[image_format]}'
+        return ProductImage.image.field.storage.save(
+            ProductImage.image.field.generate_filename(None, name), ContentFile(content),
+        )
+
+    def import_images(self, by_slug, ids):
+        # Só produtos ainda sem foto: reimportar o mesmo arquivo não duplica as imagens
+        with_photos = set(ProductImage.objects.filter(product_id__in=ids.values()).values_list('product_id', flat=True))
+        jobs = [
+            (line, ids[slug], slug, position, source)
+            for slug, (line, record) in by_slug.items() if ids[slug] not in with_photos
+            for position, source in enumerate(record['images'])
+        ]
+        if not jobs:
+            return
+
+        created = []
+        with ThreadPoolExecutor(max_workers=self.image_workers) as pool:
+            futures = [(job, pool.submit(self.store_image, *job[2:])) for job in jobs]
+            for (line, product_id, _, _, source), future in futures:
+                try:
+                    name = future.result()
+                except Exception as e:
+                    self.error(line, f'imagem {source}: {e}')
+                    continue
+                # Capa: a primeira foto que deu certo
+                is_cover = not created or created[-1].product_id != product_id
+                created.append(ProductImage(product_id=product_id, image=name, is_cover=is_cover))
+
+        created = ProductImage.objects.bulk_create(created, batch_size=self.batch_size)
+        self.result['images'] += len(created)
+        # Foto nova muda o produto (ETag/Last-Modified); o bulk_create não passa pelo signal
+        touch(Product.objects.filter(pk__in={product_image.product_id for product_image in created}))
+        # bulk_create não dispara o post_save que agenda as miniaturas
+        for product_image in created:
+            if product_image.pk:
+                images.schedule_derivatives(product_image, 'image', 'derivatives')
@@ -0,0 +1,199 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import AttributeValue, Order, StockItem, StockReservation
+from .tasks import enqueue, task
+
+
+# --- ESTOQUE E RESERVAS ---
+class InsufficientStock(Exception):
+    """Uma ou mais variações não têm quantidade suficiente. 'shortages' = {stock_item_id: disponível}."""
+
+    def __init__(self, shortages):
+        self.shortages = shortages
+        super().__init__(f'Estoque insuficiente: {shortages}')
+
+
+class UnknownVariant(Exception):
+    """O produto tem estoque controlado, mas não existe a combinação pedida."""
+
+
+def reservation_ttl():
+    return timedelta(seconds=getattr(settings, 'STOCK_RESERVATION_TTL', 15 * 60))
+
+
+def resolve(lines):
+    """
+    Mapeia as linhas do carrinho [(product_id, option_ids, quantidade), ...]
+    para o StockItem de cada uma, em três queries no total. Produtos sem
+    nenhum StockItem não têm estoque controlado e ficam com None.
+
+    Das opções enviadas, valem só as de atributos que variam o estoque do
+    produto (a loja manda todos os atributos escolhidos, inclusive os que não
+    mudam o estoque, como o material). Sem opção nenhuma, um produto com uma
+    variação só fica com ela.
+    """
+    product_ids = {product_id for product_id, _, _ in lines}
+    variants = defaultdict(dict)
+    stock = StockItem.objects.filter(product_id__in=product_ids).order_by('-id')
+    for pk, product_id, key in stock.values_list('id', 'product_id', 'variant_key'):
+        # Chave repetida: vale a mais antiga
+        variants[product_id][key] = pk
+
+    # Atributos que formam as variações de cada produto (ex: Aro) e atributo de cada opção enviada
+    dimensions = defaultdict(set)
+    through = StockItem.options.through.objects.filter(stockitem__product_id__in=variants)
+    for product_id, attribute_id in through.values_list('stockitem__product_id', 'attributevalue__attribute_id'):
+        dimensions[product_id].add(attribute_id)
+    sent = {option_id for _, option_ids, _ in lines for option_id in option_ids or ()}
+    attribute_of = dict(AttributeValue.objects.filter(pk__in=sent).values_list('id', 'attribute_id')) if sent else {}
+
+    resolved = []
+    for product_id, option_ids, _ in lines:
+        if product_id not in variants:
+            resolved.append(None)
+            continue
+        key = StockItem.make_variant_key(
+            option_id for option_id in option_ids or () if attribute_of.get(option_id) in dimensions[product_id]
+        )
+        if key in variants[product_id]:
+            resolved.append(variants[product_id][key])
+        elif not key and len(variants[product_id]) == 1:
+            resolved.append(next(iter(variants[product_id].values())))
+        else:
+            raise UnknownVariant(product_id)
+    return resolved
+
+
+def _take(stock_item_id, quantity):
+    """Baixa atômica: UPDATE ... SET available = available - n WHERE available >= n."""
+    return StockItem.objects.filter(pk=stock_item_id, available__gte=quantity).update(available=F('available') - quantity) == 1
+
+
+def _give_back(reservations):
+    """
+    Devolve ao estoque, uma reserva de cada vez. O UPDATE condicional no status
+    garante que uma reserva disputada (cancelamento x expiração) volta uma vez só.
+    """
+    released = 0
+    for reservation in reservations:
+        claimed = StockReservation.objects.filter(
+            pk=reservation.pk, status=reservation.status,
+        ).update(status=StockReservation.STATUS_RELEASED)
+        if claimed:
+            StockItem.objects.filter(pk=reservation.stock_item_id).update(available=F('available') + reservation.quantity)
+            released += 1
+    return released
+
+
+def reserve(order, quantities):
+    """
+    Reserva {stock_item_id: quantidade} para o pedido. Roda dentro da transação
+    do checkout: se faltar qualquer item, levanta InsufficientStock e o rollback
+    desfaz as baixas já feitas. As linhas são travadas sempre na mesma ordem
+    (por id) para dois checkouts concorrentes não se travarem mutuamente.
+    """
+    if not quantities:
+        return []
+    shortages = {}
+    for stock_item_id in sorted(quantities):
+        quantity = quantities[stock_item_id]
+        if _take(stock_item_id, quantity):
+            continue
+        # Antes de recusar, devolve reservas vencidas desse item e tenta de novo
+        if release_expired(stock_item_ids=[stock_item_id]) and _take(stock_item_id, quantity):
+            continue
+        shortages[stock_item_id] = StockItem.objects.filter(pk=stock_item_id).values_list('available', flat=True).first() or 0
+    if shortages:
+        raise InsufficientStock(shortages)
+
+    expires_at = timezone.now() + reservation_ttl()
+    reservations = StockReservation.objects.bulk_create([
+        StockReservation(order=order, stock_item_id=stock_item_id, quantity=quantity, expires_at=expires_at)
+        for stock_item_id, quantity in quantities.items()
+    ])
+    # Passado o prazo, o worker devolve o que ainda não foi pago
+    enqueue(expire_order_reservations, key=f'reservations:{order.pk}', delay=reservation_ttl(), order_id=order.pk)
+    return reservations
+
+
+def release(order):
+    """Devolve tudo que o pedido segura (reservado ou já confirmado). Usado no cancelamento."""
+    with transaction.atomic():
+        return _give_back(order.reservations.exclude(status=StockReservation.STATUS_RELEASED))
+
+
+def release_expired(stock_item_ids=None, order_id=None, now=None):
+    """Devolve as reservas ativas vencidas (todas, ou só as dos itens / do pedido informados)."""
+    expired = StockReservation.objects.filter(status=StockReservation.STATUS_ACTIVE, expires_at__lte=now or timezone.now())
+    if stock_item_ids is not None:
+        expired = expired.filter(stock_item_id__in=stock_item_ids)
+    if order_id is not None:
+        expired = expired.filter(order_id=order_id)
+    with transaction.atomic():
+        return _give_back(expired.order_by('stock_item_id', 'id'))
+
+
+def commit(order):
+    """
+    Pedido pago: as reservas ativas viram definitivas. Se alguma já tinha
+    expirado e sido devolvida, tenta reservar de novo; sem estoque, InsufficientStock.
+    """
+    with transaction.atomic():
+        order.reservations.filter(status=StockReservation.STATUS_ACTIVE).update(status=StockReservation.STATUS_COMMITTED)
+        expired = list(order.reservations.filter(status=StockReservation.STATUS_RELEASED).order_by('stock_item_id'))
+        shortages = {r.stock_item_id: r.quantity for r in expired if not _take(r.stock_item_id, r.quantity)}
+        if shortages:
+            raise InsufficientStock(shortages)
+        StockReservation.objects.filter(pk__in=[r.pk for r in expired]).update(status=StockReservation.STATUS_COMMITTED)
+
+
+@task(max_attempts=3)
+def expire_order_reservations(order_id):
+    release_expired(order_id=order_id)
+
+
+# Status em que a mercadoria já é do cliente: as reservas valem para sempre
+COMMITTED_STATUSES = ('paid', 'shipped', 'delivered')
+
+
+@receiver(post_save, sender=Order)
+def sync_reservations_with_status(sender, instance, created, **kwargs):
+    """
+    Entrar em qualquer status confirmado (inclusive pulando direto de 'pending'
+    para 'shipped') confirma as reservas; 'canceled' devolve o estoque.
+    commit() pode levantar InsufficientStock: quem muda o status roda o save numa
+    transação e trata o erro (ver OrderSerializer.update).
+    """
+    previous = getattr(instance, '_db_status', None)
+    if not created and previous != instance.status:
+        if instance.status == 'canceled':
+            release(instance)
+        elif instance.status in COMMITTED_STATUSES and previous not in COMMITTED_STATUSES:
+            commit(instance)
+    # Só depois: se o commit falhar, o status antigo continua sendo o do banco
+    instance._db_status = instance.status
+
+
+@receiver(pre_delete, sender=Order)
+def release_on_delete(sender, instance, **kwargs):
+    # O CASCADE apagaria as reservas sem devolver o estoque que elas seguram
+    release(instance)
+
+
+@receiver(m2m_changed, sender=StockItem.options.through)
+def refresh_variant_key(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    stock_items = StockItem.objects.filter(pk__in=pk_set or ()) if reverse else [instance]
+    for stock_item in stock_items:
+        key = StockItem.make_variant_key(stock_item.options.values_list('id', flat=True))
+        StockItem.objects.filter(pk=stock_item.pk).update(variant_key=key)
+        stock_item.variant_key = key
@@ -0,0 +1,117 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.bench import SCENARIOS, Fixture, compare, run, summarize
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Carga HTTP num servidor local (runserver, gunicorn, uvicorn) com cenários repetíveis '
+        '(vitrine, busca, autocomplete, login, checkout): p50/p95/p99 e req/s por cenário e por rota. '
+        'Os dados das requisições vêm deste banco, que deve ser o mesmo do servidor. '
+        'O checkout cria pedidos de verdade para o usuário do benchmark.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Servidor (padrão: http://127.0.0.1:8000)')
+        parser.add_argument('--scenario', action='append', choices=list(SCENARIOS), dest='scenarios',
+                            help='Cenário a rodar; repita para vários (padrão: todos)')
+        parser.add_argument('--concurrency', type=int, default=8, help='Clientes simultâneos (padrão: 8)')
+        parser.add_argument('--iterations', type=int, default=50, help='Visitas por cliente (padrão: 50)')
+        parser.add_argument('--duration', type=float, help='Segundos por cenário (no lugar de --iterations)')
+        parser.add_argument('--warmup', type=int, default=1, help='Visitas de aquecimento por cliente, fora da medição')
+        parser.add_argument('--seed', type=int, default=0, help='Semente das escolhas aleatórias (padrão: 0)')
+        parser.add_argument('--timeout', type=float, default=10, help='Timeout de cada requisição, em segundos')
+        parser.add_argument('--username', default='bench', help='Usuário do login e do checkout (padrão: bench)')
+        parser.add_argument('--password', default='bench')
+        parser.add_argument('--no-create-user', action='store_false', dest='create_user',
+                            help='Não cria o usuário do benchmark neste banco')
+        parser.add_argument('--output', help='Grava o resultado em JSON (para comparar entre commits)')
+        parser.add_argument('--compare', help='JSON de uma rodada anterior para comparar')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency deve ser pelo menos 1.')
+        previous = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    previous = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Não foi possível ler {options['compare']}: {e}")
+
+        fixture = Fixture.from_database(options['username'], options['password'], create_user=options['create_user'])
+        if not fixture.products:
+            raise CommandError('Sem produtos para as requisições: rode `manage.py seed_db` antes.')
+
+        names = options['scenarios'] or list(SCENARIOS)
+        self.stdout.write(
+            f"{options['url']}, {options['concurrency']} clientes x "
+            + (f"{options['duration']:g}s" if options['duration'] else f"{options['iterations']} visitas")
+        )
+        self.stdout.write(f"{'cenário / rota':<30}{'req':>8}{'erros':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+
+        results = {}
+        for name in names:
+            samples, elapsed = run(
+                options['url'], SCENARIOS[name], fixture,
+                concurrency=options['concurrency'], iterations=options['iterations'],
+                duration=options['duration'], warmup=options['warmup'],
+                seed=options['seed'], timeout=options['timeout'],
+            )
+            results[name] = summarize(samples, elapsed)
+            self.write_row(name, results[name])
+            for endpoint, endpoint_stats in results[name]['endpoints'].items():
+                self.write_row(f'  {endpoint}', endpoint_stats)
+
+        report = {
+            'meta': {
+                'url': options['url'],
+                'commit': current_commit(),
+                'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                **{key: options[key] for key in ('concurrency', 'iterations', 'duration', 'warmup', 'seed')},
+            },
+            'scenarios': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            self.stdout.write(f"Resultado gravado em {options['output']}")
+        if previous:
+            self.write_comparison(previous, report)
+
+    def write_row(self, label, row):
+        if not row['requests']:
+            self.stdout.write(f"{label:<30}{0:>8}")
+            return
+        line = (
+            f"{label:<30}{row['requests']:>8}{row['errors']:>8}"
+            f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['rps']:>10.1f}"
+        )
+        self.stdout.write(self.style.ERROR(line) if row['errors'] else line)
+
+    def write_comparison(self, previous, report):
+        meta = previous.get('meta', {})
+        self.stdout.write(f"\nDiferença para {meta.get('commit') or meta.get('started_at') or 'a rodada anterior'} (%)")
+        self.stdout.write(f"{'cenário':<30}{'req/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for name, changes in compare(previous, report):
+            cells = ''.join(
+                f"{'-' if changes[metric] is None else f'{changes[metric]:+.1f}':>10}"
+                for metric in ('rps', 'p50_ms', 'p95_ms', 'p99_ms')
+            )
+            self.stdout.write(f'{name:<30}{cells}')
+
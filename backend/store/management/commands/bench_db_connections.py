@@ -0,0 +1,80 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connections
+
+from store.bench import percentile
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Compara a latência de "requisições" do catálogo sob carga concorrente com '
+        'uma conexão nova por requisição x conexão persistente (CONN_MAX_AGE) ou pool'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Requisições simultâneas (padrão: 8)')
+        parser.add_argument('--requests', type=int, default=200, help='Requisições por thread (padrão: 200)')
+        parser.add_argument('--database', default='default', help='Alias do banco (padrão: default)')
+        parser.add_argument('--max-age', type=int, default=60,
+                            help='CONN_MAX_AGE do modo persistente (padrão: 60)')
+        parser.add_argument('--page-size', type=int, default=24, help='Produtos lidos por requisição')
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if alias not in connections.settings:
+            raise CommandError(f'Banco "{alias}" não está em DATABASES.')
+        if not Product.objects.using(alias).exists():
+            raise CommandError('Sem produtos para ler: rode `manage.py seed_db` antes.')
+
+        settings_dict = connections.settings[alias]
+        pool = settings_dict.get('OPTIONS', {}).get('pool')
+        modes = [('conexão por requisição', {'CONN_MAX_AGE': 0}, None)]
+        if pool:
+            modes.append(('pool do psycopg', {'CONN_MAX_AGE': 0}, pool))
+        else:
+            modes.append((f"CONN_MAX_AGE={options['max_age']}", {'CONN_MAX_AGE': options['max_age']}, None))
+
+        self.stdout.write(
+            f"{connections[alias].vendor}, {options['threads']} threads x {options['requests']} requisições"
+        )
+        self.stdout.write(f"{'modo':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+        original = {key: settings_dict.get(key) for key in ('CONN_MAX_AGE', 'OPTIONS')}
+        try:
+            for label, overrides, mode_pool in modes:
+                # As threads do pool compartilham o mesmo settings_dict do alias
+                settings_dict.update(overrides)
+                settings_dict['OPTIONS'] = {**original['OPTIONS'], 'pool': mode_pool} if mode_pool else {
+                    key: value for key, value in (original['OPTIONS'] or {}).items() if key != 'pool'
+                }
+                latencies, elapsed = self.run_mode(alias, options)
+                self.stdout.write(
+                    f'{label:<26}'
+                    f'{percentile(latencies, 0.50) * 1000:>10.2f}'
+                    f'{percentile(latencies, 0.95) * 1000:>10.2f}'
+                    f'{percentile(latencies, 0.99) * 1000:>10.2f}'
+                    f'{len(latencies) / elapsed:>10.0f}'
+                )
+        finally:
+            settings_dict.update(original)
+
+    def run_mode(self, alias, options):
+        def worker():
+            latencies = []
+            for _ in range(options['requests']):
+                # Como o Django faz em request_started / request_finished
+                start = time.perf_counter()
+                close_old_connections()
+                list(Product.objects.using(alias).for_listing()[:options['page_size']])
+                close_old_connections()
+                latencies.append(time.perf_counter() - start)
+            connections.close_all()
+            return latencies
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            futures = [pool.submit(worker) for _ in range(options['threads'])]
+            latencies = [value for future in futures for value in future.result()]
+        return latencies, time.perf_counter() - started
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from store import exports
+from store.filters import OrderFilter
+from store.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Exporta os pedidos (uma linha por item) em CSV ou JSONL, em streaming'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(exports.FORMATS), default='csv')
+        parser.add_argument('--output', help='Arquivo de saída (padrão: stdout)')
+        parser.add_argument('--status', help='Só pedidos neste status (ex: paid)')
+        parser.add_argument('--since', help='Criados a partir de AAAA-MM-DD')
+        parser.add_argument('--until', help='Criados até AAAA-MM-DD (inclusive)')
+
+    def handle(self, *args, **options):
+        params = {
+            'status': options['status'],
+            'created_after': options['since'],
+            'created_before': options['until'],
+        }
+        filterset = OrderFilter({k: v for k, v in params.items() if v}, queryset=Order.objects.all())
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+
+        rows = exports.order_rows(filterset.qs)
+        if not options['output']:
+            self.stdout.ending = ''
+            exports.write(self.stdout, exports.ORDER_COLUMNS, rows, options['format'])
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as out:
+            count = exports.write(out, exports.ORDER_COLUMNS, rows, options['format'])
+        self.stderr.write(self.style.SUCCESS(f"{count} item(ns) de pedido gravado(s) em {options['output']}."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from store import exports
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Exporta o catálogo de produtos em CSV ou JSONL, em streaming'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(exports.FORMATS), default='csv')
+        parser.add_argument('--output', help='Arquivo de saída (padrão: stdout)')
+        parser.add_argument('--active-only', action='store_true', help='Só produtos ativos')
+
+    def handle(self, *args, **options):
+        products = Product.objects.all()
+        if options['active_only']:
+            products = products.filter(is_active=True)
+
+        rows = exports.product_rows(products)
+        if not options['output']:
+            self.stdout.ending = ''
+            exports.write(self.stdout, exports.PRODUCT_COLUMNS, rows, options['format'])
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as out:
+            count = exports.write(out, exports.PRODUCT_COLUMNS, rows, options['format'])
+        self.stderr.write(self.style.SUCCESS(f"{count} produto(s) gravado(s) em {options['output']}."))
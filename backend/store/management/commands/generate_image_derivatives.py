@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from store.db_router import use_primary
+from store.images import generate_derivatives, needs_derivatives
+from store.models import Category, ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Gera (ou regenera) as miniaturas/derivadas das fotos de produtos e categorias'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regera mesmo as que já existem')
+
+    # Comando que grava: lê do primário, não da réplica (que pode estar atrasada)
+    @use_primary()
+    def handle(self, *args, **options):
+        targets = [
+            (ProductImage.objects.all(), 'image', 'derivatives'),
+            (Category.objects.all(), 'image', 'image_derivatives'),
+        ]
+        done = failed = 0
+        for queryset, image_field, derivatives_field in targets:
+            for instance in queryset.iterator():
+                field_file = getattr(instance, image_field)
+                if not field_file:
+                    continue
+                if not options['force'] and not needs_derivatives(field_file, getattr(instance, derivatives_field)):
+                    continue
+                try:
+                    setattr(instance, derivatives_field, generate_derivatives(field_file))
+                    instance.save(update_fields=[derivatives_field])
+                    done += 1
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.ERROR(f'Erro em {instance}: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(f'{done} imagem(ns) processada(s), {failed} com erro.'))
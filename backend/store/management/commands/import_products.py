@@ -0,0 +1,38 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from store.db_router import use_primary
+from store.importer import BATCH_SIZE, FORMATS, IMAGE_WORKERS, ProductImporter, guess_format, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Importa/atualiza produtos em lote a partir de um CSV ou JSONL (ver store/importer.py)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Arquivo .csv ou .jsonl')
+        parser.add_argument('--format', choices=FORMATS, help='Padrão: pela extensão do arquivo')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--image-workers', type=int, default=IMAGE_WORKERS, help='Downloads/leituras de fotos em paralelo')
+        parser.add_argument('--image-root', help='Pasta base das fotos com caminho relativo (padrão: a pasta do arquivo)')
+
+    # Comando que grava: lê do primário, não da réplica (que pode estar atrasada)
+    @use_primary()
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'Arquivo não encontrado: {path}')
+        importer = ProductImporter(
+            batch_size=options['batch_size'],
+            image_workers=options['image_workers'],
+            image_root=options['image_root'] or os.path.dirname(os.path.abspath(path)),
+        )
+        with open(path, encoding='utf-8-sig', newline='') as stream:
+            result = importer.run(read_rows(stream, options['format'] or guess_format(path)))
+
+        for error in result['errors']:
+            self.stdout.write(self.style.ERROR(f"Linha {error['line']}: {error['error']}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['created']} produto(s) criado(s), {result['updated']} atualizado(s), "
+            f"{result['images']} foto(s), {result['error_count']} erro(s)."
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from store.db_router import use_primary
+from store.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Recalcula do zero o consolidado diário de vendas (DailySales) a partir dos pedidos'
+
+    # Comando que grava: lê do primário, não da réplica (que pode estar atrasada)
+    @use_primary()
+    def handle(self, *args, **options):
+        days = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Consolidado refeito: {days} dia(s) com vendas.'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from store.db_router import use_primary
+from store.inventory import release_expired
+
+
+class Command(BaseCommand):
+    help = 'Devolve ao estoque as reservas de pedidos não pagos que já venceram'
+
+    # Comando que grava: lê do primário, não da réplica (que pode estar atrasada)
+    @use_primary()
+    def handle(self, *args, **options):
+        released = release_expired()
+        self.stdout.write(self.style.SUCCESS(f'{released} reserva(s) devolvida(s) ao estoque.'))
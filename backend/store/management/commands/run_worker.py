@@ -0,0 +1,80 @@
+import os
+import signal
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from store.tasks import claim, run_task
+
+
+def init_process():
+    # Cada processo filho precisa do Django configurado e de conexões próprias
+    django.setup()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Consome a fila de tarefas (store.Task) com um pool de threads ou processos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=os.cpu_count() or 2,
+                            help='Tarefas simultâneas (padrão: número de CPUs)')
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                            help='thread para I/O (SMS, e-mail); process para CPU (imagens)')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Segundos entre consultas quando a fila está vazia')
+        parser.add_argument('--lock-timeout', type=int, default=600,
+                            help='Segundos sem sinal de vida até uma tarefa "running" ser considerada abandonada')
+        parser.add_argument('--once', action='store_true',
+                            help='Processa o que estiver pronto e sai (útil em cron e testes)')
+
+    def handle(self, *args, **options):
+        concurrency = max(options['concurrency'], 1)
+        lock_timeout = timedelta(seconds=options['lock_timeout'])
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        if options['pool'] == 'process':
+            # Conexões abertas não podem ser herdadas pelos filhos
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=concurrency, initializer=init_process)
+        else:
+            pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='store-worker')
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Worker iniciado ({options['pool']} x {concurrency}). Ctrl+C para parar."
+        ))
+        running = set()
+        done = failed = 0
+        with pool:
+            while not self.stopping:
+                free = concurrency - len(running)
+                task_ids = claim(free, lock_timeout) if free else []
+                for task_id in task_ids:
+                    # Sinal de vida a cada terço do lock_timeout: tarefas longas não rodam duas vezes
+                    running.add(pool.submit(run_task, task_id, lock_timeout / 3))
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                finished, running = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future.result():
+                        done += 1
+                    else:
+                        failed += 1
+
+            wait(running)
+        self.stdout.write(f'{done} tarefa(s) concluída(s), {failed} com falha.')
+
+    def stop(self, signum, frame):
+        self.stdout.write(self.style.WARNING('Encerrando após as tarefas em andamento...'))
+        self.stopping = True
@@ -0,0 +1,350 @@
+import glob
+import ipaddress
+import json
+import os
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from rest_framework.permissions import BasePermission
+from rest_framework.views import APIView
+
+
+# --- MÉTRICAS POR ENDPOINT (formato Prometheus) ---
+# Por requisição: latência (histograma), quantidade de queries e tempo no banco,
+# agrupados pelo nome da rota ('product-list', 'order-detail', 'token_obtain_pair').
+# Cada thread escreve no seu próprio shard (sem lock no caminho da requisição);
+# a leitura soma os shards. Com METRICS_DIR definido, cada processo grava de
+# tempos em tempos um snapshot em METRICS_DIR/<pid>-<id>.json (o id aleatório
+# separa um pid reaproveitado de quem o usou antes) e o /metrics soma os arquivos
+# de todos os workers do gunicorn. Os de workers que já morreram (reciclados pelo
+# max_requests, reiniciados) são somados uma vez em cumulative.json e apagados.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+UNMATCHED = '<unmatched>'
+CUMULATIVE = 'cumulative.json'
+# Outros métodos viram 'other': o cliente escolhe o método, e cada valor seria uma série nova
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+# [requisições, soma dos segundos, queries, segundos no banco, buckets...]
+COUNT, SECONDS, QUERIES, DB_SECONDS, FIRST_BUCKET = range(5)
+
+_current = ContextVar('metrics_request', default=None)
+_shards = []
+_shards_lock = threading.Lock()
+_local = threading.local()
+_next_flush = 0
+_worker = None
+
+
+def shard():
+    """(requisições por rota, respostas por status) desta thread."""
+    data = getattr(_local, 'shard', None)
+    if data is None:
+        data = _local.shard = ({}, {})
+        with _shards_lock:
+            _shards.append(data)
+    return data
+
+
+def record(endpoint, method, status, seconds, queries, db_seconds):
+    requests, statuses = shard()
+    row = requests.get((endpoint, method))
+    if row is None:
+        row = requests[(endpoint, method)] = [0, 0.0, 0, 0.0] + [0] * len(BUCKETS)
+    row[COUNT] += 1
+    row[SECONDS] += seconds
+    row[QUERIES] += queries
+    row[DB_SECONDS] += db_seconds
+    for i, bound in enumerate(BUCKETS):
+        if seconds <= bound:
+            row[FIRST_BUCKET + i] += 1
+            break
+    key = (endpoint, method, f'{status // 100}xx')
+    statuses[key] = statuses.get(key, 0) + 1
+
+
+def snapshot():
+    """Soma dos shards deste processo, num formato que vira JSON."""
+    requests, statuses = {}, {}
+    for shard_requests, shard_statuses in list(_shards):
+        # list(...items()) copia o dict de uma vez (atômico no CPython)
+        for key, row in list(shard_requests.items()):
+            merge_row(requests, '|'.join(key), row)
+        for key, count in list(shard_statuses.items()):
+            key = '|'.join(key)
+            statuses[key] = statuses.get(key, 0) + count
+    return {'requests': requests, 'statuses': statuses}
+
+
+def merge_row(target, key, row):
+    current = target.get(key)
+    target[key] = list(row) if current is None else [a + b for a, b in zip(current, row)]
+
+
+def merge(snapshots):
+    requests, statuses = {}, {}
+    for data in snapshots:
+        for key, row in data['requests'].items():
+            merge_row(requests, key, row)
+        for key, count in data['statuses'].items():
+            statuses[key] = statuses.get(key, 0) + count
+    return {'requests': requests, 'statuses': statuses}
+
+
+def worker_id():
+    """<pid>-<aleatório>, refeito se o processo mudou (fork depois do import)."""
+    global _worker
+    pid = os.getpid()
+    if _worker is None or _worker[0] != pid:
+        _worker = (pid, f'{pid}-{uuid.uuid4().hex[:12]}')
+    return _worker[1]
+
+
+def snapshot_path():
+    return os.path.join(settings.METRICS_DIR, f'{worker_id()}.json')
+
+
+def write_json(path, data):
+    """Troca atômica: quem lê nunca vê arquivo pela metade."""
+    temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporary, 'w') as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+
+def flush():
+    """Grava o snapshot deste processo."""
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    write_json(snapshot_path(), snapshot())
+
+
+def maybe_flush():
+    global _next_flush
+    if not getattr(settings, 'METRICS_DIR', None):
+        return
+    now = time.monotonic()
+    if now >= _next_flush:
+        _next_flush = now + getattr(settings, 'METRICS_FLUSH_INTERVAL', 5)
+        flush()
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Existe, só é de outro usuário
+        return True
+    return True
+
+
+def read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def fold_dead_workers(paths):
+    """
+    Soma os snapshots de workers mortos no cumulative.json e apaga os arquivos.
+    Sob flock: dois /metrics ao mesmo tempo não somam o mesmo arquivo duas vezes.
+    Devolve os que continuam (workers vivos).
+    """
+    alive, dead = [], []
+    for path in paths:
+        try:
+            pid = int(os.path.basename(path).split('-', 1)[0])
+        except ValueError:
+            alive.append(path)
+            continue
+        (alive if is_alive(pid) else dead).append(path)
+    if not dead:
+        return alive
+
+    import fcntl  # só Unix, como o gunicorn que usa o METRICS_DIR
+
+    cumulative = os.path.join(settings.METRICS_DIR, CUMULATIVE)
+    with open(os.path.join(settings.METRICS_DIR, '.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        snapshots = [read_json(cumulative) or {'requests': {}, 'statuses': {}}]
+        # Outro processo pode ter somado e apagado antes de pegarmos a trava
+        dead = [path for path in dead if os.path.exists(path)]
+        snapshots += [data for data in map(read_json, dead) if data is not None]
+        write_json(cumulative, merge(snapshots))
+        for path in dead:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    return alive
+
+
+def collect():
+    """Todos os workers: o acumulado dos mortos, os snapshots dos vivos e o estado atual deste processo."""
+    if not getattr(settings, 'METRICS_DIR', None):
+        return snapshot()
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    own = snapshot_path()
+    others = [
+        path for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.json'))
+        if path != own and os.path.basename(path) != CUMULATIVE
+    ]
+    paths = fold_dead_workers(others) + [os.path.join(settings.METRICS_DIR, CUMULATIVE)]
+    snapshots = [snapshot()] + [data for data in map(read_json, paths) if data is not None]
+    return merge(snapshots)
+
+
+def reset():
+    with _shards_lock:
+        for requests, statuses in _shards:
+            requests.clear()
+            statuses.clear()
+
+
+def escape(value):
+    """Valor de label no formato de texto do Prometheus: barra invertida, aspas e quebra de linha escapadas."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def labels(endpoint, method, **extra):
+    pairs = {'endpoint': endpoint, 'method': method, **extra}
+    return ','.join(f'{name}="{escape(value)}"' for name, value in pairs.items())
+
+
+def render(data):
+    lines = [
+        '# HELP store_http_request_duration_seconds Latência das requisições por rota.',
+        '# TYPE store_http_request_duration_seconds histogram',
+    ]
+    rows = sorted((tuple(key.split('|')), row) for key, row in data['requests'].items())
+    for (endpoint, method), row in rows:
+        cumulative = 0
+        for i, bound in enumerate(BUCKETS):
+            cumulative += row[FIRST_BUCKET + i]
+            lines.append(f'store_http_request_duration_seconds_bucket{{{labels(endpoint, method, le=bound)}}} {cumulative}')
+        lines.append(f'store_http_request_duration_seconds_bucket{{{labels(endpoint, method, le="+Inf")}}} {row[COUNT]}')
+        lines.append(f'store_http_request_duration_seconds_sum{{{labels(endpoint, method)}}} {row[SECONDS]:.6f}')
+        lines.append(f'store_http_request_duration_seconds_count{{{labels(endpoint, method)}}} {row[COUNT]}')
+
+    lines += ['# HELP store_db_queries_total Queries SQL executadas, por rota.', '# TYPE store_db_queries_total counter']
+    lines += [f'store_db_queries_total{{{labels(endpoint, method)}}} {row[QUERIES]}' for (endpoint, method), row in rows]
+    lines += ['# HELP store_db_query_seconds_total Tempo gasto no banco, por rota.', '# TYPE store_db_query_seconds_total counter']
+    lines += [f'store_db_query_seconds_total{{{labels(endpoint, method)}}} {row[DB_SECONDS]:.6f}' for (endpoint, method), row in rows]
+
+    lines += ['# HELP store_http_responses_total Respostas por classe de status.', '# TYPE store_http_responses_total counter']
+    for key, count in sorted(data['statuses'].items()):
+        endpoint, method, status = key.split('|')
+        lines.append(f'store_http_responses_total{{{labels(endpoint, method, status=status)}}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+# --- Contagem de queries: um execute_wrapper em toda conexão nova ---
+def count_query(execute, sql, params, many, context):
+    current = _current.get()
+    if current is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        # Mesma lista em sync_to_async: o ContextVar é copiado para a thread do ORM
+        current[0] += 1
+        current[1] += time.perf_counter() - start
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    if count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_query)
+
+
+class MetricsMiddleware:
+    """Mede cada requisição; funciona com views síncronas e assíncronas."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'METRICS_ENABLED', True)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+        current = [0, 0.0]
+        token = _current.set(current)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, time.perf_counter() - start, current)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        current = [0, 0.0]
+        token = _current.set(current)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, time.perf_counter() - start, current)
+        return response
+
+    def finish(self, request, response, seconds, current):
+        match = getattr(request, 'resolver_match', None)
+        endpoint = (match.url_name or match.view_name) if match else UNMATCHED
+        if endpoint == 'metrics':
+            return
+        method = request.method if request.method in METHODS else 'other'
+        record(endpoint, method, response.status_code, seconds, current[0], current[1])
+        maybe_flush()
+
+
+def allowed_ip(address):
+    """address dentro de METRICS_ALLOWED_IPS (IPs ou redes, ex: 172.30.0.0/24)."""
+    try:
+        ip = ipaddress.ip_address(address or '')
+    except ValueError:
+        return False
+    for allowed in getattr(settings, 'METRICS_ALLOWED_IPS', ()):
+        try:
+            if ip in ipaddress.ip_network(allowed, strict=False):
+                return True
+        except ValueError:
+            continue
+    return False
+
+
+class MetricsAccess(BasePermission):
+    """
+    Staff, ou chamadas dos IPs em METRICS_ALLOWED_IPS (o Prometheus, na rede interna).
+    O IP só vale para quem fala direto com a API: o que passou pelo nginx
+    (X-Forwarded-For) chega com o IP dele, que também está na rede interna.
+    """
+
+    def has_permission(self, request, view):
+        if 'HTTP_X_FORWARDED_FOR' not in request.META and allowed_ip(request.META.get('REMOTE_ADDR')):
+            return True
+        return bool(request.user and request.user.is_staff)
+
+
+class MetricsView(APIView):
+    permission_classes = [MetricsAccess]
+
+    def get(self, request):
+        return HttpResponse(render(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-18 16:27
+
+from django.db import migrations, models
+
+
+def build_category_paths(apps, schema_editor):
+    Category = apps.get_model('store', 'Category')
+    children = {}
+    for category in Category.objects.all():
+        children.setdefault(category.parent_id, []).append(category)
+
+    # Percorre a árvore a partir das raízes, de cima para baixo
+    stack = [(category, '', 0) for category in children.get(None, [])]
+    while stack:
+        category, parent_path, depth = stack.pop()
+        category.path = f"{parent_path}{category.pk:08d}/"
+        category.depth = depth
+        category.save(update_fields=['path', 'depth'])
+        stack.extend((child, category.path, depth + 1) for child in children.get(category.pk, []))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0007_order_guest_email_order_guest_name_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(build_category_paths, migrations.RunPython.noop),
+    ]
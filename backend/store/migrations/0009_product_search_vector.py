@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-18 16:29
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # GIN e to_tsvector só existem no Postgres; no SQLite a busca usa o índice em memória
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS store_product_search_vector_gin "
+        "ON store_product USING gin (search_vector)"
+    )
+    schema_editor.execute(
+        "UPDATE store_product SET search_vector = "
+        "setweight(to_tsvector('portuguese', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('portuguese', coalesce(description, '')), 'B')"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS store_product_search_vector_gin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0008_category_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0 on 2026-10-18 16:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0011_task_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('variant_key', models.CharField(blank=True, default='', editable=False, max_length=100)),
+                ('sku', models.CharField(blank=True, max_length=64, null=True, unique=True)),
+                ('available', models.PositiveIntegerField(default=0)),
+                ('options', models.ManyToManyField(blank=True, related_name='stock_items', to='store.attributevalue')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_items', to='store.product')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='stock_item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='store.stockitem'),
+        ),
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('status', models.CharField(choices=[('active', 'Reservado'), ('committed', 'Confirmado'), ('released', 'Liberado')], default='active', max_length=10)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='store.order')),
+                ('stock_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='store.stockitem')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='stockitem',
+            index=models.Index(fields=['product', 'variant_key'], name='store_stock_variant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockreservation',
+            index=models.Index(fields=['status', 'expires_at'], name='store_reservation_expiry_idx'),
+        ),
+    ]
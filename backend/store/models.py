@@ -1,7 +1,14 @@
-from django.db import models
+from decimal import Decimal
+
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import connection, models
 from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
 from django.utils.text import slugify
-from django.db.models.signals import post_save
+from django.core.cache import cache
+from django.db.models import F, OuterRef, Prefetch, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Concat, Substr
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
 from django.dispatch import receiver
 
 # --- 1. USUÁRIO PERSONALIZADO ---
@@ -37,6 +44,7 @@ class SiteSettings(models.Model):
 
     # Jurídico
     terms_of_use = models.TextField("Termos de Uso", blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         verbose_name = "Configuração do Site"
@@ -47,17 +55,77 @@ class SiteSettings(models.Model):
 
 # --- 3. ESTRUTURA DE PRODUTOS E CATEGORIAS ---
 
+# Chaves de cache da árvore de categorias (invalidadas pelos signals no fim do arquivo)
+CATEGORY_TREE_CACHE_KEY = 'store:category-tree'
+CATEGORY_DESCENDANTS_CACHE_KEY = 'store:category-descendants'
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, blank=True)
     image = models.ImageField(upload_to='categories/', blank=True, null=True)
+    # Versões redimensionadas geradas em segundo plano (ver store/images.py)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     parent = models.ForeignKey('self', on_delete=models.CASCADE, null=True, blank=True, related_name='subcategories')
     show_on_home = models.BooleanField(default=False, verbose_name="Mostrar na Página Inicial")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Caminho materializado: ids dos ancestrais + o próprio, ex: "00000001/00000007/".
+    # Permite carregar a árvore (ou uma subárvore) inteira com uma única query.
+    path = models.CharField(max_length=255, db_index=True, blank=True, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+
+    PATH_STEP_WIDTH = 8
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
+        self._refresh_path()
+
+    def _refresh_path(self):
+        """Recalcula o path após salvar e, se mudou de pai, move a subárvore inteira num único UPDATE."""
+        parent = self.parent
+        new_path = (parent.path if parent else '') + f"{self.pk:0{self.PATH_STEP_WIDTH}d}/"
+        new_depth = parent.depth + 1 if parent else 0
+        old_path, old_depth = self.path, self.depth
+        if new_path == old_path:
+            return
+
+        Category.objects.filter(pk=self.pk).update(path=new_path, depth=new_depth)
+        if old_path:
+            Category.objects.filter(path__startswith=old_path).exclude(pk=self.pk).update(
+                path=Concat(Value(new_path), Substr('path', len(old_path) + 1), output_field=models.CharField()),
+                depth=F('depth') + (new_depth - old_depth),
+            )
+        self.path, self.depth = new_path, new_depth
+        # O post_save já invalidou, mas antes do path ser gravado
+        cache.delete_many([CATEGORY_TREE_CACHE_KEY, CATEGORY_DESCENDANTS_CACHE_KEY])
+
+    def get_descendants(self, include_self=False):
+        qs = Category.objects.filter(path__startswith=self.path).order_by('path')
+        if not include_self:
+            qs = qs.exclude(pk=self.pk)
+        return qs
+
+    @classmethod
+    def descendant_ids_by_slug(cls):
+        """
+        Mapa slug -> ids da categoria e de todos os descendentes.
+        Montado com uma query a partir dos paths e guardado em cache.
+        """
+        mapping = cache.get(CATEGORY_DESCENDANTS_CACHE_KEY)
+        if mapping is None:
+            rows = list(cls.objects.values_list('id', 'slug', 'path'))
+            slugs = {pk: slug for pk, slug, path in rows}
+            mapping = {slug: [pk] for pk, slug, path in rows}
+            for pk, slug, path in rows:
+                # Cada ancestral presente no path ganha este id
+                for ancestor in path.rstrip('/').split('/')[:-1]:
+                    ancestor_slug = slugs.get(int(ancestor))
+                    if ancestor_slug is not None:
+                        mapping[ancestor_slug].append(pk)
+            cache.set(CATEGORY_DESCENDANTS_CACHE_KEY, mapping, 60 * 15)
+        return mapping
 
     class Meta:
         verbose_name_plural = "Categories"
@@ -79,6 +147,34 @@ class AttributeValue(models.Model):
     def __str__(self):
         return f"{self.attribute.name}: {self.value}"
 
+class ProductQuerySet(models.QuerySet):
+    """
+    Centraliza os select_related/prefetch_related do catálogo para que
+    listagem e detalhe rodem um número fixo de queries.
+    """
+    def with_images(self):
+        # Capa primeiro: Product.cover_image pega o primeiro da lista
+        return self.prefetch_related(
+            Prefetch('images', queryset=ProductImage.objects.order_by('-is_cover', 'id'))
+        )
+
+    def for_listing(self):
+        return self.select_related('category').with_images()
+
+    def update_search_vector(self):
+        """Recalcula o tsvector (nome com peso A, descrição B). Só faz algo no Postgres."""
+        if connection.vendor != 'postgresql':
+            return 0
+        return self.update(
+            search_vector=SearchVector('name', weight='A', config='portuguese')
+            + SearchVector('description', weight='B', config='portuguese')
+        )
+
+    def for_detail(self):
+        return self.for_listing().prefetch_related(
+            Prefetch('attributes', queryset=AttributeValue.objects.select_related('attribute'))
+        )
+
 class Product(models.Model):
     name = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, blank=True)
@@ -92,11 +188,35 @@ class Product(models.Model):
     is_active = models.BooleanField(default=True)
     is_featured = models.BooleanField(default=False, help_text="Destaque na Home")
     created_at = models.DateTimeField(auto_now_add=True)
+    # Também sobe quando mudam fotos ou atributos (signals no fim do arquivo): é a
+    # data usada no ETag/Last-Modified da API
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Documento da busca textual (Postgres). Mantido por save()/update_search_vector().
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
+        Product.objects.filter(pk=self.pk).update_search_vector()
+
+    @property
+    def current_price(self):
+        """Preço cobrado no checkout: o promocional, quando houver e for menor."""
+        if self.promotional_price is not None and self.promotional_price < self.base_price:
+            return self.promotional_price
+        return self.base_price
+
+    @property
+    def cover_image(self):
+        """Foto de capa (ou a primeira foto). Usa .all() para aproveitar o prefetch."""
+        images = list(self.images.all())
+        if not images:
+            return None
+        return next((img for img in images if img.is_cover), images[0])
 
     def __str__(self):
         return self.name
@@ -105,6 +225,8 @@ class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='products/')
     is_cover = models.BooleanField(default=False, help_text="Foto principal?")
+    # Versões redimensionadas geradas em segundo plano (ver store/images.py)
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return f"Imagem de {self.product.name}"
@@ -125,6 +247,14 @@ class CustomRequest(models.Model):
     def __str__(self):
         return f"Pedido de {self.user.username}"
     
+class OrderQuerySet(models.QuerySet):
+    def with_items(self):
+        # Itens + produto + fotos em 3 queries, independente do tamanho do pedido
+        return self.select_related('customer').prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product')),
+            Prefetch('items__product__images', queryset=ProductImage.objects.order_by('-is_cover', 'id')),
+        )
+
 class Order(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pendente'),
@@ -148,17 +278,102 @@ class Order(models.Model):
     total = models.DecimalField(max_digits=10, decimal_places=2)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # "Meus pedidos" e o filtro por cliente no admin, já na ordem da listagem
+            models.Index(fields=['customer', 'created_at'], name='store_order_customer_idx'),
+            # Filtro por status no admin (ex: pendentes mais recentes)
+            models.Index(fields=['status', 'created_at'], name='store_order_status_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Status como veio do banco: o signal de estoque compara no save (store/inventory.py)
+        instance._db_status = instance.__dict__.get('status')
+        return instance
+
+    def update_total(self):
+        """Recalcula o total com SUM(price * quantity) no próprio banco."""
+        item_total = (
+            OrderItem.objects.filter(order=OuterRef('pk'))
+            .values('order')
+            .annotate(total=Sum(F('price') * F('quantity')))
+            .values('total')
+        )
+        Order.objects.filter(pk=self.pk).update(total=Coalesce(Subquery(item_total), Value(Decimal('0'))))
+        self.refresh_from_db(fields=['total'])
+
     def __str__(self):
         return f"Pedido {self.id} - {self.guest_name or self.customer}"
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    # Variação comprada (ex: Aro 16), quando o produto tem estoque controlado
+    stock_item = models.ForeignKey('StockItem', on_delete=models.SET_NULL, null=True, blank=True, related_name='order_items')
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
     def __str__(self):
         return f"{self.quantity}x {self.product.name}"
+
+# --- 4.1 ESTOQUE ---
+
+class StockItem(models.Model):
+    """
+    Estoque de um produto numa combinação de atributos (ex: Anel X, Aro 16).
+    Produtos sem nenhum StockItem não têm estoque controlado.
+    A baixa é sempre um UPDATE condicional (ver store/inventory.py).
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_items')
+    options = models.ManyToManyField(AttributeValue, blank=True, related_name='stock_items')
+    # Ids dos AttributeValue ordenados, ex: "12,40" ("" = produto sem variação)
+    variant_key = models.CharField(max_length=100, blank=True, default='', editable=False)
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    # Disponível para venda (já descontadas as reservas). O CHECK >= 0 é a última trava contra overselling.
+    available = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # Não é unique: a chave só fica certa depois que as opções (M2M) são gravadas
+        indexes = [
+            models.Index(fields=['product', 'variant_key'], name='store_stock_variant_idx'),
+        ]
+
+    @staticmethod
+    def make_variant_key(option_ids):
+        return ','.join(str(pk) for pk in sorted(set(option_ids)))
+
+    def __str__(self):
+        return f"{self.product.name} [{self.variant_key or 'único'}]: {self.available}"
+
+class StockReservation(models.Model):
+    STATUS_ACTIVE = 'active'
+    STATUS_COMMITTED = 'committed'
+    STATUS_RELEASED = 'released'
+    STATUS_CHOICES = (
+        (STATUS_ACTIVE, 'Reservado'),
+        (STATUS_COMMITTED, 'Confirmado'),
+        (STATUS_RELEASED, 'Liberado'),
+    )
+
+    stock_item = models.ForeignKey(StockItem, on_delete=models.CASCADE, related_name='reservations')
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
+    # Reservas ativas vencidas voltam para o estoque (release_expired_reservations)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'expires_at'], name='store_reservation_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity}x {self.stock_item} ({self.get_status_display()})"
     
 # --- 5. PERFIL E ENDEREÇOS ---
 
@@ -188,6 +403,81 @@ class Address(models.Model):
     def __str__(self):
         return f"{self.name} - {self.zip_code}"
 
+# --- 6. TAREFAS EM SEGUNDO PLANO ---
+
+class Task(models.Model):
+    """
+    Fila de tarefas no próprio banco, consumida por `manage.py run_worker`.
+    Veja store/tasks.py para enfileirar e executar.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pendente'),
+        (STATUS_RUNNING, 'Executando'),
+        (STATUS_DONE, 'Concluída'),
+        (STATUS_FAILED, 'Falhou'),
+    )
+
+    name = models.CharField(max_length=200, help_text="Caminho da função, ex: store.images.process_model_image")
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    # Mesma chave = mesma tarefa: enfileirar de novo não duplica o trabalho
+    idempotency_key = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # O worker busca: status = pending AND run_after <= agora, por ordem de run_after
+            models.Index(fields=['status', 'run_after'], name='store_task_ready_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
+
+# --- 7. CONSOLIDADO DE VENDAS (DASHBOARD) ---
+
+class DailySales(models.Model):
+    """
+    Uma linha por dia com o total vendido (pedidos não cancelados). Mantida pelos
+    signals de store/stats.py e reconstruída com `manage.py rebuild_sales_rollup`;
+    o dashboard lê só daqui, sem varrer a tabela de pedidos.
+    """
+    date = models.DateField(unique=True)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    orders_count = models.PositiveIntegerField(default=0)
+    items_sold = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.date}: R$ {self.revenue} ({self.orders_count} pedidos)"
+
+class DailyProductSales(models.Model):
+    """Quanto cada produto vendeu por dia (base do ranking de mais vendidos)."""
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='store_daily_product_sales_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.date}: {self.quantity}x {self.product_id}"
+
 # Signals
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -196,4 +486,40 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
\ No newline at end of file
+    instance.profile.save()
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_tree(sender, **kwargs):
+    cache.delete_many([CATEGORY_TREE_CACHE_KEY, CATEGORY_DESCENDANTS_CACHE_KEY])
+
+# updated_at do catálogo: mudanças que não passam pelo save() do próprio registro
+def touch(queryset):
+    return queryset.update(updated_at=timezone.now())
+
+@receiver(post_save, sender=Category)
+def touch_category(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None:
+        # save(update_fields=[...]) (ex: miniaturas geradas) não grava o auto_now
+        touch(Category.objects.filter(pk=instance.pk))
+    # Listagem e detalhe dos produtos mostram o nome da categoria
+    if update_fields is None or 'name' in update_fields:
+        touch(Product.objects.filter(category=instance))
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def touch_product_of_image(sender, instance, **kwargs):
+    touch(Product.objects.filter(pk=instance.product_id))
+
+@receiver(m2m_changed, sender=Product.attributes.through)
+def touch_product_attributes(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # Pelo lado do AttributeValue, o clear não informa os produtos: pega antes
+        touch(Product.objects.filter(attributes=instance))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        touch(Product.objects.filter(pk__in=pk_set or ()) if reverse else Product.objects.filter(pk=instance.pk))
+
+@receiver(post_save, sender=AttributeValue)
+@receiver(pre_delete, sender=AttributeValue)
+def touch_products_of_value(sender, instance, **kwargs):
+    touch(Product.objects.filter(attributes=instance))
@@ -0,0 +1,12 @@
+from .tasks import task
+
+
+# --- NOTIFICAÇÕES (executadas pelo worker) ---
+@task(max_attempts=5)
+def send_sms_code(phone, code):
+    # --- LÓGICA DO SMS FAKE ---
+    # Troque por um provedor real (Twilio, Zenvia...) quando houver um
+    print("\n" + "="*30)
+    print(f"📱 [SMS FAKE] Para: {phone}")
+    print(f"🔑 CÓDIGO: {code}")
+    print("="*30 + "\n")
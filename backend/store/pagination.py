@@ -0,0 +1,73 @@
+from rest_framework.pagination import CursorPagination, _reverse_ordering
+
+
+# --- PAGINAÇÃO POR CURSOR (KEYSET) ---
+class ProductCursorPagination(CursorPagination):
+    """
+    Paginação por cursor para o catálogo.
+    Usa WHERE (created_at, id) < cursor em vez de OFFSET, então o custo
+    de cada página não cresce com o tamanho do catálogo.
+    """
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    # 'id' desempata produtos criados no mesmo instante
+    ordering = ('-created_at', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        # Em buscas sem ?ordering explícito, a relevância manda (inteiro exato, ver store/search.py)
+        if 'search_rank' in queryset.query.annotations and 'ordering' not in request.query_params:
+            return ('-search_rank', '-id')
+        return super().get_ordering(request, queryset, view)
+
+
+class OrderCursorPagination(CursorPagination):
+    """Pedidos mais recentes primeiro; com os índices (status|customer, created_at) cada página é uma faixa do índice."""
+    page_size = 25
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
+class AsyncProductCursorPagination(ProductCursorPagination):
+    """
+    Mesma paginação, para as views assíncronas (store/async_views.py). É o
+    paginate_queryset do DRF com a única query (a da página) feita pelo ORM
+    assíncrono; todo o resto é cálculo puro sobre o cursor.
+    """
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        offset, reverse, current_position = self.cursor if self.cursor is not None else (0, False, None)
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if current_position is not None:
+            order = self.ordering[0]
+            order_attr = order.lstrip('-')
+            # (cursor invertido) XOR (ordenação decrescente)
+            lookup = 'lt' if self.cursor.reverse != order.startswith('-') else 'gt'
+            queryset = queryset.filter(**{f'{order_attr}__{lookup}': current_position})
+
+        # Um item a mais para saber se existe a página seguinte
+        page_query = queryset[offset:offset + self.page_size + 1]
+        results = [obj async for obj in page_query.aiterator(chunk_size=self.page_size + 1)]
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+        following_position = self._get_position_from_instance(results[-1], self.ordering) if has_following else None
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None or offset > 0
+            self.has_previous = has_following
+            self.next_position, self.previous_position = current_position, following_position
+        else:
+            self.has_next = has_following
+            self.has_previous = current_position is not None or offset > 0
+            self.next_position, self.previous_position = following_position, current_position
+        return self.page
@@ -0,0 +1,303 @@
+import cProfile
+import io
+import json
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+from rest_framework.exceptions import APIException
+
+from .authentication import CachedJWTAuthentication
+
+slow_query_logger = logging.getLogger('store.slow_queries')
+
+
+# --- SLOW-QUERY LOG (sempre ligado) E PERFIL SOB DEMANDA ---
+# Toda conexão ganha um execute_wrapper que cronometra as queries: acima de
+# SLOW_QUERY_THRESHOLD_MS, vai para o logger 'store.slow_queries' com a rota.
+# Em requisições de staff com ?_profile=1 (ou o cabeçalho X-Profile: 1), o
+# ProfilingMiddleware roda a view sob um profiler e troca a resposta por um
+# relatório JSON: todas as queries com tempo, as repetidas, e o perfil.
+#   sampling (padrão)  pilhas amostradas a cada PROFILING_SAMPLE_INTERVAL, no
+#                      formato "folded" (flamegraph.pl, speedscope, inferno)
+#   cprofile           ?_profile=cprofile: top funções do cProfile (+ o .prof)
+# Com PROFILING_DIR definido, o relatório e o perfil também vão para arquivos.
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+MODES = ('sampling', 'cprofile')
+MAX_SQL_LENGTH = 2000
+
+_queries = ContextVar('profiling_queries', default=None)
+_route = ContextVar('profiling_route', default=None)
+
+
+def slow_query_threshold():
+    return getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 200) / 1000
+
+
+def observe_query(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        queries = _queries.get()
+        if queries is not None:
+            queries.append((sql, params, elapsed))
+        threshold = slow_query_threshold()
+        if threshold > 0 and elapsed >= threshold:
+            # Os parâmetros ficam de fora: trazem e-mails, endereços, tokens...
+            slow_query_logger.warning(
+                'Query lenta (%.1f ms) em %s: %s | %d parâmetro(s)',
+                elapsed * 1000, _route.get() or '-', sql[:MAX_SQL_LENGTH], len(params or ()),
+            )
+
+
+@receiver(connection_created)
+def install_query_observer(sender, connection, **kwargs):
+    if observe_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(observe_query)
+
+
+# --- Relatório de SQL ---
+def sql_report(queries):
+    """Queries em ordem, com tempo e repetições: mesmo SQL (N+1) e mesmo SQL com os mesmos parâmetros."""
+    by_statement = Counter(sql for sql, _, _ in queries)
+    by_call = Counter((sql, repr(params)) for sql, params, _ in queries)
+    statement_time = Counter()
+    for sql, _, elapsed in queries:
+        statement_time[sql] += elapsed
+    return {
+        'count': len(queries),
+        'time_ms': round(sum(elapsed for _, _, elapsed in queries) * 1000, 3),
+        'queries': [
+            {'sql': sql[:MAX_SQL_LENGTH], 'params': repr(params), 'time_ms': round(elapsed * 1000, 3)}
+            for sql, params, elapsed in queries
+        ],
+        'repeated_statements': [
+            {'sql': sql[:MAX_SQL_LENGTH], 'count': count, 'time_ms': round(statement_time[sql] * 1000, 3)}
+            for sql, count in by_statement.most_common() if count > 1
+        ],
+        'duplicate_queries': [
+            {'sql': sql[:MAX_SQL_LENGTH], 'params': params, 'count': count}
+            for (sql, params), count in by_call.most_common() if count > 1
+        ],
+    }
+
+
+# --- Profilers ---
+class SamplingProfiler:
+    """
+    Amostra a pilha de uma thread em intervalos fixos e conta as pilhas (formato folded).
+    Por padrão, a thread que cria o profiler; 'target' escolhe outra (ex: a que roda a view).
+    """
+
+    def __init__(self, interval, target=None):
+        self.interval = interval
+        self.stacks = Counter()
+        self.target = target or threading.get_ident()
+        self.running = threading.Event()
+        self.thread = threading.Thread(target=self.sample, name='store-profiler', daemon=True)
+
+    def __enter__(self):
+        self.running.set()
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.running.clear()
+        self.thread.join()
+
+    def sample(self):
+        while self.running.is_set():
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def report(self):
+        return {
+            'format': 'folded',
+            'interval_ms': self.interval * 1000,
+            'samples': sum(self.stacks.values()),
+            'folded': '\n'.join(f'{stack} {count}' for stack, count in self.stacks.most_common()),
+        }
+
+    def save(self, path):
+        with open(f'{path}.folded', 'w') as f:
+            f.write(self.report()['folded'])
+
+
+# No Python 3.12+ o cProfile usa o sys.monitoring, que é do processo inteiro:
+# um segundo enable() simultâneo levanta ValueError. Um perfil por vez.
+_cprofile_lock = threading.Lock()
+
+
+class CProfileProfiler:
+    """
+    Se outro cProfile já estiver ativo (outra requisição, um debugger), cai para
+    o SamplingProfiler em vez de derrubar a requisição; o relatório avisa.
+    """
+    TOP = 40
+
+    def __init__(self, interval):
+        self.profile = cProfile.Profile()
+        self.interval = interval
+        self.fallback = None
+
+    def __enter__(self):
+        if _cprofile_lock.acquire(blocking=False):
+            try:
+                self.profile.enable()
+                return self
+            except ValueError:
+                _cprofile_lock.release()
+        self.fallback = SamplingProfiler(self.interval).__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.fallback is not None:
+            self.fallback.__exit__(*exc_info)
+            return
+        self.profile.disable()
+        _cprofile_lock.release()
+
+    def report(self):
+        if self.fallback is not None:
+            return dict(self.fallback.report(), fallback='outro cProfile estava ativo; pilhas amostradas')
+        out = io.StringIO()
+        pstats.Stats(self.profile, stream=out).sort_stats('cumulative').print_stats(self.TOP)
+        return {'format': 'cprofile', 'top': out.getvalue()}
+
+    def save(self, path):
+        if self.fallback is not None:
+            self.fallback.save(path)
+            return
+        # .prof: abre no snakeviz, e o flameprof / speedscope geram o flamegraph
+        self.profile.dump_stats(f'{path}.prof')
+
+
+def is_staff(request):
+    """Staff pela sessão (admin do Django) ou pelo JWT; o DRF só autentica depois do middleware."""
+    if getattr(request, 'user', None) is not None and request.user.is_staff:
+        return True
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except APIException:
+        return False
+    return bool(result and result[0].is_staff)
+
+
+def make_profiler(mode, target=None):
+    interval = getattr(settings, 'PROFILING_SAMPLE_INTERVAL', 0.001)
+    if mode == 'cprofile':
+        return CProfileProfiler(interval)
+    return SamplingProfiler(interval, target)
+
+
+def is_async_view(request):
+    try:
+        return iscoroutinefunction(resolve(request.path_info).func)
+    except Resolver404:
+        return False
+
+
+def requested_mode(request):
+    value = request.GET.get(PROFILE_PARAM) or request.META.get(PROFILE_HEADER)
+    if not value or value in ('0', 'false'):
+        return None
+    return value if value in MODES else MODES[0]
+
+
+class ProfilingMiddleware:
+    """
+    Fica depois do AuthenticationMiddleware. Fora do modo de perfil, só marca a rota para o slow-query log.
+    Síncrono ou assíncrono. No ASGI, uma view síncrona roda na thread do
+    sync_to_async da requisição, não no event loop: é essa que o sampling amostra.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _route.set(f'{request.method} {request.path}')
+        try:
+            mode = requested_mode(request)
+            if mode is None or not getattr(settings, 'PROFILING_ENABLED', True) or not is_staff(request):
+                return self.get_response(request)
+            queries, profiler = [], make_profiler(mode)
+            queries_token = _queries.set(queries)
+            start = time.perf_counter()
+            try:
+                with profiler:
+                    response = self.get_response(request)
+            finally:
+                _queries.reset(queries_token)
+            return self.report(request, response, time.perf_counter() - start, queries, profiler)
+        finally:
+            _route.reset(token)
+
+    async def __acall__(self, request):
+        token = _route.set(f'{request.method} {request.path}')
+        try:
+            mode = requested_mode(request)
+            # is_staff pode consultar o banco (sessão ou JWT): só no caminho raro do perfil
+            if mode is None or not getattr(settings, 'PROFILING_ENABLED', True) or not await sync_to_async(is_staff)(request):
+                return await self.get_response(request)
+            # thread_sensitive: a mesma thread em que o Django vai rodar a view síncrona
+            target = None if is_async_view(request) else await sync_to_async(threading.get_ident)()
+            queries, profiler = [], make_profiler(mode, target)
+            queries_token = _queries.set(queries)
+            start = time.perf_counter()
+            try:
+                with profiler:
+                    response = await self.get_response(request)
+            finally:
+                _queries.reset(queries_token)
+            return self.report(request, response, time.perf_counter() - start, queries, profiler)
+        finally:
+            _route.reset(token)
+
+    def report(self, request, response, elapsed, queries, profiler):
+        match = getattr(request, 'resolver_match', None)
+        report = {
+            'id': uuid.uuid4().hex,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'endpoint': match.url_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 3),
+            'sql': sql_report(queries),
+            'profile': profiler.report(),
+        }
+        directory = getattr(settings, 'PROFILING_DIR', None)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, report['id'])
+            profiler.save(path)
+            with open(f'{path}.json', 'w') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+        return JsonResponse(report, json_dumps_params={'ensure_ascii': False})
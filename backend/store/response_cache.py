@@ -0,0 +1,217 @@
+import hashlib
+import inspect
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from . import conditional
+from .db_router import use_primary
+from .models import AttributeValue, Category, Product, ProductImage, SiteSettings
+
+
+# --- CACHE DE RESPOSTAS DO CATÁLOGO ---
+# A chave de cada resposta inclui a "geração" do seu namespace. Invalidar é só
+# incrementar a geração: as respostas antigas deixam de ser encontradas e
+# expiram sozinhas. Funciona igual no LocMemCache e no Redis, sem varrer chaves.
+# Namespaces:
+#   products         listagem de produtos
+#   product          detalhe de qualquer produto (ex: categoria renomeada)
+#   product:<id>     detalhe de um produto
+#   categories       árvore de categorias
+#   site-settings    configurações do site
+# Com réplica de leitura, por REPLICA_PIN_SECONDS depois de cada invalidação as
+# respostas recalculadas leem do primário: uma réplica atrasada devolveria o dado
+# antigo, que voltaria para o cache já com a geração nova.
+PRIMARY_PIN_KEY = 'resp-primary-pin'
+PRODUCTS = 'products'
+PRODUCT = 'product'
+CATEGORIES = 'categories'
+SITE_SETTINGS = 'site-settings'
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def generation_key(namespace):
+    return f'resp-gen:{namespace}'
+
+
+def generations(namespaces):
+    """Geração atual de cada namespace. Uma que sumiu do cache recomeça num valor novo (o relógio), nunca num já usado."""
+    cache = get_cache()
+    keys = [generation_key(namespace) for namespace in namespaces]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns())
+            found[key] = cache.get(key)
+    return [found[key] for key in keys]
+
+
+async def agenerations(namespaces):
+    """generations() para as views assíncronas."""
+    cache = get_cache()
+    keys = [generation_key(namespace) for namespace in namespaces]
+    found = await cache.aget_many(keys)
+    for key in keys:
+        if key not in found:
+            await cache.aadd(key, time.time_ns())
+            found[key] = await cache.aget(key)
+    return [found[key] for key in keys]
+
+
+def invalidate(*namespaces):
+    cache = get_cache()
+    for namespace in namespaces:
+        try:
+            cache.incr(generation_key(namespace))
+        except ValueError:
+            # Ainda não existia: nada em cache dependia dela
+            pass
+    seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+    if seconds > 0:
+        cache.set(PRIMARY_PIN_KEY, True, seconds)
+
+
+def reads_for(pinned):
+    """Onde o cache miss lê: do primário logo depois de uma invalidação, senão onde o router mandar."""
+    return use_primary() if pinned else nullcontext()
+
+
+def response_key(request, namespaces, namespace_generations=None):
+    """Host + caminho + query string normalizada (parâmetros em ordem alfabética)."""
+    if namespace_generations is None:
+        namespace_generations = generations(namespaces)
+    # request.GET: vale para o Request do DRF e para o HttpRequest das views assíncronas
+    query = sorted((name, value) for name in request.GET for value in request.GET.getlist(name))
+    raw = '|'.join([request.get_host(), request.path, repr(query), repr(namespace_generations)])
+    return 'resp2:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def json_response(data, status=200, headers=None):
+    """
+    Resposta das views assíncronas (sem o DRF): o JSON sai pelo mesmo renderer
+    das views do DRF, e o .data fica disponível para o cached_response.
+    """
+    response = HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status, headers=headers)
+    response.data = data
+    return response
+
+
+def cached_response(*namespaces, per_object=False):
+    """
+    Decorator para list/retrieve de um ViewSet (ou get de uma view assíncrona).
+    Com per_object=True, o detalhe também depende do namespace
+    '<primeiro namespace>:<pk>'. Só GETs com status 200 entram no cache, junto
+    com o ETag/Last-Modified (ver store/conditional.py); o cabeçalho X-Cache diz
+    se foi HIT ou MISS.
+    """
+    def namespaces_for(view, kwargs):
+        keys = list(namespaces)
+        if per_object:
+            keys.append(f"{namespaces[0]}:{kwargs.get(view.lookup_url_kwarg or view.lookup_field)}")
+        return keys
+
+    def enabled(request):
+        return request.method == 'GET' and getattr(settings, 'RESPONSE_CACHE_ENABLED', True)
+
+    def hit(request, cached, render):
+        data, validators = cached
+        response = conditional.not_modified_from_headers(request, validators) or render(data, headers=validators)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    def entry(response):
+        validators = {name: response[name] for name in conditional.VALIDATOR_HEADERS if name in response}
+        return response.data, validators
+
+    def decorator(method):
+        if inspect.iscoroutinefunction(method):
+            @wraps(method)
+            async def async_wrapper(self, request, *args, **kwargs):
+                if not enabled(request):
+                    return await method(self, request, *args, **kwargs)
+                keys = namespaces_for(self, kwargs)
+                key = response_key(request, keys, await agenerations(keys))
+                cache = get_cache()
+                cached = await cache.aget(key)
+                if cached is not None:
+                    return hit(request, cached, json_response)
+                with reads_for(await cache.aget(PRIMARY_PIN_KEY)):
+                    response = await method(self, request, *args, **kwargs)
+                if response.status_code == 200:
+                    await cache.aset(key, entry(response), getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+                response['X-Cache'] = 'MISS'
+                return response
+            return async_wrapper
+
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if not enabled(request):
+                return method(self, request, *args, **kwargs)
+            key = response_key(request, namespaces_for(self, kwargs))
+            cache = get_cache()
+            cached = cache.get(key)
+            if cached is not None:
+                return hit(request, cached, Response)
+            with reads_for(cache.get(PRIMARY_PIN_KEY)):
+                response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, entry(response), getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300))
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+# --- INVALIDAÇÃO ---
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product(sender, instance, **kwargs):
+    invalidate(PRODUCTS, f'{PRODUCT}:{instance.pk}')
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def invalidate_product_image(sender, instance, **kwargs):
+    invalidate(PRODUCTS, f'{PRODUCT}:{instance.product_id}')
+
+
+@receiver(m2m_changed, sender=Product.attributes.through)
+def invalidate_product_attributes(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # Pelo lado do AttributeValue: os produtos afetados estão em pk_set (ou todos, no clear)
+        invalidate(PRODUCTS, *([f'{PRODUCT}:{pk}' for pk in pk_set] if pk_set else [PRODUCT]))
+    else:
+        invalidate(PRODUCTS, f'{PRODUCT}:{instance.pk}')
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category(sender, **kwargs):
+    # Listagem e detalhe mostram category_name; a árvore mostra a categoria
+    invalidate(CATEGORIES, PRODUCTS, PRODUCT)
+
+
+@receiver(post_save, sender=AttributeValue)
+@receiver(post_delete, sender=AttributeValue)
+def invalidate_attribute_value(sender, **kwargs):
+    # O detalhe lista os atributos; a listagem filtra por eles
+    invalidate(PRODUCTS, PRODUCT)
+
+
+@receiver(post_save, sender=SiteSettings)
+@receiver(post_delete, sender=SiteSettings)
+def invalidate_site_settings(sender, **kwargs):
+    invalidate(SITE_SETTINGS)
@@ -0,0 +1,222 @@
+import bisect
+import math
+import re
+import threading
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.functions import Cast
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework import filters
+
+from .models import Product
+
+
+# --- NORMALIZAÇÃO DE TEXTO ---
+STOPWORDS = {
+    'a', 'o', 'as', 'os', 'e', 'de', 'da', 'do', 'das', 'dos', 'em', 'no', 'na',
+    'nos', 'nas', 'um', 'uma', 'com', 'para', 'por', 'que', 'se', 'ao', 'este', 'esta',
+}
+
+# Sufixos de plural mais comuns em português (ordem importa: o mais longo primeiro)
+PLURAL_SUFFIXES = (
+    ('oes', 'ao'), ('aes', 'ao'), ('ais', 'al'), ('eis', 'el'), ('ois', 'ol'),
+    ('ns', 'm'), ('res', 'r'), ('zes', 'z'), ('ses', 's'), ('s', ''),
+)
+
+WORD_RE = re.compile(r'\w+')
+
+
+def fold(text):
+    """Minúsculas e sem acentos: 'Anéis' -> 'aneis'."""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def stem(word):
+    """Stemmer leve: só reduz plurais, o suficiente para 'aneis' achar 'anel'."""
+    if len(word) <= 3:
+        return word
+    for suffix, replacement in PLURAL_SUFFIXES:
+        if word.endswith(suffix):
+            return word[:-len(suffix)] + replacement
+    return word
+
+
+def tokenize(text):
+    return [stem(word) for word in WORD_RE.findall(fold(text)) if word not in STOPWORDS]
+
+
+# --- ÍNDICE INVERTIDO EM MEMÓRIA (FALLBACK PARA SQLITE) ---
+class InvertedIndex:
+    """
+    Índice termo -> {produto: peso}, usado quando o banco não é Postgres.
+    Termos do nome pesam mais que os da descrição (como os pesos A/B do tsvector).
+    """
+    NAME_WEIGHT = 3.0
+    DESCRIPTION_WEIGHT = 1.0
+
+    def __init__(self):
+        self.postings = {}
+        self.doc_terms = {}
+        self.vocabulary = []
+        self.lock = threading.Lock()
+
+    def add(self, product_id, name, description):
+        weights = {}
+        for term in tokenize(name):
+            weights[term] = weights.get(term, 0) + self.NAME_WEIGHT
+        for term in tokenize(description):
+            weights[term] = weights.get(term, 0) + self.DESCRIPTION_WEIGHT
+
+        with self.lock:
+            self._remove(product_id)
+            for term, weight in weights.items():
+                if term not in self.postings:
+                    self.postings[term] = {}
+                    bisect.insort(self.vocabulary, term)
+                self.postings[term][product_id] = weight
+            self.doc_terms[product_id] = list(weights)
+
+    def remove(self, product_id):
+        with self.lock:
+            self._remove(product_id)
+
+    def _remove(self, product_id):
+        for term in self.doc_terms.pop(product_id, []):
+            postings = self.postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(product_id, None)
+            if not postings:
+                del self.postings[term]
+                del self.vocabulary[bisect.bisect_left(self.vocabulary, term)]
+
+    def _expand(self, prefix):
+        """Termos do vocabulário que começam com o prefixo (busca binária)."""
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + '\uffff')
+        return self.vocabulary[start:end]
+
+    def search(self, text, limit=1000):
+        """Devolve [(product_id, score)] com todos os termos presentes (AND), melhor primeiro."""
+        words = [word for word in WORD_RE.findall(fold(text)) if word not in STOPWORDS]
+        if not words:
+            return []
+
+        with self.lock:
+            total = max(len(self.doc_terms), 1)
+            scores = None
+            for position, word in enumerate(words):
+                terms = {stem(word)}
+                # A última palavra pode estar incompleta (digitação ao vivo)
+                if position == len(words) - 1:
+                    terms.update(self._expand(word))
+                    terms.update(self._expand(stem(word)))
+
+                matches = {}
+                for term in terms:
+                    postings = self.postings.get(term, {})
+                    idf = math.log(1 + total / (1 + len(postings)))
+                    for product_id, weight in postings.items():
+                        matches[product_id] = max(matches.get(product_id, 0), weight * idf)
+
+                if scores is None:
+                    scores = matches
+                else:
+                    scores = {pk: scores[pk] + score for pk, score in matches.items() if pk in scores}
+                if not scores:
+                    return []
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return ranked[:limit]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Índice do processo, construído na primeira busca e mantido pelos signals."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = InvertedIndex()
+                for pk, name, description in Product.objects.values_list('id', 'name', 'description').iterator():
+                    index.add(pk, name, description)
+                _index = index
+    return _index
+
+
+def reset_index():
+    """Descarta o índice; a próxima busca reconstrói a partir do banco."""
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def uses_postgres_search():
+    return connection.vendor == 'postgresql'
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    if _index is not None:
+        _index.add(instance.pk, instance.name, instance.description)
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    if _index is not None:
+        _index.remove(instance.pk)
+
+
+# --- FILTRO DO DRF ---
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    Substitui o ILIKE '%termo%' do SearchFilter por busca textual com ranking.
+    Postgres: tsvector com índice GIN e stemming em português.
+    Outros bancos: índice invertido em memória (InvertedIndex).
+    O resultado vem anotado com 'search_rank', usado pela paginação. É um inteiro:
+    o cursor guarda a posição em texto, e um float (o real do ts_rank) não volta
+    igual do texto, pulando ou repetindo produtos entre as páginas.
+    """
+    # Teto de resultados ranqueados no fallback (vira um CASE no SQL)
+    FALLBACK_LIMIT = 1000
+    # ts_rank x RANK_SCALE, arredondado: 6 casas bastam para ordenar
+    RANK_SCALE = 1_000_000
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        if not text:
+            return queryset
+        if uses_postgres_search():
+            return self.filter_postgres(queryset, text)
+        return self.filter_fallback(queryset, text)
+
+    def filter_postgres(self, queryset, text):
+        words = WORD_RE.findall(text)
+        if not words:
+            return queryset.none()
+        # Prefixo em todas as palavras: 'anel sol' casa com 'anel solitário'
+        raw = ' & '.join(f'{word}:*' for word in words)
+        query = SearchQuery(raw, search_type='raw', config='portuguese')
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=Cast(SearchRank('search_vector', query) * Value(float(self.RANK_SCALE)), IntegerField())
+        )
+
+    def filter_fallback(self, queryset, text):
+        ranked = get_index().search(text, limit=self.FALLBACK_LIMIT)
+        if not ranked:
+            return queryset.none()
+        # A posição no ranking (1º = maior): mesma ordem dos scores, sem float no cursor
+        return queryset.filter(pk__in=[pk for pk, _ in ranked]).annotate(
+            search_rank=Case(
+                *[When(pk=pk, then=Value(len(ranked) - position)) for position, (pk, _) in enumerate(ranked)],
+                output_field=IntegerField(),
+            )
+        )
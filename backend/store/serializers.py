@@ -1,5 +1,7 @@
 from django.contrib.auth.password_validation import validate_password
+from django.db import transaction
 from rest_framework import serializers
+from . import images, inventory
 from .models import User, Address, SiteSettings, Category, Product, ProductImage, AttributeValue, CustomRequest, Order, OrderItem
 
 # --- CONFIGURAÇÃO DO SITE ---
@@ -72,16 +74,50 @@ class RegistrationSerializer(serializers.ModelSerializer):
         return user
 
 # --- CATEGORIAS ---
-class CategorySerializer(serializers.ModelSerializer):
-    subcategories = serializers.SerializerMethodField()
+def absolute_uri_builder(context):
+    request = context.get('request')
+    return request.build_absolute_uri if request else None
+
+class CategoryNodeSerializer(serializers.ModelSerializer):
+    """Um nó da árvore, sem filhos (eles são montados por build_category_tree)."""
+    image_srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
-        fields = ['id', 'name', 'slug', 'image', 'parent', 'show_on_home', 'subcategories']
+        fields = ['id', 'name', 'slug', 'image', 'image_srcset', 'parent', 'show_on_home']
+
+    def get_image_srcset(self, obj):
+        return images.srcset(obj.image, obj.image_derivatives, absolute_uri_builder(self.context))
+
+def build_category_tree(categories, context=None):
+    """
+    Monta a árvore aninhada a partir de categorias ordenadas por 'path'
+    (pais sempre vêm antes dos filhos). Nenhuma query extra é feita.
+    Com {'request': ...} no contexto, as URLs das imagens saem absolutas.
+    """
+    nodes = {}
+    roots = []
+    for category in categories:
+        node = dict(CategoryNodeSerializer(category, context=context or {}).data)
+        node['subcategories'] = []
+        nodes[category.id] = node
+        parent = nodes.get(category.parent_id)
+        if parent is not None:
+            parent['subcategories'].append(node)
+        else:
+            roots.append(node)
+    return roots
+
+class CategorySerializer(CategoryNodeSerializer):
+    subcategories = serializers.SerializerMethodField()
+
+    class Meta(CategoryNodeSerializer.Meta):
+        fields = CategoryNodeSerializer.Meta.fields + ['subcategories']
 
     def get_subcategories(self, obj):
-        children = obj.subcategories.all()
-        return CategorySerializer(children, many=True).data
+        # Toda a subárvore numa query só, via path materializado
+        subtree = build_category_tree(obj.get_descendants(include_self=True), self.context)
+        return subtree[0]['subcategories'] if subtree else []
 
 # --- PRODUTOS ---
 class AttributeValueSerializer(serializers.ModelSerializer):
@@ -92,9 +128,14 @@ class AttributeValueSerializer(serializers.ModelSerializer):
         fields = ['id', 'attribute', 'attribute_name', 'value']
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    srcset = serializers.SerializerMethodField()
+
     class Meta:
         model = ProductImage
-        fields = ['id', 'image', 'is_cover']
+        fields = ['id', 'image', 'srcset', 'is_cover']
+
+    def get_srcset(self, obj):
+        return images.srcset(obj.image, obj.derivatives, absolute_uri_builder(self.context))
 
 class ProductSerializer(serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
@@ -134,6 +175,40 @@ class ProductSerializer(serializers.ModelSerializer):
                 ProductImage.objects.create(product=instance, image=image)
         return instance
 
+class ProductListSerializer(serializers.ModelSerializer):
+    """
+    Versão enxuta do produto para listagens (vitrine, categoria, busca).
+    O detalhe completo continua no ProductSerializer.
+    """
+    category_name = serializers.CharField(source='category.name', read_only=True)
+    cover_image = serializers.SerializerMethodField()
+    cover_srcset = serializers.SerializerMethodField()
+
+    # Largura usada nos cards da vitrine (o dobro do tamanho exibido, para telas retina)
+    CARD_WIDTH = 600
+
+    class Meta:
+        model = Product
+        fields = [
+            'id', 'name', 'slug',
+            'base_price', 'promotional_price',
+            'cover_image', 'cover_srcset', 'category_name'
+        ]
+
+    def get_cover_image(self, obj):
+        cover = obj.cover_image
+        if not cover:
+            return None
+        url = images.derivative_url(cover.image, cover.derivatives, width=self.CARD_WIDTH)
+        build_uri = absolute_uri_builder(self.context)
+        return build_uri(url) if build_uri else url
+
+    def get_cover_srcset(self, obj):
+        cover = obj.cover_image
+        if not cover:
+            return {}
+        return images.srcset(cover.image, cover.derivatives, absolute_uri_builder(self.context))
+
 # --- PEDIDOS PERSONALIZADOS ---
 class CustomRequestSerializer(serializers.ModelSerializer):
     user_email = serializers.EmailField(source='user.email', read_only=True)
@@ -153,22 +228,50 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'product_name', 'product_image', 'quantity', 'price']
 
     def get_product_image(self, obj):
-        img = obj.product.images.first()
+        img = obj.product.cover_image
         if img:
-            return img.image.url
+            return images.derivative_url(img.image, img.derivatives)
         return None
 
+class OrderItemInputSerializer(serializers.Serializer):
+    """Linha do carrinho enviada no checkout. O preço vem do banco, nunca do cliente."""
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1)
+    # Ids de AttributeValue da variação (ex: [aro 16]); só para produtos com estoque controlado
+    options = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
-    items_data = serializers.ListField(child=serializers.DictField(), write_only=True)
+    items_data = OrderItemInputSerializer(many=True, write_only=True)
+    customer_email = serializers.SerializerMethodField()
 
     class Meta:
         model = Order
-        fields = ['id', 'customer', 'guest_name', 'guest_email', 'status', 'total', 'created_at', 'address', 'items', 'items_data']
+        fields = ['id', 'customer', 'customer_email', 'guest_name', 'guest_email', 'status', 'total', 'created_at', 'address', 'items', 'items_data']
         extra_kwargs = {
-            'customer': {'read_only': True}
+            'customer': {'read_only': True},
+            # Calculado no banco a partir dos itens
+            'total': {'read_only': True},
         }
 
+    def get_fields(self):
+        fields = super().get_fields()
+        # Só a equipe muda o status: para o cliente, marcar 'paid' confirmaria
+        # as reservas de estoque sem pagamento nenhum
+        request = self.context.get('request')
+        if not (request and request.user.is_staff):
+            fields['status'].read_only = True
+        return fields
+
+    def get_customer_email(self, obj):
+        # customer vem do select_related de with_items()
+        return obj.customer.email if obj.customer else obj.guest_email
+
+    def validate_items_data(self, value):
+        if not value:
+            raise serializers.ValidationError("O pedido precisa de pelo menos um item.")
+        return value
+
     def create(self, validated_data):
         items_payload = validated_data.pop('items_data', [])
         request = self.context.get('request')
@@ -179,15 +282,49 @@ class OrderSerializer(serializers.ModelSerializer):
             if not validated_data.get('guest_email'):
                 validated_data['guest_email'] = request.user.email
 
-        order = Order.objects.create(**validated_data)
-
-        # Cria os itens
-        for item in items_payload:
-            product = Product.objects.get(id=item['product_id'])
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                quantity=item['quantity'],
-                price=item['price']
-            )
-        return order
\ No newline at end of file
+        # Tudo ou nada: um erro em qualquer item desfaz o pedido inteiro
+        with transaction.atomic():
+            products = Product.objects.in_bulk({item['product_id'] for item in items_payload})
+            missing = sorted({item['product_id'] for item in items_payload} - products.keys())
+            if missing:
+                raise serializers.ValidationError({'items_data': f"Produto(s) inexistente(s): {missing}"})
+
+            try:
+                stock_items = inventory.resolve([(item['product_id'], item['options'], item['quantity']) for item in items_payload])
+            except inventory.UnknownVariant as e:
+                raise serializers.ValidationError({'items_data': f"Variação inexistente para o produto {e.args[0]}."})
+
+            order = Order.objects.create(total=0, **validated_data)
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product=products[item['product_id']],
+                    stock_item_id=stock_item_id,
+                    quantity=item['quantity'],
+                    price=products[item['product_id']].current_price,
+                )
+                for item, stock_item_id in zip(items_payload, stock_items)
+            ])
+
+            quantities = {}
+            for item, stock_item_id in zip(items_payload, stock_items):
+                if stock_item_id is not None:
+                    quantities[stock_item_id] = quantities.get(stock_item_id, 0) + item['quantity']
+            try:
+                inventory.reserve(order, quantities)
+            except inventory.InsufficientStock as e:
+                raise serializers.ValidationError({'items_data': f"Estoque insuficiente: {e.shortages}"})
+            order.update_total()
+        # Recarrega com itens/produtos/fotos pré-carregados para a resposta
+        return Order.objects.with_items().get(pk=order.pk)
+
+    def update(self, instance, validated_data):
+        # Itens não mudam depois do checkout
+        validated_data.pop('items_data', None)
+        # Entrar em 'paid'/'shipped'/'delivered' confirma as reservas (signal em store/inventory.py); se uma
+        # reserva vencida não puder ser refeita, nem o status é gravado
+        try:
+            with transaction.atomic():
+                return super().update(instance, validated_data)
+        except inventory.InsufficientStock as e:
+            raise serializers.ValidationError({'status': f"Estoque insuficiente: {e.shortages}"})
\ No newline at end of file
@@ -0,0 +1,195 @@
+import weakref
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import DailyProductSales, DailySales, Order, OrderItem, Product
+
+# Pedidos nesses status não entram nas vendas
+EXCLUDED_STATUSES = ('canceled',)
+LINE_TOTAL = models.ExpressionWrapper(F('price') * F('quantity'), output_field=models.DecimalField(max_digits=12, decimal_places=2))
+
+
+# --- CONSOLIDADO DIÁRIO DE VENDAS ---
+def sales_orders():
+    return Order.objects.exclude(status__in=EXCLUDED_STATUSES)
+
+
+def day_bounds(day):
+    """Início e fim do dia no fuso da loja, para filtrar created_at por faixa (usa o índice)."""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def refresh_day(day):
+    """
+    Recalcula o consolidado de um único dia a partir dos pedidos dele.
+    Idempotente: pode rodar quantas vezes for preciso, em qualquer ordem.
+
+    Refreshes concorrentes do mesmo dia (checkouts simultâneos) fazem fila na trava
+    da linha do dia; quem entra depois agrega já com os pedidos de quem saiu, então
+    o último a gravar nunca grava números velhos nem esbarra nos índices únicos.
+    """
+    start, end = day_bounds(day)
+    with transaction.atomic():
+        # Garante a linha do dia sem IntegrityError e a trava até o fim da transação
+        DailySales.objects.bulk_create([DailySales(date=day)], ignore_conflicts=True)
+        DailySales.objects.select_for_update().get(date=day)
+
+        orders = sales_orders().filter(created_at__gte=start, created_at__lt=end)
+        totals = orders.aggregate(revenue=Sum('total'), orders_count=Count('id'))
+        products = list(
+            OrderItem.objects.filter(order__in=orders)
+            .values('product_id')
+            # Nomes diferentes dos campos: F('quantity') em LINE_TOTAL não pode apontar para a soma
+            .annotate(units=Sum('quantity'), amount=Sum(LINE_TOTAL))
+        )
+        DailyProductSales.objects.filter(date=day).delete()
+        if not totals['orders_count']:
+            DailySales.objects.filter(date=day).delete()
+            return
+        DailySales.objects.filter(date=day).update(
+            revenue=totals['revenue'] or 0,
+            orders_count=totals['orders_count'],
+            items_sold=sum(row['units'] for row in products),
+            updated_at=timezone.now(),
+        )
+        DailyProductSales.objects.bulk_create([
+            DailyProductSales(date=day, product_id=row['product_id'], quantity=row['units'], revenue=row['amount'])
+            for row in products
+        ])
+
+
+def rebuild():
+    """Refaz a tabela inteira com dois GROUP BY. Usado pelo rebuild_sales_rollup."""
+    orders = sales_orders()
+    daily = (
+        orders.annotate(day=TruncDate('created_at')).values('day')
+        .annotate(revenue=Sum('total'), orders_count=Count('id'))
+    )
+    products = (
+        OrderItem.objects.filter(order__in=orders)
+        .annotate(day=TruncDate('order__created_at')).values('day', 'product_id')
+        .annotate(units=Sum('quantity'), amount=Sum(LINE_TOTAL))
+    )
+    items_sold = {}
+    product_rows = []
+    for row in products:
+        items_sold[row['day']] = items_sold.get(row['day'], 0) + row['units']
+        product_rows.append(DailyProductSales(
+            date=row['day'], product_id=row['product_id'], quantity=row['units'], revenue=row['amount'],
+        ))
+    with transaction.atomic():
+        DailyProductSales.objects.all().delete()
+        DailySales.objects.all().delete()
+        DailySales.objects.bulk_create([
+            DailySales(date=row['day'], revenue=row['revenue'] or 0, orders_count=row['orders_count'], items_sold=items_sold.get(row['day'], 0))
+            for row in daily
+        ])
+        DailyProductSales.objects.bulk_create(product_rows, batch_size=1000)
+    return len(daily)
+
+
+def schedule_refresh(order_created_at):
+    """
+    Agenda um único refresh do dia para depois do commit, por transação: o checkout
+    salva o pedido duas vezes e cada item, mas o dia é recalculado uma vez só.
+    robust=True: se o refresh falhar, o erro vai para o log e a resposta segue, já que
+    o pedido está gravado e o consolidado se corrige no próximo refresh ou no rebuild.
+
+    Os dias já agendados ficam na conexão, com referência fraca ao callback: o
+    callback se tira de lá ao rodar, e num rollback o Django descarta o callback
+    e a entrada some junto, sem deixar o dia "agendado" para a próxima transação.
+    """
+    day = timezone.localdate(order_created_at)
+    connection = transaction.get_connection()
+    pending = getattr(connection, 'pending_sales_days', None)
+    if pending is None:
+        pending = connection.pending_sales_days = weakref.WeakValueDictionary()
+    if day in pending:
+        return
+
+    def callback():
+        pending.pop(day, None)
+        refresh_day(day)
+
+    if connection.in_atomic_block:
+        pending[day] = callback
+    transaction.on_commit(callback, robust=True)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+def refresh_order_day(sender, instance, **kwargs):
+    schedule_refresh(instance.created_at)
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def refresh_order_item_day(sender, instance, **kwargs):
+    created_at = Order.objects.filter(pk=instance.order_id).values_list('created_at', flat=True).first()
+    # Sem pedido: foi apagado junto, e o post_delete do Order já cuida do dia
+    if created_at is not None:
+        schedule_refresh(created_at)
+
+
+# --- RESUMO PARA O DASHBOARD ---
+def money(value):
+    return f'{Decimal(value or 0):.2f}'
+
+
+def average(revenue, count):
+    return money(Decimal(revenue) / count if count else 0)
+
+
+def summary(days=30, top=5, today=None):
+    """Números do dashboard, lidos só do consolidado (no máximo 'days' linhas + o ranking)."""
+    today = today or timezone.localdate()
+    first = today - timedelta(days=days - 1)
+    rows = {row.date: row for row in DailySales.objects.filter(date__range=(first, today))}
+
+    series = []
+    for offset in range(days):
+        day = first + timedelta(days=offset)
+        row = rows.get(day)
+        series.append({
+            'date': day.isoformat(),
+            'revenue': money(row.revenue if row else 0),
+            'orders': row.orders_count if row else 0,
+        })
+
+    revenue = sum((row.revenue for row in rows.values()), Decimal(0))
+    orders = sum(row.orders_count for row in rows.values())
+    today_row = rows.get(today)
+    top_products = (
+        DailyProductSales.objects.filter(date__range=(first, today))
+        .values('product_id', 'product__name')
+        .annotate(units=Sum('quantity'), amount=Sum('revenue'))
+        .order_by('-units', '-amount')[:top]
+    )
+    return {
+        'today': {
+            'revenue': money(today_row.revenue if today_row else 0),
+            'orders': today_row.orders_count if today_row else 0,
+            'average_ticket': average(today_row.revenue, today_row.orders_count) if today_row else money(0),
+        },
+        'period': {
+            'days': days,
+            'revenue': money(revenue),
+            'orders': orders,
+            'items_sold': sum(row.items_sold for row in rows.values()),
+            'average_ticket': average(revenue, orders),
+        },
+        'active_products': Product.objects.filter(is_active=True).count(),
+        'series': series,
+        'top_products': [
+            {'id': row['product_id'], 'name': row['product__name'], 'quantity': row['units'], 'revenue': money(row['amount'])}
+            for row in top_products
+        ],
+    }
@@ -0,0 +1,230 @@
+import bisect
+import logging
+import threading
+import time
+from decimal import Decimal
+
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .images import THUMBNAIL_WIDTH
+from .models import Product, ProductImage
+from .search import WORD_RE, fold
+
+logger = logging.getLogger(__name__)
+
+
+# --- ÍNDICE DE PREFIXOS PARA O AUTOCOMPLETE ---
+class PrefixIndex:
+    """
+    Listas ordenadas de chaves normalizadas -> produto, consultadas com bisect.
+    'starts' guarda o nome inteiro ("anel solitario ouro"); 'inner' guarda o
+    nome a partir de cada palavra seguinte ("solitario ouro", "ouro").
+    Quem começa com o termo aparece antes de quem só contém uma palavra com ele.
+    """
+    # Reconstrução completa periódica: cada worker tem seu índice, e saves feitos
+    # em outro processo só chegam aqui por ela
+    MAX_AGE = 300
+
+    def __init__(self):
+        self.starts = []
+        self.inner = []
+        self.entries = {}
+        self.keys = {}
+        self.built_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def make_keys(name):
+        words = WORD_RE.findall(fold(name))
+        return [' '.join(words[i:]) for i in range(len(words))]
+
+    @staticmethod
+    def make_entry(product_id, name, slug, base_price, cover):
+        return {'id': product_id, 'name': name, 'slug': slug, 'base_price': f'{Decimal(str(base_price)):.2f}', 'cover_image': cover}
+
+    def add(self, product_id, name, slug, base_price, cover):
+        """Um produto salvo: insort mantém as listas ordenadas (O(n) por chave)."""
+        keys = self.make_keys(name)
+        entry = self.make_entry(product_id, name, slug, base_price, cover)
+        with self.lock:
+            self._remove(product_id)
+            self.entries[product_id] = entry
+            self.keys[product_id] = keys
+            for position, key in enumerate(keys):
+                bisect.insort(self.starts if position == 0 else self.inner, (key, product_id))
+
+    def extend(self, products):
+        """
+        Carga em lote [(id, nome, slug, preço, capa), ...]: com insort a construção
+        seria O(n²); aqui as chaves entram no fim e as listas são ordenadas uma vez só.
+        """
+        with self.lock:
+            for product_id, name, slug, base_price, cover in products:
+                self._remove(product_id)
+                keys = self.make_keys(name)
+                self.entries[product_id] = self.make_entry(product_id, name, slug, base_price, cover)
+                self.keys[product_id] = keys
+                for position, key in enumerate(keys):
+                    (self.starts if position == 0 else self.inner).append((key, product_id))
+            self.starts.sort()
+            self.inner.sort()
+
+    def set_cover(self, product_id, cover):
+        with self.lock:
+            if product_id in self.entries:
+                self.entries[product_id] = dict(self.entries[product_id], cover_image=cover)
+
+    def remove(self, product_id):
+        with self.lock:
+            self._remove(product_id)
+
+    def _remove(self, product_id):
+        self.entries.pop(product_id, None)
+        for position, key in enumerate(self.keys.pop(product_id, [])):
+            target = self.starts if position == 0 else self.inner
+            i = bisect.bisect_left(target, (key, product_id))
+            if i < len(target) and target[i] == (key, product_id):
+                del target[i]
+
+    def suggest(self, text, limit=5):
+        prefix = ' '.join(WORD_RE.findall(fold(text)))
+        if not prefix:
+            return []
+        found = []
+        seen = set()
+        with self.lock:
+            for target in (self.starts, self.inner):
+                i = bisect.bisect_left(target, (prefix,))
+                while i < len(target) and len(found) < limit:
+                    key, product_id = target[i]
+                    if not key.startswith(prefix):
+                        break
+                    if product_id not in seen:
+                        seen.add(product_id)
+                        # Cópia: quem chama pode ajustar a URL sem mexer no índice
+                        found.append(dict(self.entries[product_id]))
+                    i += 1
+        return found
+
+    def is_stale(self):
+        return time.monotonic() - self.built_at > self.MAX_AGE
+
+
+def cover_urls(product_ids=None):
+    """URL da capa (ou primeira foto) de cada produto, numa única query."""
+    images = ProductImage.objects.order_by('product_id', '-is_cover', 'id')
+    if product_ids is not None:
+        images = images.filter(product_id__in=product_ids)
+    covers = {}
+    storage = ProductImage.image.field.storage
+    for product_id, image, derivatives in images.values_list('product_id', 'image', 'derivatives'):
+        if product_id not in covers and image:
+            # Miniatura de 200px quando já foi gerada; senão o original
+            if (derivatives or {}).get('source') == image:
+                image = derivatives['widths'].get(str(THUMBNAIL_WIDTH), {}).get('jpeg', image)
+            covers[product_id] = storage.url(image)
+    return covers
+
+
+def build_index():
+    index = PrefixIndex()
+    covers = cover_urls()
+    products = Product.objects.values_list('id', 'name', 'slug', 'base_price').iterator()
+    index.extend((pk, name, slug, base_price, covers.get(pk)) for pk, name, slug, base_price in products)
+    return index
+
+
+_index = None
+_index_lock = threading.Lock()
+_rebuild = None
+# Conta as alterações vindas dos signals: uma reconstrução que começou antes de
+# alguma delas é descartada, porque o índice atual já tem a alteração e ela não
+_changes = 0
+
+
+def get_index():
+    """
+    Índice do processo. Só a primeira busca espera a construção; depois de
+    MAX_AGE, quem chega continua usando o índice atual enquanto uma thread
+    monta o novo e troca a referência no fim.
+    """
+    global _index
+    index = _index
+    if index is None:
+        with _index_lock:
+            if _index is None:
+                _index = build_index()
+            return _index
+    if index.is_stale():
+        start_rebuild()
+    return index
+
+
+def start_rebuild():
+    global _rebuild
+    with _index_lock:
+        if _rebuild is not None and _rebuild.is_alive():
+            return
+        _rebuild = threading.Thread(target=rebuild, args=(_changes,), name='store-suggest-index', daemon=True)
+        _rebuild.start()
+
+
+def rebuild(changes):
+    global _index
+    try:
+        index = build_index()
+        with _index_lock:
+            if _index is None:
+                return
+            if changes == _changes:
+                _index = index
+            else:
+                # Tenta de novo daqui a MAX_AGE, não a cada requisição
+                _index.built_at = time.monotonic()
+    except Exception:
+        logger.exception('Falha ao reconstruir o índice do autocomplete; o atual continua em uso')
+        with _index_lock:
+            if _index is not None:
+                _index.built_at = time.monotonic()
+    finally:
+        # A thread abriu conexões próprias
+        connections.close_all()
+
+
+def reset_index():
+    global _index
+    with _index_lock:
+        _index = None
+
+
+def mark_changed():
+    global _changes
+    with _index_lock:
+        _changes += 1
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    mark_changed()
+    if _index is not None:
+        _index.add(
+            instance.pk, instance.name, instance.slug, instance.base_price,
+            cover_urls([instance.pk]).get(instance.pk),
+        )
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    mark_changed()
+    if _index is not None:
+        _index.remove(instance.pk)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def refresh_product_cover(sender, instance, **kwargs):
+    mark_changed()
+    if _index is not None:
+        _index.set_cover(instance.product_id, cover_urls([instance.product_id]).get(instance.product_id))
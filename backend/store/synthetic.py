@@ -0,0 +1,373 @@
+import hashlib
+import math
+import random
+from array import array
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+from PIL import Image, ImageDraw
+
+from . import facets, images, response_cache, search, stats, suggest
+from .models import (
+    AttributeValue, Category, DailyProductSales, Order, OrderItem, Product, ProductAttribute, ProductImage, Profile,
+    StockItem, StockReservation, User,
+)
+
+
+# --- DADOS SINTÉTICOS (manage.py seed_db) ---
+# Gera catálogo, clientes e pedidos sem rede e sempre iguais para a mesma
+# --seed: milhões de linhas com bulk_create em lotes, e as fotos são poucas
+# imagens do Pillow (gravadas uma vez, com as derivadas já prontas) que todos
+# os produtos compartilham. As distribuições imitam uma loja de verdade:
+# poucos produtos e clientes concentram a maior parte das vendas (cauda longa),
+# preços log-normais, pedidos crescendo ao longo do período e mais no fim de semana.
+BATCH_SIZE = 2000
+SEED_DOMAIN = 'seed.example.com'
+SEED_PASSWORD = 'senha123'
+
+HIERARCHY = {
+    'Anéis': ['Solitários', 'Noivado', 'Formatura', 'Falange'],
+    'Colares': ['Correntes', 'Pingentes', 'Gargantilhas'],
+    'Brincos': ['Argolas', 'Cascata', 'Ponto de Luz'],
+    'Pulseiras': ['Riviera', 'Braceletes'],
+    'Alianças': ['Casamento', 'Compromisso'],
+}
+MATERIALS = ['Ouro 18k', 'Prata 925', 'Ouro Branco', 'Ouro Rosé']
+RING_SIZES = [str(size) for size in range(12, 24, 2)]
+ADJECTIVES = ['Eterno', 'Radiante', 'Clássico', 'Moderno', 'Luxuoso', 'Delicado', 'Real', 'Imperial']
+SENTENCES = [
+    'Uma peça exclusiva, feita à mão pelos nossos ourives.',
+    'Acabamento polido e pedras selecionadas uma a uma.',
+    'Perfeita para presentear em datas especiais.',
+    'Acompanha certificado de autenticidade e estojo.',
+    'Garantia vitalícia contra defeitos de fabricação.',
+    'Design atemporal que combina com qualquer ocasião.',
+]
+FIRST_NAMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio', 'Gabriela', 'Heitor', 'Isabela', 'João', 'Larissa', 'Miguel']
+LAST_NAMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Almeida', 'Ferreira', 'Rocha']
+CITIES = ['São Paulo/SP', 'Rio de Janeiro/RJ', 'Belo Horizonte/MG', 'Curitiba/PR', 'Porto Alegre/RS', 'Recife/PE']
+# Status dos pedidos (os pendentes só nos últimos dias)
+STATUS_WEIGHTS = {'delivered': 62, 'shipped': 8, 'paid': 12, 'canceled': 15, 'pending': 3}
+# Quantos itens por pedido / fotos por produto
+ITEMS_PER_ORDER = {1: 60, 2: 25, 3: 10, 4: 5}
+PHOTOS_PER_PRODUCT = {0: 5, 1: 45, 2: 30, 3: 15, 4: 5}
+PALETTE = [(212, 175, 55), (192, 192, 192), (183, 110, 121), (229, 228, 226), (120, 94, 48), (40, 40, 48)]
+
+
+def weighted(rng, options):
+    return rng.choices(list(options), weights=list(options.values()))[0]
+
+
+def popular_index(rng, size, spread):
+    """
+    Índice em [0, size) com cauda longa (~1/posição): poucos muito escolhidos,
+    a maioria raramente. O multiplicador (primo com size) espalha os populares
+    pela tabela, em vez de serem sempre os primeiros ids.
+    """
+    rank = int(size ** rng.random()) - 1
+    return (rank * spread) % size
+
+
+def spread_for(size):
+    spread = 7919
+    while math.gcd(spread, size) != 1:
+        spread += 2
+    return spread
+
+
+def log_normal_price(rng, median=900, sigma=0.9, low=80, high=60000):
+    """Preço em centavos, terminado em 90 (R$ 1.249,90)."""
+    value = min(max(rng.lognormvariate(math.log(median), sigma), low), high)
+    return int(value) * 100 + 90
+
+
+def cents(value):
+    return Decimal(value) / 100
+
+
+def fast_delete(queryset):
+    """
+    DELETE direto no banco, sem carregar as linhas nem disparar signals por
+    linha (com milhões de pedidos, o delete() do ORM levaria horas). Quem
+    chama apaga os dependentes antes e refaz índices/caches/consolidado depois.
+    """
+    return queryset._raw_delete(queryset.db)
+
+
+class SyntheticData:
+    """
+    Um gerador por execução: o rng com a semente vai passando por todas as
+    etapas na mesma ordem (catálogo, clientes, pedidos), e os pedidos
+    referenciam os produtos/clientes criados por índice, sem reler o banco.
+    """
+
+    def __init__(self, seed=42, batch_size=BATCH_SIZE, stdout=None):
+        self.rng = random.Random(seed)
+        self.batch_size = batch_size
+        self.write = stdout.write if stdout else (lambda message: None)
+        self.categories = []
+        self.materials = []
+        self.ring_sizes = []
+        self.placeholders = []
+        # ids e preços (centavos) dos produtos, compactos para milhões de linhas
+        self.product_ids = array('q')
+        self.product_prices = array('q')
+        self.user_ids = array('q')
+        self.reported = {}
+        self.result = {'products': 0, 'images': 0, 'users': 0, 'orders': 0, 'items': 0}
+
+    def run(self, products=30, users=0, orders=0, photos=8, days=365):
+        self.clear()
+        self.create_categories()
+        self.create_attributes()
+        self.create_placeholders(photos)
+        self.create_products(products)
+        self.create_users(users)
+        self.create_orders(orders, days)
+        # bulk_create não dispara signals: índices em memória, cache de respostas e consolidado de vendas
+        for index in (search, suggest, facets):
+            index.reset_index()
+        response_cache.invalidate(response_cache.PRODUCTS, response_cache.PRODUCT, response_cache.CATEGORIES)
+        stats.rebuild()
+        return self.result
+
+    # --- Limpeza ---
+    def clear(self):
+        self.write('A limpar dados antigos...')
+        with transaction.atomic():
+            # Pedidos gerados antes (os reais ficam)
+            seeded = Order.objects.filter(
+                Q(customer__email__endswith=f'@{SEED_DOMAIN}') | Q(guest_email__endswith=f'@{SEED_DOMAIN}')
+            )
+            for queryset in (
+                OrderItem.objects.filter(order__in=seeded), StockReservation.objects.filter(order__in=seeded), seeded,
+                # O catálogo é refeito inteiro (itens de pedido e estoque dos produtos vão junto)
+                OrderItem.objects.all(), StockReservation.objects.all(), StockItem.options.through.objects.all(),
+                StockItem.objects.all(), DailyProductSales.objects.all(), ProductImage.objects.all(),
+                Product.attributes.through.objects.all(), Product.objects.all(),
+            ):
+                fast_delete(queryset)
+            # Poucas linhas: delete() normal, com signals
+            User.objects.filter(email__endswith=f'@{SEED_DOMAIN}').delete()
+            Category.objects.all().delete()
+            ProductAttribute.objects.all().delete()
+
+    # --- Catálogo ---
+    def create_categories(self):
+        self.write('A criar categorias e subcategorias...')
+        # save() individual: mantém o path materializado da árvore (são poucas)
+        for parent_name, children in HIERARCHY.items():
+            parent = Category.objects.create(name=parent_name, slug=slugify(parent_name))
+            self.categories.append(parent)
+            for child_name in children:
+                self.categories.append(Category.objects.create(
+                    name=child_name, slug=slugify(f'{parent_name} {child_name}'), parent=parent,
+                ))
+
+    def create_attributes(self):
+        self.write('A criar atributos...')
+        material = ProductAttribute.objects.create(name='Material', slug='material')
+        size = ProductAttribute.objects.create(name='Aro', slug='aro')
+        self.materials = AttributeValue.objects.bulk_create([AttributeValue(attribute=material, value=v) for v in MATERIALS])
+        self.ring_sizes = AttributeValue.objects.bulk_create([AttributeValue(attribute=size, value=v) for v in RING_SIZES])
+
+    def create_placeholders(self, count):
+        """Fotos de mentira desenhadas com o Pillow; o nome é o hash do conteúdo, então cada uma é gravada uma vez só."""
+        if count <= 0:
+            return
+        self.write(f'A desenhar {count} foto(s)...')
+        storage = ProductImage.image.field.storage
+        for n in range(count):
+            content = self.draw_placeholder(n)
+            name = ProductImage.image.field.generate_filename(
+                None, f'seed/placeholder-{hashlib.sha1(content).hexdigest()[:12]}.jpg',
+            )
+            if name in {known for known, _ in self.placeholders}:
+                continue
+            if not storage.exists(name):
+                name = storage.save(name, ContentFile(content))
+            # As derivadas também são geradas uma vez e copiadas para todas as linhas
+            image = ProductImage(image=name)
+            self.placeholders.append((name, images.generate_derivatives(image.image)))
+
+    def draw_placeholder(self, n, size=800):
+        background = PALETTE[n % len(PALETTE)]
+        metal = PALETTE[(n * 3 + 1) % len(PALETTE)]
+        image = Image.new('RGB', (size, size), background)
+        draw = ImageDraw.Draw(image)
+        # Degradê vertical
+        for y in range(0, size, 4):
+            shade = int(40 * y / size)
+            draw.rectangle([0, y, size, y + 4], fill=tuple(max(c - shade, 0) for c in background))
+        # Um "anel": aro + pedra
+        margin = size // 4 + (n % 5) * 12
+        draw.ellipse([margin, margin, size - margin, size - margin], outline=metal, width=size // 18)
+        stone = size // 10
+        draw.ellipse([size // 2 - stone, margin - stone, size // 2 + stone, margin + stone], fill=(235, 245, 255))
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG', quality=85)
+        return buffer.getvalue()
+
+    def product_name(self, category, number):
+        if category.parent:
+            base = f'{category.parent.name[:-1]} {category.name}'
+        else:
+            base = category.name[:-1] if category.name.endswith('s') else category.name
+        return f'{base} {self.rng.choice(ADJECTIVES)} #{number}'
+
+    def create_products(self, count):
+        self.write(f'A criar {count} produtos...')
+        # Algumas categorias têm muito mais produtos que outras
+        category_weights = [1 / (position + 1) for position in range(len(self.categories))]
+        self.rng.shuffle(category_weights)
+        through = Product.attributes.through
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for number in range(start + 1, min(start + self.batch_size, count) + 1):
+                category = self.rng.choices(self.categories, weights=category_weights)[0]
+                name = self.product_name(category, number)
+                price = log_normal_price(self.rng)
+                promotional = price * self.rng.randint(70, 90) // 100 if self.rng.random() < 0.25 else None
+                batch.append(Product(
+                    name=name, slug=slugify(name), category=category,
+                    description=' '.join(self.rng.sample(SENTENCES, self.rng.randint(1, len(SENTENCES)))),
+                    base_price=cents(price),
+                    promotional_price=cents(promotional) if promotional else None,
+                    is_active=self.rng.random() >= 0.03,
+                    is_featured=self.rng.random() < 0.05,
+                ))
+
+            with transaction.atomic():
+                created = Product.objects.bulk_create(batch)
+                Product.objects.filter(pk__in=[product.pk for product in created]).update_search_vector()
+                links, photos = [], []
+                for product in created:
+                    self.product_ids.append(product.pk)
+                    current = product.promotional_price if product.promotional_price is not None else product.base_price
+                    self.product_prices.append(int(current * 100))
+                    links.append(through(product_id=product.pk, attributevalue_id=self.rng.choice(self.materials).pk))
+                    root = (product.category.parent or product.category).name
+                    if root in ('Anéis', 'Alianças'):
+                        for value in self.rng.sample(self.ring_sizes, self.rng.randint(3, len(self.ring_sizes))):
+                            links.append(through(product_id=product.pk, attributevalue_id=value.pk))
+                    if self.placeholders:
+                        chosen = self.rng.sample(self.placeholders, min(weighted(self.rng, PHOTOS_PER_PRODUCT), len(self.placeholders)))
+                        for position, (name, derivatives) in enumerate(chosen):
+                            photos.append(ProductImage(
+                                product_id=product.pk, image=name, is_cover=position == 0, derivatives=derivatives,
+                            ))
+                through.objects.bulk_create(links, batch_size=self.batch_size)
+                ProductImage.objects.bulk_create(photos, batch_size=self.batch_size)
+            self.result['products'] += len(created)
+            self.result['images'] += len(photos)
+            self.progress('produtos', self.result['products'], count)
+
+    # --- Clientes ---
+    def create_users(self, count):
+        if count <= 0:
+            return
+        self.write(f'A criar {count} clientes...')
+        # Um hash só: calcular o PBKDF2 por usuário levaria horas com milhões
+        password = make_password(SEED_PASSWORD, salt='seeddb')
+        for start in range(0, count, self.batch_size):
+            batch = []
+            for number in range(start + 1, min(start + self.batch_size, count) + 1):
+                first, last = self.rng.choice(FIRST_NAMES), self.rng.choice(LAST_NAMES)
+                batch.append(User(
+                    username=f'cliente-{number:07d}', email=f'cliente-{number:07d}@{SEED_DOMAIN}',
+                    first_name=first, last_name=last, password=password,
+                    phone=f'(11) 9{self.rng.randint(1000, 9999)}-{self.rng.randint(1000, 9999)}',
+                ))
+            with transaction.atomic():
+                created = User.objects.bulk_create(batch)
+                # O post_save que cria o Profile não roda no bulk_create
+                Profile.objects.bulk_create([Profile(user_id=user.pk, phone=user.phone) for user in created])
+            self.user_ids.extend(user.pk for user in created)
+            self.result['users'] += len(created)
+            self.progress('clientes', self.result['users'], count)
+
+    # --- Pedidos ---
+    def orders_per_day(self, count, days):
+        """Divide os pedidos pelos dias: crescimento ao longo do período e fim de semana mais forte."""
+        today = timezone.localdate()
+        dates = [today - timedelta(days=offset) for offset in range(days - 1, -1, -1)]
+        weights = [(1 + position / days) * (1.3 if day.weekday() >= 5 else 1) for position, day in enumerate(dates)]
+        total = sum(weights)
+        exact = [count * weight / total for weight in weights]
+        counts = [int(value) for value in exact]
+        # Maiores restos primeiro, até fechar o total
+        for position in sorted(range(days), key=lambda i: exact[i] - counts[i], reverse=True)[:count - sum(counts)]:
+            counts[position] += 1
+        return list(zip(dates, counts))
+
+    def create_orders(self, count, days):
+        if count <= 0 or not self.product_ids:
+            return
+        self.write(f'A criar {count} pedidos em {days} dias...')
+        today = timezone.localdate()
+        product_spread = spread_for(len(self.product_ids))
+        user_spread = spread_for(len(self.user_ids)) if self.user_ids else 1
+        for day, day_count in self.orders_per_day(count, max(days, 1)):
+            # Alguns horários por dia (o created_at é gravado por lote, depois do insert)
+            chunk = max(1, min(self.batch_size, math.ceil(day_count / 4)))
+            # Uma transação por dia: com poucos pedidos por lote, o custo é o commit
+            with transaction.atomic():
+                for start in range(0, day_count, chunk):
+                    size = min(chunk, day_count - start)
+                    moment = timezone.make_aware(datetime.combine(day, time(self.rng.randint(8, 22), self.rng.randint(0, 59))))
+                    self.create_order_batch(size, moment, recent=(today - day).days < 3,
+                                            product_spread=product_spread, user_spread=user_spread)
+            self.progress('pedidos', self.result['orders'], count)
+
+    def create_order_batch(self, size, moment, recent, product_spread, user_spread):
+        orders, lines = [], []
+        statuses = {status: weight for status, weight in STATUS_WEIGHTS.items() if recent or status != 'pending'}
+        for _ in range(size):
+            items = {}
+            for _ in range(weighted(self.rng, ITEMS_PER_ORDER)):
+                position = popular_index(self.rng, len(self.product_ids), product_spread)
+                items[position] = items.get(position, 0) + (1 if self.rng.random() < 0.85 else 2)
+            total = sum(self.product_prices[position] * quantity for position, quantity in items.items())
+            city = self.rng.choice(CITIES)
+            address = f'Rua {self.rng.choice(LAST_NAMES)}, {self.rng.randint(1, 2000)} - {city}'
+            status = weighted(self.rng, statuses)
+            if self.user_ids and self.rng.random() < 0.8:
+                customer_id = self.user_ids[popular_index(self.rng, len(self.user_ids), user_spread)]
+                orders.append(Order(customer_id=customer_id, address=address, status=status, total=cents(total)))
+            else:
+                name = f'{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}'
+                orders.append(Order(
+                    guest_name=name, guest_email=f'{slugify(name)}-{self.rng.randint(1, 10 ** 6)}@{SEED_DOMAIN}',
+                    address=address, status=status, total=cents(total),
+                ))
+            lines.append(items)
+
+        created = Order.objects.bulk_create(orders)
+        ids = [order.pk for order in created]
+        # auto_now_add ignora o valor do objeto: a data do pedido vai num UPDATE
+        # (ids contíguos: o seed roda sozinho, ninguém mais insere pedidos no meio)
+        Order.objects.filter(pk__gte=min(ids), pk__lte=max(ids)).update(created_at=moment)
+        items = [
+            OrderItem(
+                order_id=order.pk, product_id=self.product_ids[position],
+                quantity=quantity, price=cents(self.product_prices[position]),
+            )
+            for order, order_lines in zip(created, lines)
+            for position, quantity in order_lines.items()
+        ]
+        OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+        self.result['orders'] += len(created)
+        self.result['items'] += len(items)
+
+    def progress(self, label, done, total):
+        # A cada ~25 lotes, e no fim
+        if done == total or done >= self.reported.get(label, 0) + self.batch_size * 25:
+            self.reported[label] = done
+            self.write(f'  {label}: {done}/{total}')
@@ -0,0 +1,149 @@
+import logging
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .db_router import use_primary
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+# --- FILA DE TAREFAS (BANCO DE DADOS) ---
+def task(func=None, *, max_attempts=3):
+    """
+    Marca uma função como tarefa. Ela passa a poder ser enfileirada com
+    enqueue(func, **kwargs) e será chamada pelo worker com os mesmos kwargs,
+    que precisam ser serializáveis em JSON.
+    """
+    def decorator(func):
+        func.task_name = f'{func.__module__}.{func.__qualname__}'
+        func.max_attempts = max_attempts
+        return func
+    return decorator(func) if func else decorator
+
+
+def enqueue(func, key=None, delay=None, **payload):
+    """
+    Grava a tarefa na fila. Como é só um INSERT, participa da transação da
+    requisição: se ela der rollback, a tarefa some junto.
+
+    Com 'key', a tarefa é idempotente: se já existir uma com a mesma chave,
+    a existente é devolvida e nada novo é enfileirado.
+    """
+    if getattr(settings, 'TASKS_ALWAYS_EAGER', False):
+        func(**payload)
+        return None
+
+    fields = {
+        'name': func.task_name,
+        'payload': payload,
+        'max_attempts': func.max_attempts,
+        'run_after': timezone.now() + (delay or timedelta()),
+    }
+    if key is None:
+        return Task.objects.create(**fields)
+    try:
+        # Savepoint: a violação da unique não pode estragar a transação de quem chamou
+        with transaction.atomic():
+            return Task.objects.create(idempotency_key=key, **fields)
+    except IntegrityError:
+        return Task.objects.get(idempotency_key=key)
+
+
+def claim(limit, lock_timeout):
+    """
+    Reserva até 'limit' tarefas prontas e devolve seus ids.
+    No Postgres usa SELECT ... FOR UPDATE SKIP LOCKED, então vários workers
+    não disputam as mesmas linhas. Em bancos sem isso (SQLite) o UPDATE
+    condicional em status garante que cada tarefa é reservada uma vez só.
+
+    Uma tarefa "running" sem sinal de vida (locked_at) há mais de lock_timeout
+    é dada como abandonada: volta para a fila, ou falha se já gastou as
+    tentativas. O run_task renova o locked_at enquanto a tarefa roda, então
+    só uma tarefa cujo worker morreu (ou travou) é executada de novo; por
+    isso as tarefas precisam ser idempotentes.
+    """
+    now = timezone.now()
+    stale = Task.objects.filter(status=Task.STATUS_RUNNING, locked_at__lt=now - lock_timeout)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Task.STATUS_FAILED, locked_at=None, finished_at=now,
+        last_error='Abandonada (sem sinal do worker) e sem tentativas restantes',
+    )
+    stale.update(status=Task.STATUS_PENDING, locked_at=None)
+    with transaction.atomic():
+        ids = list(
+            Task.objects.select_for_update(skip_locked=True)
+            .filter(status=Task.STATUS_PENDING, run_after__lte=now)
+            .order_by('run_after', 'id')
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        Task.objects.filter(id__in=ids, status=Task.STATUS_PENDING).update(
+            status=Task.STATUS_RUNNING, locked_at=now, attempts=F('attempts') + 1,
+        )
+        return list(Task.objects.filter(id__in=ids, status=Task.STATUS_RUNNING, locked_at=now).values_list('id', flat=True))
+
+
+def retry_delay(attempts):
+    """Backoff exponencial: 30s, 2min, 8min... com teto de 1h."""
+    return timedelta(seconds=min(30 * 4 ** (attempts - 1), 3600))
+
+
+def keep_alive(task_id, interval, stop):
+    """Renova o locked_at a cada 'interval' até 'stop', para o claim() não achar que a tarefa foi abandonada."""
+    try:
+        while not stop.wait(interval.total_seconds()):
+            Task.objects.filter(pk=task_id, status=Task.STATUS_RUNNING).update(locked_at=timezone.now())
+    finally:
+        # Conexão própria desta thread
+        connection.close()
+
+
+@use_primary()
+def run_task(task_id, heartbeat=None):
+    """
+    Executa uma tarefa já reservada. Roda dentro de uma thread ou processo do pool.
+    Lê tudo do primário: a tarefa costuma vir logo depois da escrita que a
+    enfileirou, e a réplica pode ainda não ter a linha.
+    Com 'heartbeat' (timedelta, bem menor que o lock_timeout do claim), uma
+    thread renova o locked_at enquanto a tarefa roda.
+    """
+    close_old_connections()
+    stop = threading.Event()
+    if heartbeat:
+        threading.Thread(target=keep_alive, args=(task_id, heartbeat, stop), name='store-task-heartbeat', daemon=True).start()
+    try:
+        current = Task.objects.get(pk=task_id)
+        try:
+            func = import_string(current.name)
+            if not getattr(func, 'task_name', None):
+                raise ValueError(f'{current.name} não é uma tarefa registrada com @task')
+            func(**current.payload)
+        except Exception:
+            error = traceback.format_exc()
+            logger.exception('Tarefa %s (%s) falhou', current.pk, current.name)
+            if current.attempts < current.max_attempts:
+                Task.objects.filter(pk=task_id).update(
+                    status=Task.STATUS_PENDING, locked_at=None, last_error=error,
+                    run_after=timezone.now() + retry_delay(current.attempts),
+                )
+            else:
+                Task.objects.filter(pk=task_id).update(
+                    status=Task.STATUS_FAILED, locked_at=None, last_error=error, finished_at=timezone.now(),
+                )
+            return False
+        Task.objects.filter(pk=task_id).update(
+            status=Task.STATUS_DONE, locked_at=None, finished_at=timezone.now(),
+        )
+        return True
+    finally:
+        stop.set()
+        close_old_connections()
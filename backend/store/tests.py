@@ -1,3 +1,1684 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Sum
+from django.test import (
+    AsyncClient, AsyncRequestFactory, LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import bench, db_router, exports, facets, images, inventory, metrics, profiling, response_cache, search, stats, suggest, tasks
+from .authentication import user_cache
+from .models import (
+    User, Profile, SiteSettings, Category, Product, ProductAttribute, AttributeValue, ProductImage, Order, OrderItem, Task,
+    StockItem, StockReservation, DailySales, DailyProductSales,
+)
+
+
+# --- CONTAGEM DE QUERIES DO CATÁLOGO ---
+class ProductQueryCountTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Anéis')
+        attribute = ProductAttribute.objects.create(name='Material', slug='material')
+        self.gold = AttributeValue.objects.create(attribute=attribute, value='Ouro 18k')
+
+    def make_products(self, count):
+        for i in range(count):
+            product = Product.objects.create(
+                name=f'Anel {Product.objects.count()}',
+                description='Peça de teste',
+                base_price=100,
+                category=self.category,
+            )
+            product.attributes.add(self.gold)
+            ProductImage.objects.create(product=product, image=f'products/{i}.jpg', is_cover=True)
+            ProductImage.objects.create(product=product, image=f'products/{i}-b.jpg')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_listing_query_count_is_constant(self):
+        self.make_products(2)
+        few = self.count_queries('/api/products/')
+        self.make_products(20)
+        many = self.count_queries('/api/products/')
+        self.assertEqual(few, many)
+
+    def test_detail_prefetches_images_and_attributes(self):
+        self.make_products(1)
+        product = Product.objects.get()
+        # updated_at (ETag) + produto + imagens + atributos (com o nome do atributo via JOIN)
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/products/{product.id}/')
+        self.assertEqual(response.data['attributes'][0]['attribute_name'], 'Material')
+        self.assertTrue(response.data['images'][0]['is_cover'])
+
+
+# --- PAGINAÇÃO DO CATÁLOGO ---
+class ProductPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name='Anéis')
+        Product.objects.bulk_create(
+            Product(name=f'Anel {i}', slug=f'anel-{i}', description='Peça de teste', base_price=100, category=category)
+            for i in range(30)
+        )
+        # Empates em created_at: o desempate por id é o que mantém as páginas estáveis
+        Product.objects.update(created_at=timezone.now())
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids += [p['id'] for p in response.data['results']]
+            url = response.data['next']
+        return ids
+
+    def test_default_and_requested_page_sizes(self):
+        data = self.client.get('/api/products/').data
+        self.assertEqual(len(data['results']), 24)
+        self.assertEqual(len(self.client.get('/api/products/', {'page_size': 5}).data['results']), 5)
+        self.assertEqual(len(self.client.get('/api/products/', {'page_size': 1000}).data['results']), 30)
+
+    def test_pages_follow_a_stable_order_without_gaps_or_repeats(self):
+        ids = self.walk('/api/products/?page_size=7')
+        self.assertEqual(ids, sorted(Product.objects.values_list('id', flat=True), reverse=True))
+        self.assertEqual(self.walk('/api/products/?page_size=7'), ids)
+
+    def test_next_is_a_cursor_url_that_keeps_the_filters(self):
+        Product.objects.filter(id__in=Product.objects.order_by('id').values('id')[:10]).update(promotional_price=80)
+        data = self.client.get('/api/products/', {'promotional_price__gt': 0, 'page_size': 4}).data
+        self.assertIn('cursor=', data['next'])
+        self.assertIn('promotional_price__gt=0', data['next'])
+        self.assertIsNone(data['previous'])
+        self.assertEqual(len(self.walk(data['next'])) + 4, 10)
+
+        last = self.client.get('/api/products/', {'page_size': 30}).data
+        self.assertIsNone(last['next'])
+
+
+# --- ÁRVORE DE CATEGORIAS ---
+class CategoryTreeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.rings = Category.objects.create(name='Anéis')
+        self.solitaires = Category.objects.create(name='Solitários', parent=self.rings)
+        self.classic = Category.objects.create(name='Clássicos', parent=self.solitaires)
+        self.necklaces = Category.objects.create(name='Colares', show_on_home=True)
+
+    def test_paths_are_materialized(self):
+        self.classic.refresh_from_db()
+        self.assertEqual(self.classic.depth, 2)
+        self.assertEqual(self.classic.path, f'{self.solitaires.path}{self.classic.pk:08d}/')
+        self.assertTrue(self.classic.path.startswith(self.rings.path))
+
+    def test_moving_a_category_moves_its_subtree(self):
+        self.solitaires.parent = self.necklaces
+        self.solitaires.save()
+        self.classic.refresh_from_db()
+        self.assertTrue(self.classic.path.startswith(self.necklaces.path))
+        self.assertEqual(self.classic.depth, 2)
+
+    def test_tree_is_loaded_in_one_query_and_cached(self):
+        # A árvore + a versão das categorias (ETag)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/categories/')
+        self.assertEqual([node['name'] for node in response.data], ['Anéis', 'Colares'])
+        self.assertEqual(response.data[0]['subcategories'][0]['subcategories'][0]['name'], 'Clássicos')
+        with self.assertNumQueries(0):
+            self.client.get('/api/categories/')
+
+    def test_image_urls_are_absolute_per_host(self):
+        Category.objects.filter(pk=self.classic.pk).update(image='categories/classicos.jpg')
+        for path in ('/api/categories/', '/api/async/categories/'):
+            cache.clear()
+            for host in ('loja.example.com', 'testserver'):
+                tree = self.client.get(path, HTTP_HOST=host).json()
+                self.assertEqual(
+                    tree[0]['subcategories'][0]['subcategories'][0]['image'],
+                    f'http://{host}/media/categories/classicos.jpg',
+                )
+        detail = self.client.get(f'/api/categories/{self.rings.pk}/').json()
+        self.assertEqual(detail['subcategories'][0]['subcategories'][0]['image'], 'http://testserver/media/categories/classicos.jpg')
+
+    def test_saving_a_category_invalidates_the_cache(self):
+        self.client.get('/api/categories/')
+        Category.objects.create(name='Brincos')
+        response = self.client.get('/api/categories/')
+        self.assertIn('Brincos', [node['name'] for node in response.data])
+
+    def test_filters_apply_to_roots(self):
+        response = self.client.get('/api/categories/?show_on_home=true')
+        self.assertEqual([node['name'] for node in response.data], ['Colares'])
+
+    def test_category_tree_filter_includes_descendants(self):
+        for category in (self.rings, self.classic, self.necklaces):
+            Product.objects.create(name=f'Peça {category.name}', description='x', base_price=10, category=category)
+        response = self.client.get('/api/products/?category_tree=aneis')
+        self.assertEqual(
+            sorted(p['category_name'] for p in response.data['results']),
+            ['Anéis', 'Clássicos'],
+        )
+        response = self.client.get('/api/products/?category_tree=nao-existe')
+        self.assertEqual(response.data['results'], [])
+
+
+# --- BUSCA TEXTUAL ---
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        search.reset_index()
+        self.client = APIClient()
+        category = Category.objects.create(name='Joias')
+        self.solitaire = Product.objects.create(
+            name='Anel Solitário Ouro', description='Peça clássica.', base_price=100, category=category)
+        self.necklace = Product.objects.create(
+            name='Colar Riviera', description='Combina com anéis de ouro.', base_price=100, category=category)
+        Product.objects.create(name='Brinco Argola', description='Prata 925.', base_price=100, category=category)
+
+    def search(self, term):
+        response = self.client.get('/api/products/', {'search': term})
+        self.assertEqual(response.status_code, 200)
+        return [p['name'] for p in response.data['results']]
+
+    def test_name_matches_rank_above_description_matches(self):
+        self.assertEqual(self.search('ouro'), ['Anel Solitário Ouro', 'Colar Riviera'])
+
+    def test_accents_plurals_and_prefixes(self):
+        self.assertEqual(self.search('aneis'), ['Anel Solitário Ouro', 'Colar Riviera'])
+        self.assertEqual(self.search('solit'), ['Anel Solitário Ouro'])
+        self.assertEqual(self.search('prata argola'), ['Brinco Argola'])
+        self.assertEqual(self.search('esmeralda'), [])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.search('ouro')
+        self.necklace.delete()
+        self.solitaire.name = 'Anel Solitário Esmeralda'
+        self.solitaire.save()
+        self.assertEqual(self.search('ouro'), [])
+        self.assertEqual(self.search('esmeralda'), ['Anel Solitário Esmeralda'])
+
+    def test_ranked_pages_neither_skip_nor_repeat(self):
+        category = Category.objects.get()
+        for i in range(7):
+            Product.objects.create(name=f'Pulseira {i}', description='ouro ' * (i % 3 + 1), base_price=100, category=category)
+        expected = self.search('ouro')
+        self.assertEqual(len(expected), 9)
+
+        names, url = [], '/api/products/?search=ouro&page_size=2'
+        while url:
+            data = self.client.get(url).data
+            names += [p['name'] for p in data['results']]
+            url = data['next']
+        self.assertEqual(names, expected)
+
+
+# --- AUTOCOMPLETE ---
+class ProductSuggestTests(TestCase):
+    def setUp(self):
+        suggest.reset_index()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Joias')
+        self.ring = Product.objects.create(
+            name='Anel Solitário', description='x', base_price=100, category=self.category)
+        Product.objects.create(name='Aliança Clássica', description='x', base_price=100, category=self.category)
+        Product.objects.create(name='Colar Anel de Prata', description='x', base_price=100, category=self.category)
+
+    def names(self, q, **params):
+        response = self.client.get('/api/products/suggest/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data]
+
+    def test_name_start_matches_come_first(self):
+        self.assertEqual(self.names('anel'), ['Anel Solitário', 'Colar Anel de Prata'])
+        self.assertEqual(self.names('a', limit=1), ['Aliança Clássica'])
+        self.assertEqual(self.names('solitario'), ['Anel Solitário'])
+
+    def test_index_is_served_from_memory_and_updated_on_save(self):
+        self.names('anel')
+        with self.assertNumQueries(0):
+            self.names('anel')
+        Product.objects.create(name='Anel Formatura', description='x', base_price=100, category=self.category)
+        ProductImage.objects.create(product=self.ring, image='products/anel.jpg', is_cover=True)
+        response = self.client.get('/api/products/suggest/', {'q': 'anel'})
+        self.assertEqual([item['name'] for item in response.data][:2], ['Anel Formatura', 'Anel Solitário'])
+        self.assertTrue(response.data[1]['cover_image'].endswith('/media/products/anel.jpg'))
+
+    def test_bulk_build_matches_one_by_one_inserts(self):
+        rows = [(i, f'Anel {name} {i}', f'anel-{i}', 100, None) for i, name in enumerate(['Ouro', 'Prata', 'Aro', 'Ouro Branco'] * 5)]
+        random.Random(1).shuffle(rows)
+        bulk, single = suggest.PrefixIndex(), suggest.PrefixIndex()
+        bulk.extend(rows)
+        for row in rows:
+            single.add(*row)
+        self.assertEqual((bulk.starts, bulk.inner, bulk.entries), (single.starts, single.inner, single.entries))
+        self.assertEqual([item['id'] for item in bulk.suggest('ouro', limit=3)], [0, 12, 16])
+
+    def test_stale_index_is_rebuilt_in_the_background(self):
+        stale = suggest.get_index()
+        stale.built_at -= stale.MAX_AGE + 1
+        release, fresh = threading.Event(), suggest.PrefixIndex()
+
+        def slow_build():
+            release.wait(5)
+            return fresh
+
+        original, suggest.build_index = suggest.build_index, slow_build
+        try:
+            with self.assertNumQueries(0):
+                self.assertIs(suggest.get_index(), stale)
+                self.assertIs(suggest.get_index(), stale)
+            release.set()
+            suggest._rebuild.join(5)
+        finally:
+            suggest.build_index = original
+        self.assertIs(suggest.get_index(), fresh)
+
+
+# --- FACETAS ---
+class ProductFacetTests(TestCase):
+    def setUp(self):
+        facets.reset_index()
+        search.reset_index()
+        self.client = APIClient()
+        category = Category.objects.create(name='Anéis')
+        material = ProductAttribute.objects.create(name='Material', slug='material')
+        size = ProductAttribute.objects.create(name='Aro', slug='aro')
+        self.gold = AttributeValue.objects.create(attribute=material, value='Ouro 18k')
+        self.silver = AttributeValue.objects.create(attribute=material, value='Prata 925')
+        self.size16 = AttributeValue.objects.create(attribute=size, value='16')
+        self.products = {}
+        for name, values in [('A', [self.gold, self.size16]), ('B', [self.gold]), ('C', [self.silver, self.size16])]:
+            product = Product.objects.create(name=name, description='x', base_price=10, category=category)
+            product.attributes.add(*values)
+            self.products[name] = product
+
+    def names(self, **params):
+        response = self.client.get('/api/products/', params)
+        return sorted(p['name'] for p in response.data['results'])
+
+    def counts(self, **params):
+        response = self.client.get('/api/products/facets/', params)
+        self.assertEqual(response.status_code, 200)
+        return {v['value']: v['count'] for facet in response.data for v in facet['values']}
+
+    def test_or_within_attribute_and_across_attributes(self):
+        ids = f'{self.gold.id},{self.silver.id}'
+        self.assertEqual(self.names(attributes=ids), ['A', 'B', 'C'])
+        self.assertEqual(self.names(attributes=f'{ids},{self.size16.id}'), ['A', 'C'])
+        self.assertEqual(self.names(attributes=f'{self.gold.id},{self.size16.id}', attributes_match='all'), ['A'])
+        self.assertEqual(self.names(attributes=f'{self.silver.id},{self.size16.id}', attributes_match='any'), ['A', 'C'])
+
+    def test_counts_ignore_own_attribute_selection(self):
+        self.assertEqual(self.counts(), {'Ouro 18k': 2, 'Prata 925': 1, '16': 2})
+        self.assertEqual(self.counts(attributes=self.gold.id), {'Ouro 18k': 2, 'Prata 925': 1, '16': 1})
+        self.assertEqual(self.counts(search='b'), {'Ouro 18k': 1, 'Prata 925': 0, '16': 0})
+
+    def test_counts_follow_m2m_changes(self):
+        self.counts()
+        self.products['B'].attributes.add(self.size16)
+        self.products['C'].delete()
+        self.assertEqual(self.counts(), {'Ouro 18k': 2, 'Prata 925': 0, '16': 2})
+
+    def test_stale_index_is_served_while_rebuilding_and_changes_win(self):
+        stale = facets.get_index()
+        stale.built_at -= stale.MAX_AGE + 1
+        release = threading.Event()
+
+        def slow_build():
+            release.wait(5)
+            return facets.FacetIndex()
+
+        original = facets.FacetIndex.__dict__['build']
+        facets.FacetIndex.build = staticmethod(slow_build)
+        try:
+            self.assertIs(facets.get_index(), stale)
+            # Alteração durante a reconstrução: o índice montado antes dela é descartado
+            self.products['B'].attributes.add(self.size16)
+            release.set()
+            facets._rebuild.join(5)
+        finally:
+            facets.FacetIndex.build = original
+        self.assertIs(facets.get_index(), stale)
+        self.assertFalse(stale.is_stale())
+        self.assertEqual(self.counts()['16'], 3)
+
+
+# --- DERIVADAS DE IMAGEM ---
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        buffer = BytesIO()
+        Image.new('RGBA', (800, 1000), (212, 175, 55, 255)).save(buffer, 'PNG')
+        category = Category.objects.create(name='Anéis')
+        product = Product.objects.create(name='Anel', description='x', base_price=10, category=category)
+        self.image = ProductImage.objects.create(
+            product=product, image=SimpleUploadedFile('anel.png', buffer.getvalue()), is_cover=True)
+
+    def test_generates_resized_webp_and_jpeg_without_upscaling(self):
+        # O save() de novo não duplica: a chave de idempotência é a mesma
+        ProductImage.objects.get(pk=self.image.pk).save()
+        self.assertEqual(Task.objects.filter(name='store.images.process_model_image').count(), 1)
+
+        for task_id in tasks.claim(10, timedelta(minutes=5)):
+            self.assertTrue(tasks.run_task(task_id))
+        self.image.refresh_from_db()
+        widths = self.image.derivatives['widths']
+        self.assertEqual(sorted(widths, key=int), ['200', '600'])
+        with Image.open(self.image.image.storage.path(widths['200']['jpeg'])) as thumb:
+            self.assertEqual(thumb.size, (200, 250))
+            self.assertEqual(thumb.format, 'JPEG')
+
+        response = APIClient().get('/api/products/')
+        cover = response.data['results'][0]
+        self.assertTrue(cover['cover_image'].endswith('anel-png-600.jpeg'))
+        self.assertIn('200w', cover['cover_srcset']['webp'])
+
+    def test_same_stem_with_other_extension_does_not_collide(self):
+        buffer = BytesIO()
+        Image.new('RGB', (400, 400), (0, 0, 0)).save(buffer, 'JPEG')
+        jpeg = ProductImage.objects.create(product=self.image.product, image=SimpleUploadedFile('anel.jpg', buffer.getvalue()))
+        png = images.generate_derivatives(self.image.image)
+        jpg = images.generate_derivatives(jpeg.image)
+        self.assertNotEqual(png['widths']['200']['jpeg'], jpg['widths']['200']['jpeg'])
+        # Gerar as do .jpg não apagou nem sobrescreveu as do .png
+        with Image.open(self.image.image.storage.path(png['widths']['200']['jpeg'])) as thumb:
+            self.assertEqual(thumb.size, (200, 250))
+
+
+# --- FILA DE TAREFAS ---
+calls = []
+
+@tasks.task(max_attempts=2)
+def flaky_task(value):
+    calls.append(value)
+    if len(calls) == 1:
+        raise RuntimeError('falha temporária')
+
+
+@tasks.task
+def pinned_task():
+    # Dentro da tarefa, as leituras do catálogo não vão para a réplica
+    calls.append(db_router._use_primary.get())
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_idempotency_key_prevents_duplicates(self):
+        first = tasks.enqueue(flaky_task, key='pedido-1', value=1)
+        second = tasks.enqueue(flaky_task, key='pedido-1', value=2)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_failed_task_is_retried_with_backoff(self):
+        task = tasks.enqueue(flaky_task, value=7)
+        self.assertEqual(tasks.claim(10, timedelta(minutes=5)), [task.pk])
+        self.assertEqual(tasks.claim(10, timedelta(minutes=5)), [])  # já reservada
+
+        self.assertFalse(tasks.run_task(task.pk))
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.STATUS_PENDING, 1))
+        self.assertIn('falha temporária', task.last_error)
+        self.assertGreater(task.run_after, timezone.now())
+
+        Task.objects.filter(pk=task.pk).update(run_after=timezone.now())
+        tasks.claim(10, timedelta(minutes=5))
+        self.assertTrue(tasks.run_task(task.pk))
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts, calls), (Task.STATUS_DONE, 2, [7, 7]))
+
+    def test_tasks_and_writing_commands_read_from_the_primary(self):
+        task = tasks.enqueue(pinned_task)
+        tasks.claim(10, timedelta(minutes=5))
+        self.assertTrue(tasks.run_task(task.pk))
+        self.assertEqual(calls, [True])
+        self.assertFalse(db_router._use_primary.get())
+
+        from .management.commands import release_expired_reservations
+        original = release_expired_reservations.release_expired
+        release_expired_reservations.release_expired = lambda: calls.append(db_router._use_primary.get()) or 0
+        try:
+            call_command('release_expired_reservations', stdout=StringIO())
+        finally:
+            release_expired_reservations.release_expired = original
+        self.assertEqual(calls, [True, True])
+
+    def test_abandoned_running_task_is_reclaimed(self):
+        task = tasks.enqueue(flaky_task, value=1)
+        Task.objects.filter(pk=task.pk).update(
+            status=Task.STATUS_RUNNING, locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(tasks.claim(10, timedelta(minutes=5)), [task.pk])
+
+    def test_abandoned_task_without_attempts_left_fails(self):
+        task = tasks.enqueue(flaky_task, value=1)
+        Task.objects.filter(pk=task.pk).update(
+            status=Task.STATUS_RUNNING, attempts=2, locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(tasks.claim(10, timedelta(minutes=5)), [])
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts, task.locked_at), (Task.STATUS_FAILED, 2, None))
+        self.assertIn('sem tentativas', task.last_error)
+        self.assertEqual(calls, [])
+
+
+@tasks.task
+def slow_task(seconds):
+    time.sleep(seconds)
+
+
+class TaskHeartbeatTests(TransactionTestCase):
+    def test_long_task_keeps_its_lock(self):
+        task = tasks.enqueue(slow_task, seconds=0.6)
+        tasks.claim(10, timedelta(minutes=5))
+        runner = threading.Thread(target=tasks.run_task, args=(task.pk, timedelta(seconds=0.05)))
+        runner.start()
+        time.sleep(0.4)
+        # Rodando há mais que o lock_timeout, mas com sinal de vida: não é reservada de novo
+        self.assertEqual(tasks.claim(10, timedelta(seconds=0.2)), [])
+        runner.join(5)
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.STATUS_DONE, 1))
+
+
+# --- CHECKOUT ---
+class OrderCheckoutTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='cliente', email='cliente@example.com', password='x')
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name='Anéis')
+        self.products = [
+            Product.objects.create(name=f'Anel {i}', description='x', base_price=100 + i, category=category)
+            for i in range(20)
+        ]
+        self.products[0].promotional_price = 80
+        self.products[0].save()
+
+    def checkout(self, items):
+        return self.client.post('/api/orders/', {'address': 'Rua A, 1', 'items_data': items}, format='json')
+
+    def test_prices_and_total_come_from_the_database(self):
+        response = self.checkout([
+            {'product_id': self.products[0].id, 'quantity': 2, 'price': 1},
+            {'product_id': self.products[1].id, 'quantity': 1, 'price': 1},
+        ])
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['total'], '261.00')
+        self.assertEqual([item['price'] for item in response.data['items']], ['80.00', '101.00'])
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        with CaptureQueriesContext(connection) as small:
+            self.checkout([{'product_id': self.products[0].id, 'quantity': 1}])
+        with CaptureQueriesContext(connection) as large:
+            self.checkout([{'product_id': p.id, 'quantity': 1} for p in self.products])
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_staff_listing_is_paginated_and_filtered_in_the_database(self):
+        staff = User.objects.create_user(username='admin', email='admin@example.com', password='x', is_staff=True)
+        for i in range(6):
+            self.checkout([{'product_id': self.products[i].id, 'quantity': 1}])
+        Order.objects.filter(pk__in=Order.objects.order_by('id').values('pk')[:2]).update(status='paid')
+        Order.objects.create(address='Rua B', total=0, guest_email='visitante@example.com')
+
+        self.client.force_authenticate(staff)
+        response = self.client.get('/api/orders/?page_size=4')
+        self.assertEqual(len(response.data['results']), 4)
+        self.assertIsNotNone(response.data['next'])
+        self.assertEqual(response.data['results'][0]['customer_email'], 'visitante@example.com')
+
+        self.assertEqual(len(self.client.get('/api/orders/?status=paid').data['results']), 2)
+        self.assertEqual(len(self.client.get(f'/api/orders/?customer={self.user.id}').data['results']), 6)
+        self.assertEqual(len(self.client.get('/api/orders/?guest_email=VISITANTE@example.com').data['results']), 1)
+        self.assertEqual(len(self.client.get('/api/orders/?search=visitante').data['results']), 1)
+        today = timezone.localdate()
+        self.assertEqual(len(self.client.get(f'/api/orders/?created_after={today}&created_before={today}').data['results']), 7)
+        self.assertEqual(len(self.client.get(f'/api/orders/?created_after={today + timedelta(days=1)}').data['results']), 0)
+
+        # Número fixo de queries por página, qualquer que seja o volume de pedidos
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/orders/?page_size=25')
+        for i in range(30):
+            order = Order.objects.create(address='Rua C', total=0, customer=self.user)
+            OrderItem.objects.create(order=order, product=self.products[i % 20], quantity=1, price=1)
+        with CaptureQueriesContext(connection) as more_queries:
+            self.client.get('/api/orders/?page_size=25')
+        self.assertEqual(len(queries.captured_queries), len(more_queries.captured_queries))
+
+    def test_customers_only_see_their_own_orders(self):
+        other = User.objects.create_user(username='outro', email='outro@example.com', password='x')
+        Order.objects.create(address='Rua B', total=0, customer=other)
+        self.checkout([{'product_id': self.products[0].id, 'quantity': 1}])
+        response = self.client.get(f'/api/orders/?customer={other.id}')
+        self.assertEqual(response.data['results'], [])
+
+    def test_invalid_item_leaves_no_partial_order(self):
+        response = self.checkout([
+            {'product_id': self.products[0].id, 'quantity': 1},
+            {'product_id': 999999, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+
+
+# --- ESTOQUE E RESERVAS ---
+class StockReservationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='cliente', email='cliente@example.com', password='x'))
+        category = Category.objects.create(name='Anéis')
+        size = ProductAttribute.objects.create(name='Aro', slug='aro')
+        self.size_16 = AttributeValue.objects.create(attribute=size, value='16')
+        self.size_18 = AttributeValue.objects.create(attribute=size, value='18')
+        self.ring = Product.objects.create(name='Anel Solitário', description='x', base_price=500, category=category)
+        self.stock_16 = StockItem.objects.create(product=self.ring, available=3)
+        self.stock_16.options.set([self.size_16])
+        self.stock_18 = StockItem.objects.create(product=self.ring, available=1)
+        self.stock_18.options.set([self.size_18])
+        self.untracked = Product.objects.create(name='Colar', description='x', base_price=100, category=category)
+
+    def checkout(self, items):
+        return self.client.post('/api/orders/', {'address': 'Rua A, 1', 'items_data': items}, format='json')
+
+    def test_checkout_reserves_the_chosen_variant(self):
+        response = self.checkout([
+            {'product_id': self.ring.id, 'options': [self.size_16.id], 'quantity': 2},
+            {'product_id': self.untracked.id, 'quantity': 5},
+        ])
+        self.assertEqual(response.status_code, 201, response.data)
+        self.stock_16.refresh_from_db()
+        self.stock_18.refresh_from_db()
+        self.assertEqual((self.stock_16.available, self.stock_18.available), (1, 1))
+        reservation = StockReservation.objects.get()
+        self.assertEqual((reservation.stock_item, reservation.quantity), (self.stock_16, 2))
+        self.assertTrue(Task.objects.filter(idempotency_key=f"reservations:{response.data['id']}").exists())
+
+    def test_insufficient_stock_or_unknown_variant_rejects_the_whole_order(self):
+        response = self.checkout([
+            {'product_id': self.ring.id, 'options': [self.size_16.id], 'quantity': 1},
+            {'product_id': self.ring.id, 'options': [self.size_18.id], 'quantity': 2},
+        ])
+        self.assertEqual(response.status_code, 400)
+        response = self.checkout([{'product_id': self.ring.id, 'quantity': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.stock_16.refresh_from_db()
+        self.assertEqual(self.stock_16.available, 3)
+
+    def test_options_outside_the_variants_are_ignored(self):
+        material = ProductAttribute.objects.create(name='Material', slug='material')
+        gold = AttributeValue.objects.create(attribute=material, value='Ouro 18k')
+        self.assertEqual(
+            inventory.resolve([(self.ring.id, [self.size_18.id, gold.id], 1), (self.untracked.id, [gold.id], 1)]),
+            [self.stock_18.id, None],
+        )
+        # Sem opção nenhuma, só um produto de variação única tem a quem recorrer
+        single = Product.objects.create(name='Anel Único', description='x', base_price=500, category=self.ring.category)
+        only = StockItem.objects.create(product=single, available=1)
+        only.options.set([self.size_16])
+        self.assertEqual(inventory.resolve([(single.id, [], 1)]), [only.id])
+        with self.assertRaises(inventory.UnknownVariant):
+            inventory.resolve([(single.id, [self.size_18.id], 1)])
+
+    def test_cancel_releases_and_pay_commits(self):
+        canceled = Order.objects.get(pk=self.checkout([{'product_id': self.ring.id, 'options': [self.size_16.id], 'quantity': 2}]).data['id'])
+        paid = Order.objects.get(pk=self.checkout([{'product_id': self.ring.id, 'options': [self.size_16.id], 'quantity': 1}]).data['id'])
+        canceled.status = 'canceled'
+        canceled.save()
+        paid.status = 'paid'
+        paid.save()
+        self.stock_16.refresh_from_db()
+        self.assertEqual(self.stock_16.available, 2)
+        self.assertEqual(canceled.reservations.get().status, StockReservation.STATUS_RELEASED)
+        self.assertEqual(paid.reservations.get().status, StockReservation.STATUS_COMMITTED)
+        # Cancelar de novo não devolve duas vezes
+        canceled.save()
+        self.stock_16.refresh_from_db()
+        self.assertEqual(self.stock_16.available, 2)
+
+    def test_expired_reservations_return_to_stock(self):
+        order_id = self.checkout([{'product_id': self.ring.id, 'options': [self.size_18.id], 'quantity': 1}]).data['id']
+        self.assertEqual(self.checkout([{'product_id': self.ring.id, 'options': [self.size_18.id], 'quantity': 1}]).status_code, 400)
+
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        # O próximo checkout recupera a reserva vencida antes de recusar
+        response = self.checkout([{'product_id': self.ring.id, 'options': [self.size_18.id], 'quantity': 1}])
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(StockReservation.objects.get(order_id=order_id).status, StockReservation.STATUS_RELEASED)
+
+        inventory.expire_order_reservations(order_id=response.data['id'])
+        self.assertEqual(StockReservation.objects.get(order_id=response.data['id']).status, StockReservation.STATUS_ACTIVE)
+        self.stock_18.refresh_from_db()
+        self.assertEqual(self.stock_18.available, 0)
+
+    def test_paying_without_stock_is_a_400_and_deleting_releases(self):
+        expired_id = self.checkout([{'product_id': self.ring.id, 'options': [self.size_18.id], 'quantity': 1}]).data['id']
+        StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        other_id = self.checkout([{'product_id': self.ring.id, 'options': [self.size_18.id], 'quantity': 1}]).data['id']
+        staff = APIClient()
+        staff.force_authenticate(User.objects.create_user(username='equipe', email='equipe@example.com', password='x', is_staff=True))
+
+        response = staff.patch(f'/api/orders/{expired_id}/', {'status': 'paid'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('status', response.data)
+        self.assertEqual(Order.objects.get(pk=expired_id).status, 'pending')
+
+        Order.objects.get(pk=other_id).delete()
+        self.stock_18.refresh_from_db()
+        self.assertEqual(self.stock_18.available, 1)
+        response = staff.patch(f'/api/orders/{expired_id}/', {'status': 'paid'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.stock_18.refresh_from_db()
+        self.assertEqual(self.stock_18.available, 0)
+
+    def test_shipping_commits_and_customers_cannot_change_the_status(self):
+        order_id = self.checkout([{'product_id': self.ring.id, 'options': [self.size_16.id], 'quantity': 1}]).data['id']
+        response = self.client.patch(f'/api/orders/{order_id}/', {'status': 'paid'}, format='json')
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertEqual(StockReservation.objects.get().status, StockReservation.STATUS_ACTIVE)
+
+        # Direto de 'pending' para 'shipped', sem passar por 'paid'
+        order = Order.objects.get(pk=order_id)
+        order.status = 'shipped'
+        order.save()
+        self.assertEqual(StockReservation.objects.get().status, StockReservation.STATUS_COMMITTED)
+        order.status = 'delivered'
+        order.save()
+        self.assertEqual(StockReservation.objects.get().status, StockReservation.STATUS_COMMITTED)
+        self.stock_16.refresh_from_db()
+        self.assertEqual(self.stock_16.available, 2)
+
+
+class StockConcurrencyTests(TransactionTestCase):
+    """Vários checkouts simultâneos disputando a mesma variação: nunca vende mais do que tem."""
+    BUYERS = 30
+    STOCK = 10
+
+    def setUp(self):
+        category = Category.objects.create(name='Anéis')
+        self.ring = Product.objects.create(name='Anel Edição Limitada', description='x', base_price=900, category=category)
+        self.stock = StockItem.objects.create(product=self.ring, available=self.STOCK)
+        self.orders = [Order.objects.create(address='Rua A, 1', total=0) for _ in range(self.BUYERS)]
+
+    def reserve(self, order):
+        try:
+            for _ in range(1000):
+                try:
+                    with transaction.atomic():
+                        inventory.reserve(order, {self.stock.pk: 1})
+                    return True
+                except inventory.InsufficientStock:
+                    return False
+                except OperationalError:
+                    # O SQLite trava a tabela inteira; no Postgres a disputa é só pela linha
+                    time.sleep(random.uniform(0.001, 0.01))
+            return None
+        finally:
+            connections.close_all()
+
+    def test_hot_sku_is_never_oversold(self):
+        with ThreadPoolExecutor(max_workers=self.BUYERS) as pool:
+            results = list(pool.map(self.reserve, self.orders))
+        self.assertEqual(results.count(True), self.STOCK)
+        self.assertEqual(results.count(False), self.BUYERS - self.STOCK)
+        self.stock.refresh_from_db()
+        self.assertEqual(self.stock.available, 0)
+        self.assertEqual(StockReservation.objects.filter(status=StockReservation.STATUS_ACTIVE).count(), self.STOCK)
+
+
+# --- CONSOLIDADO DE VENDAS / DASHBOARD ---
+class AdminStatsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = User.objects.create_user(username='cliente', email='cliente@example.com', password='x')
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='x', is_staff=True)
+        category = Category.objects.create(name='Anéis')
+        self.ring = Product.objects.create(name='Anel', description='x', base_price=100, category=category)
+        self.necklace = Product.objects.create(name='Colar', description='x', base_price=250, category=category)
+
+    def checkout(self, items):
+        self.client.force_authenticate(self.customer)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/orders/', {'address': 'Rua A, 1', 'items_data': items}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Order.objects.get(pk=response.data['id'])
+
+    def get_stats(self):
+        self.client.force_authenticate(self.admin)
+        return self.client.get('/api/admin/stats/?days=7')
+
+    def test_checkout_and_cancel_update_the_rollup(self):
+        self.checkout([{'product_id': self.ring.id, 'quantity': 3}])
+        order = self.checkout([{'product_id': self.necklace.id, 'quantity': 1}, {'product_id': self.ring.id, 'quantity': 1}])
+
+        data = self.get_stats().data
+        self.assertEqual(data['today'], {'revenue': '650.00', 'orders': 2, 'average_ticket': '325.00'})
+        self.assertEqual(len(data['series']), 7)
+        self.assertEqual(data['series'][-1], {'date': timezone.localdate().isoformat(), 'revenue': '650.00', 'orders': 2})
+        self.assertEqual([(p['name'], p['quantity']) for p in data['top_products']], [('Anel', 4), ('Colar', 1)])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'canceled'
+            order.save()
+        data = self.get_stats().data
+        self.assertEqual((data['period']['revenue'], data['period']['orders'], data['period']['items_sold']), ('300.00', 1, 3))
+
+    def test_rebuild_matches_incremental_rollup_and_endpoint_skips_orders_table(self):
+        self.checkout([{'product_id': self.ring.id, 'quantity': 2}])
+        self.checkout([{'product_id': self.necklace.id, 'quantity': 1}])
+        incremental = list(DailySales.objects.values('date', 'revenue', 'orders_count', 'items_sold'))
+        incremental_products = sorted(DailyProductSales.objects.values_list('product_id', 'quantity', 'revenue'))
+
+        stats.rebuild()
+        self.assertEqual(list(DailySales.objects.values('date', 'revenue', 'orders_count', 'items_sold')), incremental)
+        self.assertEqual(sorted(DailyProductSales.objects.values_list('product_id', 'quantity', 'revenue')), incremental_products)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_stats().status_code, 200)
+        self.assertFalse([q for q in queries.captured_queries if '"store_order"' in q['sql']])
+
+    def test_checkout_refreshes_the_day_once_and_survives_a_failed_refresh(self):
+        self.client.force_authenticate(self.customer)
+        items = [{'product_id': self.ring.id, 'quantity': 1}, {'product_id': self.necklace.id, 'quantity': 1}]
+        refreshed = []
+        original = stats.refresh_day
+        stats.refresh_day = lambda day: refreshed.append(day) or original(day)
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post('/api/orders/', {'address': 'Rua A, 1', 'items_data': items}, format='json')
+        finally:
+            stats.refresh_day = original
+        self.assertEqual(refreshed, [timezone.localdate()])
+
+        def broken(day):
+            raise OperationalError('consolidado indisponível')
+
+        original, stats.refresh_day = stats.refresh_day, broken
+        try:
+            with self.assertLogs('django', 'ERROR'):
+                order = self.checkout(items)
+        finally:
+            stats.refresh_day = original
+        self.assertEqual(order.total, 350)
+
+        stats.refresh_day(timezone.localdate())
+        stats.refresh_day(timezone.localdate())
+        self.assertEqual(self.get_stats().data['today']['orders'], 2)
+
+    def test_rolled_back_transaction_does_not_block_the_next_refresh(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(address='Rua A, 1', total=100)
+        with self.captureOnCommitCallbacks() as discarded:
+            try:
+                with transaction.atomic():
+                    order.save()
+                    raise OperationalError('rollback')
+            except OperationalError:
+                pass
+        self.assertEqual(len(discarded), 0)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            order.status = 'paid'
+            order.save()
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(DailySales.objects.get().orders_count, 1)
+
+    def test_only_staff(self):
+        self.client.force_authenticate(self.customer)
+        self.assertEqual(self.client.get('/api/admin/stats/').status_code, 403)
+
+
+# --- EXPORTAÇÃO CSV / JSONL ---
+class ExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(username='admin', email='admin@example.com', password='x', is_staff=True)
+        category = Category.objects.create(name='Anéis')
+        self.products = [
+            Product.objects.create(name=f'Anel {i}', description='x', base_price=100 + i, category=category)
+            for i in range(5)
+        ]
+
+    def make_orders(self, count):
+        for i in range(count):
+            order = Order.objects.create(address='Rua A', total=0, guest_email=f'cliente{i}@example.com', status='paid' if i % 2 else 'pending')
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, quantity=2, price=product.base_price) for product in self.products[:2]
+            ])
+
+    def download(self, url):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_orders_csv_has_one_row_per_item_without_per_row_queries(self):
+        self.make_orders(3)
+        with CaptureQueriesContext(connection) as few:
+            self.download('/api/orders/export/')
+        self.make_orders(20)
+        with CaptureQueriesContext(connection) as many:
+            content = self.download('/api/orders/export/?status=paid')
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+
+        rows = list(csv.DictReader(content.lstrip('\ufeff').splitlines()))
+        self.assertEqual(len(rows), Order.objects.filter(status='paid').count() * 2)
+        self.assertEqual(rows[0]['status'], 'paid')
+        self.assertEqual((rows[0]['product_name'], rows[0]['category'], rows[0]['quantity']), ('Anel 0', 'Anéis', '2'))
+
+    def test_products_jsonl_and_permissions(self):
+        lines = self.download('/api/products/export/?export_format=jsonl&base_price__gt=102').splitlines()
+        self.assertEqual([json.loads(line)['name'] for line in lines], ['Anel 3', 'Anel 4'])
+        self.assertEqual(json.loads(lines[0])['base_price'], '103.00')
+
+        self.client.force_authenticate(User.objects.create_user(username='cliente', email='c@example.com', password='x'))
+        self.assertEqual(self.client.get('/api/products/export/').status_code, 403)
+        self.assertEqual(self.client.get('/api/orders/export/').status_code, 403)
+
+    def test_formulas_are_neutralized_in_csv_only(self):
+        Product.objects.filter(pk=self.products[0].pk).update(name='=HYPERLINK("http://x")')
+        Product.objects.filter(pk=self.products[1].pk).update(name='@SUM(A1)', promotional_price=-1)
+        rows = list(csv.DictReader(self.download('/api/products/export/').lstrip('\ufeff').splitlines()))
+        self.assertEqual(rows[0]['name'], '\'=HYPERLINK("http://x")')
+        self.assertEqual((rows[1]['name'], rows[1]['promotional_price']), ("'@SUM(A1)", '-1.00'))
+        lines = self.download('/api/products/export/?export_format=jsonl').splitlines()
+        self.assertEqual(json.loads(lines[0])['name'], '=HYPERLINK("http://x")')
+
+    async def test_asgi_export_streams_in_chunks(self):
+        pulled = []
+
+        def rows():
+            for i in range(3 * exports.CHUNK_SIZE):
+                pulled.append(i)
+                yield (i, f'Anel {i}')
+
+        request = AsyncRequestFactory().get('/api/products/export/')
+        response = exports.streaming_response((('id', 'id'), ('name', 'name')), rows(), 'csv', 'produtos', request)
+        self.assertTrue(response.is_async)
+        first = await anext(aiter(response.streaming_content))
+        # Só o primeiro lote (cabeçalho + linhas) saiu do banco
+        self.assertEqual(len(pulled), exports.CHUNK_SIZE - 1)
+        self.assertEqual(first.decode('utf-8').count('\n'), exports.CHUNK_SIZE)
+
+        token = RefreshToken.for_user(self.admin).access_token
+        response = await AsyncClient().get('/api/products/export/?export_format=jsonl', headers={'Authorization': f'Bearer {token}'})
+        self.assertEqual(response.status_code, 200, getattr(response, 'data', None))
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 5)
+
+    def test_export_commands_write_files(self):
+        self.make_orders(2)
+        with tempfile.TemporaryDirectory() as folder:
+            call_command('export_orders', '--format', 'jsonl', '--output', f'{folder}/pedidos.jsonl', '--status', 'pending', stderr=StringIO())
+            with open(f'{folder}/pedidos.jsonl', encoding='utf-8') as f:
+                self.assertEqual(len(f.readlines()), 2)
+            call_command('export_products', '--output', f'{folder}/produtos.csv', stderr=StringIO())
+            with open(f'{folder}/produtos.csv', encoding='utf-8-sig') as f:
+                self.assertEqual(len(list(csv.DictReader(f))), 5)
+
+
+# --- IMPORTAÇÃO EM LOTE ---
+class ProductImportTests(TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=f'{self.folder}/media')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for name in ('anel-1.jpg', 'anel-2.jpg'):
+            Image.new('RGB', (300, 300), (212, 175, 55)).save(f'{self.folder}/{name}', 'JPEG')
+
+    def write(self, name, content):
+        with open(f'{self.folder}/{name}', 'w', encoding='utf-8') as f:
+            f.write(content)
+        return f'{self.folder}/{name}'
+
+    def import_file(self, path, *args):
+        out = StringIO()
+        call_command('import_products', path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_csv_upserts_products_categories_attributes_and_images(self):
+        path = self.write('catalogo.csv', (
+            'name,slug,description,base_price,promotional_price,category,attributes,images\n'
+            'Anel Solitário,anel-solitario,Ouro,"1200,50",,Anéis > Solitários,"Material=Ouro 18k; Aro=16,18",anel-1.jpg|anel-2.jpg\n'
+            'Colar Riviera,,Prata,300,250,Colares,Material=Prata 925,\n'
+            'Sem preço,,x,,,Colares,,\n'
+        ))
+        output = self.import_file(path)
+        self.assertIn('2 produto(s) criado(s), 0 atualizado(s), 2 foto(s), 1 erro(s)', output)
+
+        ring = Product.objects.get(slug='anel-solitario')
+        self.assertEqual(ring.base_price, Decimal('1200.50'))
+        self.assertEqual(ring.category.get_descendants(include_self=True)[0].parent.name, 'Anéis')
+        self.assertEqual(sorted(ring.attributes.values_list('value', flat=True)), ['16', '18', 'Ouro 18k'])
+        self.assertEqual(list(ring.images.order_by('id').values_list('is_cover', flat=True)), [True, False])
+        self.assertTrue(Task.objects.filter(name='store.images.process_model_image').exists())
+        self.assertEqual(Product.objects.get(slug='colar-riviera').current_price, Decimal('250.00'))
+
+        # Segunda carga: atualiza pelo slug, não duplica fotos nem atributos
+        self.write('catalogo.csv', (
+            'name,slug,base_price,category,attributes,images\n'
+            'Anel Solitário Luxo,anel-solitario,1500,Anéis > Solitários,Material=Ouro 18k,anel-1.jpg\n'
+        ))
+        self.assertIn('0 produto(s) criado(s), 1 atualizado(s), 0 foto(s)', self.import_file(path))
+        ring.refresh_from_db()
+        self.assertEqual((ring.name, ring.base_price), ('Anel Solitário Luxo', Decimal('1500.00')))
+        self.assertEqual(list(ring.attributes.values_list('value', flat=True)), ['Ouro 18k'])
+        self.assertEqual(ring.images.count(), 2)
+        self.assertEqual(Category.objects.filter(name='Solitários').count(), 1)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        def catalog(count):
+            lines = ['name,base_price,category,attributes']
+            lines += [f'Anel {count}-{i},{100 + i},Anéis,Material=Ouro 18k' for i in range(count)]
+            return self.write(f'catalogo-{count}.csv', '\n'.join(lines) + '\n')
+
+        self.import_file(catalog(1))  # cria categoria e atributo
+        with CaptureQueriesContext(connection) as few:
+            self.import_file(catalog(5))
+        with CaptureQueriesContext(connection) as many:
+            self.import_file(catalog(50))
+        self.assertEqual(len(few.captured_queries), len(many.captured_queries))
+        self.assertEqual(Product.objects.count(), 56)
+
+    def test_admin_endpoint_accepts_jsonl(self):
+        client = APIClient()
+        payload = (
+            '{"name": "Brinco Argola", "base_price": 90, "category": "Brincos", "attributes": {"Material": ["Prata 925"]}}\n'
+            'não é json\n'
+        ).encode('utf-8')
+        client.force_authenticate(User.objects.create_user(username='cliente', email='c@example.com', password='x'))
+        upload = SimpleUploadedFile('catalogo.jsonl', payload)
+        self.assertEqual(client.post('/api/products/import/', {'file': upload}).status_code, 403)
+
+        client.force_authenticate(User.objects.create_user(username='admin', email='a@example.com', password='x', is_staff=True))
+        response = client.post('/api/products/import/', {'file': SimpleUploadedFile('catalogo.jsonl', payload)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['error_count']), (1, 1))
+        self.assertEqual(response.data['errors'][0]['line'], 2)
+        self.assertEqual(Product.objects.get(slug='brinco-argola').attributes.get().value, 'Prata 925')
+
+    def test_images_must_be_real_images_inside_the_image_root(self):
+        outside = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outside, ignore_errors=True)
+        Image.new('RGB', (10, 10)).save(f'{outside}/fora.jpg', 'JPEG')
+        self.write('nao-e-foto.jpg', 'texto qualquer')
+        path = self.write('catalogo.csv', (
+            'name,base_price,category,images\n'
+            f'Anel A,100,Anéis,/etc/passwd\n'
+            f'Anel B,100,Anéis,../{os.path.basename(outside)}/fora.jpg\n'
+            'Anel C,100,Anéis,nao-e-foto.jpg\n'
+            'Anel D,100,Anéis,anel-1.jpg\n'
+        ))
+        output = self.import_file(path)
+        self.assertIn('4 produto(s) criado(s), 0 atualizado(s), 1 foto(s), 3 erro(s)', output)
+        self.assertIn('fora da pasta das fotos', output)
+        self.assertIn('não é uma imagem válida', output)
+        self.assertEqual(ProductImage.objects.get().product.slug, 'anel-d')
+
+    @override_settings(IMPORT_IMAGE_HOSTS=['cdn.example.com'])
+    def test_admin_endpoint_refuses_local_paths_and_other_hosts(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='admin', email='a@example.com', password='x', is_staff=True))
+        payload = (
+            'name,base_price,category,images\n'
+            'Anel A,100,Anéis,core/settings.py\n'
+            'Anel B,100,Anéis,http://169.254.169.254/latest/meta-data\n'
+            'Anel C,100,Anéis,https://interno.local/foto.jpg\n'
+            'Anel D,100,Anéis,file:///etc/passwd\n'
+        ).encode('utf-8')
+        response = client.post('/api/products/import/', {'file': SimpleUploadedFile('catalogo.csv', payload)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['images'], response.data['error_count']), (4, 0, 4))
+        errors = ' '.join(error['error'] for error in response.data['errors'])
+        self.assertIn('caminho local não é aceito', errors)
+        self.assertIn("host 'interno.local'", errors)
+        self.assertFalse(ProductImage.objects.exists())
+
+
+# --- CACHE DE RESPOSTAS DO CATÁLOGO ---
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Anéis')
+        attribute = ProductAttribute.objects.create(name='Material', slug='material')
+        self.gold = AttributeValue.objects.create(attribute=attribute, value='Ouro 18k')
+        self.ring = Product.objects.create(name='Anel', description='x', base_price=100, category=self.category)
+        self.ring.attributes.add(self.gold)
+        self.necklace = Product.objects.create(name='Colar', description='x', base_price=200, category=self.category)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_hits_skip_the_database_and_query_string_is_normalized(self):
+        self.assertEqual(self.get('/api/products/?base_price__gt=50&ordering=id')['X-Cache'], 'MISS')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get('/api/products/?ordering=id&base_price__gt=50')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(len(queries.captured_queries), 0)
+        self.assertEqual([p['name'] for p in response.data['results']], ['Anel', 'Colar'])
+        self.assertEqual(self.get('/api/products/?base_price__gt=150')['X-Cache'], 'MISS')
+
+    def test_product_changes_invalidate_only_what_they_touch(self):
+        for url in ('/api/products/', f'/api/products/{self.ring.id}/', f'/api/products/{self.necklace.id}/', '/api/categories/'):
+            self.get(url)
+
+        self.ring.base_price = 150
+        self.ring.save()
+        response = self.get(f'/api/products/{self.ring.id}/')
+        self.assertEqual((response['X-Cache'], response.data['base_price']), ('MISS', '150.00'))
+        self.assertEqual(self.get('/api/products/')['X-Cache'], 'MISS')
+        self.assertEqual(self.get(f'/api/products/{self.necklace.id}/')['X-Cache'], 'HIT')
+        self.assertEqual(self.get('/api/categories/')['X-Cache'], 'HIT')
+
+        self.necklace.attributes.add(self.gold)
+        self.assertEqual(self.get(f'/api/products/{self.necklace.id}/')['X-Cache'], 'MISS')
+
+    def test_category_attribute_and_settings_changes(self):
+        self.get(f'/api/products/{self.ring.id}/')
+        self.get('/api/categories/')
+        self.category.name = 'Anéis de Ouro'
+        self.category.save()
+        self.assertEqual(self.get('/api/categories/').data[0]['name'], 'Anéis de Ouro')
+        self.assertEqual(self.get(f'/api/products/{self.ring.id}/').data['category_name'], 'Anéis de Ouro')
+
+        self.gold.value = 'Ouro 18 quilates'
+        self.gold.save()
+        self.assertEqual(self.get(f'/api/products/{self.ring.id}/').data['attributes'][0]['value'], 'Ouro 18 quilates')
+
+        site = SiteSettings.objects.create(site_name='Joalheria')
+        self.get(f'/api/site-settings/{site.id}/')
+        site.site_name = 'Joalheria Real'
+        site.save()
+        self.assertEqual(self.get(f'/api/site-settings/{site.id}/').data['site_name'], 'Joalheria Real')
+
+    def test_misses_right_after_an_invalidation_read_from_the_primary(self):
+        class View:
+            @response_cache.cached_response(response_cache.PRODUCTS)
+            def list(self, request):
+                # O que o ReplicaRouter consulta (o TestCase já roda dentro de uma transação)
+                return Response({'primary': db_router._use_primary.get()})
+
+        def primary(path):
+            return View().list(RequestFactory().get(path)).data['primary']
+
+        cache.delete(response_cache.PRIMARY_PIN_KEY)  # janela do setUp expirada
+        self.assertFalse(primary('/a/'))
+        self.ring.save()
+        self.assertTrue(primary('/b/'))
+        cache.delete(response_cache.PRIMARY_PIN_KEY)
+        self.assertFalse(primary('/c/'))
+        with override_settings(REPLICA_PIN_SECONDS=0):
+            self.ring.save()
+            self.assertFalse(primary('/d/'))
+
+
+class ConditionalRequestTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Anéis')
+        attribute = ProductAttribute.objects.create(name='Material', slug='material')
+        self.gold = AttributeValue.objects.create(attribute=attribute, value='Ouro 18k')
+        self.ring = Product.objects.create(name='Anel', description='x', base_price=100, category=self.category)
+        self.necklace = Product.objects.create(name='Colar', description='x', base_price=200, category=self.category)
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def test_not_modified_skips_serialization_and_cache_hit_skips_the_database(self):
+        url = f'/api/products/{self.ring.id}/'
+        etag = self.etag(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response.content, response['ETag']), (304, b'', etag))
+        self.assertEqual(len(queries.captured_queries), 0)
+
+        with override_settings(RESPONSE_CACHE_ENABLED=False):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.revalidate(url, etag), 304)
+            # Só a leitura do updated_at
+            self.assertEqual(len(queries.captured_queries), 1)
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=self.client.get(url)['Last-Modified'])
+            self.assertEqual(response.status_code, 304)
+
+    def test_images_and_attributes_bump_updated_at(self):
+        url = f'/api/products/{self.ring.id}/'
+        etag = self.etag(url)
+        before = Product.objects.get(pk=self.ring.pk).updated_at
+        self.ring.attributes.add(self.gold)
+        self.assertGreater(Product.objects.get(pk=self.ring.pk).updated_at, before)
+        self.assertEqual(self.revalidate(url, etag), 200)
+
+        etag = self.etag(url)
+        ProductImage.objects.create(product=self.ring, image='products/anel.jpg')
+        self.assertEqual(self.revalidate(url, etag), 200)
+
+        etag = self.etag(url)
+        self.gold.value = 'Ouro 18 quilates'
+        self.gold.save()
+        self.assertEqual(self.revalidate(url, etag), 200)
+        self.assertEqual(self.revalidate(f'/api/products/{self.necklace.id}/', self.etag(f'/api/products/{self.necklace.id}/')), 304)
+
+    def test_listings_change_with_updates_and_deletions(self):
+        etag = self.etag('/api/products/')
+        self.assertEqual(self.revalidate('/api/products/', etag), 304)
+        self.assertNotEqual(self.etag('/api/products/?base_price__gt=150'), etag)
+        self.necklace.delete()
+        self.assertEqual(self.revalidate('/api/products/', etag), 200)
+
+        etag = self.etag('/api/categories/')
+        self.assertEqual(self.revalidate('/api/categories/', etag), 304)
+        self.category.name = 'Anéis de Ouro'
+        self.category.save()
+        self.assertEqual(self.revalidate('/api/categories/', etag), 200)
+
+        site = SiteSettings.objects.create(site_name='Joalheria')
+        url = f'/api/site-settings/{site.id}/'
+        etag = self.etag(url)
+        self.assertEqual(self.revalidate(url, etag), 304)
+        site.site_name = 'Joalheria Real'
+        site.save()
+        self.assertEqual(self.revalidate(url, etag), 200)
+        self.assertEqual(self.client.get('/api/site-settings/999/', HTTP_IF_NONE_MATCH=etag).status_code, 404)
+
+
+
+# --- LEITURAS ASSÍNCRONAS DO CATÁLOGO ---
+class AsyncCatalogTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        suggest.reset_index()
+        self.client = APIClient()
+        self.rings = Category.objects.create(name='Anéis', show_on_home=True)
+        Category.objects.create(name='Solitários', parent=self.rings)
+        attribute = ProductAttribute.objects.create(name='Material', slug='material')
+        gold = AttributeValue.objects.create(attribute=attribute, value='Ouro 18k')
+        for i in range(30):
+            product = Product.objects.create(name=f'Anel {i}', description='x', base_price=100 + i, category=self.rings)
+            if i % 2:
+                product.attributes.add(gold)
+        ProductImage.objects.create(product=product, image='products/anel.jpg', is_cover=True)
+        self.product = product
+        self.site = SiteSettings.objects.create(site_name='Joalheria')
+
+    def assertSameAsSync(self, path):
+        sync, asynchronous = self.client.get(f'/api{path}'), self.client.get(f'/api/async{path}')
+        self.assertEqual((sync.status_code, asynchronous.status_code), (200, 200))
+        self.assertEqual(asynchronous.json(), sync.json())
+
+    def test_responses_match_the_drf_views(self):
+        self.assertSameAsSync(f'/products/{self.product.id}/')
+        self.assertSameAsSync('/products/suggest/?q=anel&limit=3')
+        self.assertSameAsSync('/categories/')
+        self.assertSameAsSync('/categories/?show_on_home=true')
+        self.assertSameAsSync('/site-settings/')
+        self.assertSameAsSync(f'/site-settings/{self.site.id}/')
+
+    def test_product_listing_filters_and_pages_like_the_drf_view(self):
+        for query in ('?base_price__gt=110&ordering=base_price', '?attributes__value=Ouro 18k&page_size=5', '?search=anel'):
+            sync = self.client.get(f'/api/products/{query}').json()
+            asynchronous = self.client.get(f'/api/async/products/{query}').json()
+            self.assertEqual(asynchronous['results'], sync['results'])
+
+        first = self.client.get('/api/async/products/?page_size=20').json()
+        self.assertEqual(len(first['results']), 20)
+        self.assertIn('/api/async/products/?cursor=', first['next'])
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(second['results']), 10)
+        self.assertIsNone(second['next'])
+        names = [item['name'] for item in first['results'] + second['results']]
+        self.assertEqual(names, [f'Anel {i}' for i in reversed(range(30))])
+        self.assertEqual(self.client.get('/api/async/products/?base_price__gt=abc').status_code, 400)
+
+    def test_cache_etag_and_not_found(self):
+        url = f'/api/async/products/{self.product.id}/'
+        first = self.client.get(url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+        with override_settings(RESPONSE_CACHE_ENABLED=False):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.assertEqual(self.client.get('/api/async/products/999999/').status_code, 404)
+        self.assertEqual(self.client.post('/api/async/products/').status_code, 405)
+
+    async def test_concurrent_requests_on_the_event_loop(self):
+        urls = ['/api/async/products/', f'/api/async/products/{self.product.id}/', '/api/async/categories/'] * 5
+        responses = await asyncio.gather(*(self.async_client.get(url) for url in urls))
+        self.assertEqual({response.status_code for response in responses}, {200})
+
+
+
+# --- AUTENTICAÇÃO JWT COM USUÁRIO EM CACHE ---
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='cliente', email='cliente@example.com', password='x')
+        self.user.profile.phone = '92999990000'
+        self.user.profile.save()
+        token = RefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def identity_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in queries.captured_queries if 'FROM "store_user"' in q['sql'] or 'FROM "store_profile"' in q['sql']]
+
+    def test_repeated_requests_skip_user_and_profile_queries(self):
+        self.assertEqual(len(self.identity_queries('/api/users/me/')), 1)
+        self.assertEqual(self.identity_queries('/api/users/me/'), [])
+        self.assertEqual(self.identity_queries('/api/orders/'), [])
+        self.assertEqual(self.client.get('/api/users/me/').data['phone'], '92999990000')
+
+    def test_saving_user_or_profile_refreshes_the_cache(self):
+        self.client.get('/api/users/me/')
+        self.assertEqual(self.client.get('/api/admin/stats/').status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get('/api/admin/stats/').status_code, 200)
+
+        profile = Profile.objects.get(user=self.user)
+        profile.phone = '92988880000'
+        profile.save()
+        self.assertEqual(self.client.get('/api/users/me/').data['phone'], '92988880000')
+
+        # Alterações da própria requisição não vazam para o cache
+        self.assertEqual(self.client.post('/api/verify-sms/', {'code': '000000'}).status_code, 400)
+        self.client.post('/api/send-sms/', {'phone': '92977770000'})
+        self.assertEqual(self.client.get('/api/users/me/').data['phone'], '92977770000')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_sms_views_read_the_profile_from_the_database(self):
+        self.client.get('/api/users/me/')
+        # Gravado por outro processo: update() não passa pelos signals, o cache daqui fica velho
+        Profile.objects.filter(user=self.user).update(verification_code='123456', address='Rua B, 2')
+        self.assertEqual(self.client.post('/api/verify-sms/', {'code': '123456'}).status_code, 200)
+        profile = Profile.objects.get(user=self.user)
+        self.assertEqual((profile.is_phone_verified, profile.verification_code, profile.address), (True, None, 'Rua B, 2'))
+
+        Profile.objects.filter(user=self.user).update(address='Rua C, 3')
+        self.client.post('/api/send-sms/', {'phone': '92966660000'})
+        profile.refresh_from_db()
+        self.assertEqual((profile.phone, profile.address, profile.is_phone_verified), ('92966660000', 'Rua C, 3', True))
+
+
+
+# --- MÉTRICAS ---
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.client = APIClient()
+        category = Category.objects.create(name='Anéis')
+        Product.objects.create(name='Anel', description='x', base_price=100, category=category)
+        self.staff = User.objects.create_user(username='admin', email='admin@example.com', password='x', is_staff=True)
+
+    def scrape(self):
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_records_latency_and_queries_per_route(self):
+        self.client.get('/api/products/')
+        self.client.get('/api/products/')
+        self.client.get('/api/products/999999/')
+        self.client.force_authenticate(self.staff)
+        self.client.get('/api/orders/')
+        self.client.force_authenticate(None)
+
+        text = self.scrape()
+        self.assertIn('store_http_request_duration_seconds_count{endpoint="product-list",method="GET"} 2', text)
+        self.assertIn('store_http_request_duration_seconds_bucket{endpoint="product-list",method="GET",le="+Inf"} 2', text)
+        self.assertIn('store_http_responses_total{endpoint="product-detail",method="GET",status="4xx"} 1', text)
+        self.assertIn('store_http_responses_total{endpoint="order-list",method="GET",status="2xx"} 1', text)
+        queries = int(re.search(r'store_db_queries_total\{endpoint="product-list",method="GET"\} (\d+)', text).group(1))
+        self.assertGreater(queries, 0)
+        self.assertNotIn('endpoint="metrics"', text)
+
+    @override_settings(METRICS_ALLOWED_IPS=[])
+    def test_only_staff_or_allowed_ips(self):
+        self.assertIn(self.client.get('/metrics').status_code, (401, 403))
+        with override_settings(METRICS_ALLOWED_IPS=['10.0.0.0/24']):
+            self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.7').status_code, 200)
+            # Pelo nginx: o IP interno é o do proxy, não o do cliente
+            response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.7', HTTP_X_FORWARDED_FOR='203.0.113.9')
+            self.assertIn(response.status_code, (401, 403))
+        self.client.force_authenticate(self.staff)
+        self.scrape()
+
+    def test_snapshots_of_other_workers_are_added(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(METRICS_DIR=directory, METRICS_FLUSH_INTERVAL=0):
+            self.client.get('/api/products/')
+            metrics.flush()
+            self.assertEqual(os.listdir(directory), [f'{metrics.worker_id()}.json'])
+            # Outro worker do gunicorn, vivo (o pai deste processo), com as suas próprias contagens
+            other = metrics.snapshot()
+            with open(os.path.join(directory, f'{os.getppid()}-abc.json'), 'w') as f:
+                json.dump(other, f)
+            text = self.scrape()
+        self.assertIn('store_http_request_duration_seconds_count{endpoint="product-list",method="GET"} 2', text)
+
+    def test_dead_workers_are_folded_into_the_cumulative_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(METRICS_DIR=directory):
+            self.client.get('/api/products/')
+            dead = metrics.snapshot()
+            metrics.reset()
+            # Mesmo pid (reaproveitado), ids diferentes: nenhum sobrescreve o outro
+            for name in ('4194305-a.json', '4194305-b.json'):
+                with open(os.path.join(directory, name), 'w') as f:
+                    json.dump(dead, f)
+            for _ in range(2):
+                self.assertIn('store_http_request_duration_seconds_count{endpoint="product-list",method="GET"} 2', self.scrape())
+        names = os.listdir(directory)
+        self.assertIn('cumulative.json', names)
+        self.assertFalse([name for name in names if name.startswith('4194305-')])
+
+    def test_label_values_are_escaped_and_methods_bounded(self):
+        self.client.generic('BREW', '/api/products/')
+        metrics.record('weird"\\name\n', 'GET', 200, 0.01, 0, 0)
+        text = self.scrape()
+        self.assertIn('method="other"', text)
+        self.assertNotIn('BREW', text)
+        self.assertIn('endpoint="weird\\"\\\\name\\n"', text)
+
+
+# --- PERFIL SOB DEMANDA E SLOW-QUERY LOG ---
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = Category.objects.create(name='Anéis')
+        Product.objects.create(name='Anel', description='x', base_price=100, category=category)
+        self.staff = User.objects.create_user(username='admin', email='admin@example.com', password='x', is_staff=True)
+        self.customer = User.objects.create_user(username='cliente', email='cliente@example.com', password='x')
+
+    def login(self, user):
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_staff_gets_profile_and_sql_report(self):
+        self.login(self.staff)
+        response = self.client.get('/api/products/', {'_profile': '1'})
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report['endpoint'], 'product-list')
+        self.assertEqual(report['status'], 200)
+        self.assertEqual(report['profile']['format'], 'folded')
+        self.assertGreater(report['sql']['count'], 0)
+        self.assertEqual(len(report['sql']['queries']), report['sql']['count'])
+        self.assertIn('time_ms', report['sql']['queries'][0])
+
+    def test_ignored_for_anonymous_and_customers(self):
+        self.assertIn('results', self.client.get('/api/products/', {'_profile': '1'}).json())
+        self.login(self.customer)
+        self.assertIn('results', self.client.get('/api/products/', HTTP_X_PROFILE='1').json())
+
+    def test_cprofile_mode_saves_files(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.login(self.staff)
+        with override_settings(PROFILING_DIR=directory):
+            report = self.client.get('/api/categories/', HTTP_X_PROFILE='cprofile').json()
+        self.assertEqual(report['profile']['format'], 'cprofile')
+        self.assertEqual(
+            sorted(os.listdir(directory)), sorted([f"{report['id']}.json", f"{report['id']}.prof"])
+        )
+
+    def test_sql_report_finds_repeated_queries(self):
+        report = profiling.sql_report([
+            ('SELECT * FROM p WHERE id = %s', (1,), 0.001),
+            ('SELECT * FROM p WHERE id = %s', (2,), 0.002),
+            ('SELECT * FROM p WHERE id = %s', (1,), 0.001),
+            ('SELECT * FROM c', (), 0.001),
+        ])
+        self.assertEqual(report['count'], 4)
+        self.assertEqual(report['repeated_statements'][0]['count'], 3)
+        self.assertEqual(report['duplicate_queries'], [
+            {'sql': 'SELECT * FROM p WHERE id = %s', 'params': '(1,)', 'count': 2},
+        ])
+
+    def test_slow_queries_are_logged_with_route(self):
+        with override_settings(SLOW_QUERY_THRESHOLD_MS=0.000001):
+            with self.assertLogs('store.slow_queries', 'WARNING') as logs:
+                self.client.get('/api/products/')
+                User.objects.filter(email='segredo@example.com').exists()
+        self.assertIn('GET /api/products/', logs.output[0])
+        self.assertNotIn('segredo@example.com', '\n'.join(logs.output))
+        self.assertIn('| 2 parâmetro(s)', logs.output[-1])
+
+    def test_concurrent_cprofile_falls_back_to_sampling(self):
+        with profiling.CProfileProfiler(0.001) as first:
+            with profiling.CProfileProfiler(0.001) as second:
+                sum(range(1000))
+        self.assertEqual(first.report()['format'], 'cprofile')
+        self.assertEqual(second.report()['format'], 'folded')
+        self.assertIn('fallback', second.report())
+        # O lock foi devolvido: o próximo perfil volta a ser cProfile
+        with profiling.CProfileProfiler(0.001) as third:
+            pass
+        self.assertEqual(third.report()['format'], 'cprofile')
+
+    @override_settings(PROFILING_SAMPLE_INTERVAL=0.0002)
+    async def test_asgi_sampling_follows_the_sync_view_thread(self):
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.staff).access_token))()
+        response = await self.async_client.get('/api/products/', {'_profile': '1'}, headers={'authorization': f'Bearer {token}'})
+        folded = response.json()['profile']['folded']
+        # As pilhas são as da view do DRF, não as do event loop esperando a thread
+        self.assertIn('dispatch (views.py', folded)
+
+    async def test_async_stack_profiles_without_adapting_the_middleware(self):
+        async def view(request):
+            pass
+
+        self.assertTrue(iscoroutinefunction(profiling.ProfilingMiddleware(view)))
+        token = await sync_to_async(lambda: str(RefreshToken.for_user(self.staff).access_token))()
+        response = await self.async_client.get(
+            '/api/async/products/', {'_profile': 'cprofile'}, headers={'authorization': f'Bearer {token}'},
+        )
+        report = response.json()
+        self.assertEqual((report['status'], report['profile']['format']), (200, 'cprofile'))
+        self.assertGreater(report['sql']['count'], 0)
+        self.assertIn('results', (await self.async_client.get('/api/async/products/', {'_profile': '1'})).json())
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_slow_query_log_can_be_disabled(self):
+        with self.assertNoLogs('store.slow_queries', 'WARNING'):
+            self.client.get('/api/products/')
+
+
+# --- BENCHMARK (manage.py bench) ---
+class BenchTests(LiveServerTestCase):
+    def setUp(self):
+        cache.clear()
+        category = Category.objects.create(name='Anéis')
+        for i in range(5):
+            Product.objects.create(name=f'Anel Solitário {i}', description='x', base_price=100 + i, category=category)
+
+    def test_runs_scenarios_against_a_server_and_saves_json(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        output = os.path.join(directory, 'bench.json')
+        call_command(
+            'bench', url=self.live_server_url, concurrency=1, iterations=2, warmup=0,
+            output=output, stdout=StringIO(),
+        )
+        with open(output) as f:
+            report = json.load(f)
+        self.assertEqual(set(report['scenarios']), set(bench.SCENARIOS))
+        browse = report['scenarios']['browse']
+        self.assertGreater(browse['requests'], 0)
+        self.assertEqual(browse['errors'], 0)
+        self.assertIn('product-list', browse['endpoints'])
+        checkout = report['scenarios']['checkout']
+        self.assertEqual(checkout['errors'], 0)
+        self.assertEqual(checkout['endpoints']['order-list']['requests'], 4)
+        self.assertEqual(Order.objects.filter(customer__username='bench').count(), 2)
+
+        stdout = StringIO()
+        call_command(
+            'bench', url=self.live_server_url, scenarios=['search'], concurrency=1, iterations=1,
+            compare=output, stdout=stdout,
+        )
+        self.assertIn('Diferença para', stdout.getvalue())
+
+
+class BenchStatsTests(SimpleTestCase):
+    def test_summary_per_scenario_and_endpoint(self):
+        samples = [('product-list', i / 1000, 200) for i in range(1, 101)] + [('order-list', 0.5, 500)]
+        summary = bench.summarize(samples, elapsed=2)
+        self.assertEqual(summary['requests'], 101)
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['rps'], 50.5)
+        self.assertEqual(summary['endpoints']['product-list']['p50_ms'], 51)
+        self.assertEqual(summary['endpoints']['product-list']['p99_ms'], 100)
+        self.assertEqual(summary['endpoints']['order-list']['errors'], 1)
+
+    def test_compare_reports_percent_change(self):
+        before = {'scenarios': {'browse': {'rps': 100, 'p50_ms': 10, 'p95_ms': 20, 'p99_ms': None}}}
+        after = {'scenarios': {'browse': {'rps': 150, 'p50_ms': 8, 'p95_ms': 20, 'p99_ms': 30}, 'search': {}}}
+        self.assertEqual(bench.compare(before, after), [
+            ('browse', {'rps': 50.0, 'p50_ms': -20.0, 'p95_ms': 0.0, 'p99_ms': None}),
+        ])
+
+
+# --- DADOS SINTÉTICOS (seed_db) ---
+class SeedDbTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.customer = User.objects.create_user(username='real', email='real@example.com', password='x')
+
+    def seed(self, **options):
+        options = {'products': 60, 'users': 12, 'orders': 80, 'photos': 3, 'days': 30, 'batch_size': 16, **options}
+        call_command('seed_db', stdout=StringIO(), **options)
+
+    def snapshot(self):
+        return (
+            list(Product.objects.order_by('slug').values_list('slug', 'base_price', 'category__slug')),
+            sorted(Order.objects.values_list('total', 'status')),
+        )
+
+    def test_generates_the_requested_volume_offline(self):
+        self.seed()
+        self.assertEqual(Product.objects.count(), 60)
+        self.assertEqual(User.objects.filter(email__endswith='@seed.example.com').count(), 12)
+        self.assertEqual(Profile.objects.filter(user__email__endswith='@seed.example.com').count(), 12)
+        self.assertEqual(Order.objects.count(), 80)
+        solitaires = Category.objects.get(slug='aneis-solitarios')
+        self.assertEqual((solitaires.depth, solitaires.path[:9]), (1, solitaires.parent.path))
+        self.assertEqual(Order.objects.exclude(created_at__date__gte=timezone.localdate() - timedelta(days=29)).count(), 0)
+        self.assertTrue(all(order.total == sum(item.price * item.quantity for item in order.items.all())
+                            for order in Order.objects.prefetch_related('items')))
+        self.assertEqual(DailySales.objects.aggregate(n=Sum('orders_count'))['n'], Order.objects.exclude(status='canceled').count())
+
+        # Poucas fotos no disco, compartilhadas pelos produtos, já com derivadas e sem tarefas na fila
+        files = os.listdir(os.path.join(self.media_root, 'products', 'seed'))
+        self.assertEqual(len([name for name in files if name.endswith('.jpg')]), 3)
+        self.assertGreater(ProductImage.objects.count(), 3)
+        self.assertFalse(ProductImage.objects.filter(derivatives={}).exists())
+        self.assertFalse(Task.objects.exists())
+
+    def test_same_seed_same_data_and_reseeding_replaces_it(self):
+        self.seed()
+        first = self.snapshot()
+        Order.objects.create(customer=self.customer, address='Rua A, 1', total=10)
+        self.seed()
+        self.assertEqual(self.snapshot()[0], first[0])
+        # O pedido real continua; os gerados foram refeitos, iguais
+        self.assertEqual(Order.objects.filter(customer=self.customer).count(), 1)
+        self.assertEqual(sorted(Order.objects.exclude(customer=self.customer).values_list('total', 'status')), first[1])
+        self.assertEqual(User.objects.filter(email__endswith='@seed.example.com').count(), 12)
+
+        self.seed(seed=7)
+        self.assertNotEqual(self.snapshot()[0], first[0])
+
+
+# --- RÉPLICA DE LEITURA ---
+class ReplicaRouterTests(SimpleTestCase):
+    router = db_router.ReplicaRouter()
+
+    def test_only_catalog_reads_outside_writes_go_to_the_replica(self):
+        self.assertEqual(self.router.db_for_read(Product), 'replica')
+        self.assertEqual(self.router.db_for_read(Category), 'replica')
+        self.assertIsNone(self.router.db_for_read(Order))
+        self.assertIsNone(self.router.db_for_read(User))
+        self.assertEqual(self.router.db_for_write(Product), 'default')
+        self.assertFalse(self.router.allow_migrate('replica', 'store'))
+        with db_router.use_primary():
+            self.assertIsNone(self.router.db_for_read(Product))
+        self.assertEqual(self.router.db_for_read(Product), 'replica')
+
+    def test_unsafe_requests_read_from_the_primary(self):
+        seen = []
+        middleware = db_router.PrimaryForWritesMiddleware(lambda request: seen.append(self.router.db_for_read(Product)))
+        middleware(RequestFactory().get('/api/products/'))
+        middleware(RequestFactory().post('/api/orders/'))
+        self.assertEqual(seen, ['replica', None])
+
+    def test_async_middleware_keeps_unsafe_requests_on_the_primary(self):
+        seen = []
+
+        async def view(request):
+            seen.append(await sync_to_async(self.router.db_for_read)(Product))
+
+        middleware = db_router.PrimaryForWritesMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        asyncio.run(middleware(RequestFactory().get('/api/products/')))
+        asyncio.run(middleware(RequestFactory().post('/api/orders/')))
+        self.assertEqual(seen, ['replica', None])
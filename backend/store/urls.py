@@ -1,12 +1,14 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import RegisterView, SendSMSCodeView, VerifySMSCodeView, UserMeView
+from . import async_views
+from .views import RegisterView, SendSMSCodeView, VerifySMSCodeView, UserMeView, AdminStatsView
 from .views import (
     ProductViewSet, 
     CategoryViewSet, 
     ProductImageViewSet, 
     OrderViewSet,
-    AddressViewSet
+    AddressViewSet,
+    SiteSettingsViewSet
 )
 
 router = DefaultRouter()
@@ -17,6 +19,7 @@ router.register(r'categories', CategoryViewSet)
 router.register(r'product-images', ProductImageViewSet)
 router.register(r'orders', OrderViewSet, basename='order')
 router.register(r'addresses', AddressViewSet, basename='address')
+router.register(r'site-settings', SiteSettingsViewSet)
 
 # --- URLPATTERNS ---
 urlpatterns = [
@@ -25,4 +28,13 @@ urlpatterns = [
     path('send-sms/', SendSMSCodeView.as_view(), name='send_sms'),
     path('verify-sms/', VerifySMSCodeView.as_view(), name='verify_sms'),
     path('users/me/', UserMeView.as_view(), name='user_me'),
+    path('admin/stats/', AdminStatsView.as_view(), name='admin_stats'),
+
+    # Leituras do catálogo em views assíncronas (ver store/async_views.py)
+    path('async/products/', async_views.ProductListView.as_view(), name='async_product_list'),
+    path('async/products/suggest/', async_views.ProductSuggestView.as_view(), name='async_product_suggest'),
+    path('async/products/<int:pk>/', async_views.ProductDetailView.as_view(), name='async_product_detail'),
+    path('async/categories/', async_views.CategoryTreeView.as_view(), name='async_category_tree'),
+    path('async/site-settings/', async_views.SiteSettingsListView.as_view(), name='async_site_settings_list'),
+    path('async/site-settings/<int:pk>/', async_views.SiteSettingsDetailView.as_view(), name='async_site_settings_detail'),
 ]
\ No newline at end of file
@@ -1,20 +1,31 @@
 from django.shortcuts import render
+from django.conf import settings
+from django.core.cache import cache
 from django.db.models import Q 
 from django_filters.rest_framework import DjangoFilterBackend
 # CORREÇÃO: Adicionei 'filters' aqui na lista de imports
 from rest_framework import viewsets, permissions, status, filters 
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from .models import User, SiteSettings, Category, Product, CustomRequest, ProductImage, Order, Address
+from .models import User, Profile, SiteSettings, Category, Product, CustomRequest, ProductImage, Order, Address, CATEGORY_TREE_CACHE_KEY
 from .serializers import (
-    UserSerializer, SiteSettingsSerializer, CategorySerializer, 
-    ProductSerializer, CustomRequestSerializer, ProductImageSerializer, OrderSerializer, AddressSerializer
+    UserSerializer, SiteSettingsSerializer, CategorySerializer, build_category_tree, 
+    ProductSerializer, ProductListSerializer, CustomRequestSerializer, ProductImageSerializer, OrderSerializer, AddressSerializer
 )
+from .filters import OrderFilter, ProductFilter
+from .pagination import OrderCursorPagination, ProductCursorPagination
+from .search import ProductSearchFilter
+from . import exports, facets, importer, stats, suggest
+from .conditional import collection_version, conditional, object_version
+from .response_cache import CATEGORIES, PRODUCT, PRODUCTS, SITE_SETTINGS, cached_response
+from .notifications import send_sms_code
+from .tasks import enqueue
 #logica para verificacao de sms
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 import random
 from .serializers import RegistrationSerializer
 
@@ -35,6 +46,16 @@ class SiteSettingsViewSet(viewsets.ModelViewSet):
     serializer_class = SiteSettingsSerializer
     permission_classes = [IsAdminOrReadOnly]
 
+    @cached_response(SITE_SETTINGS)
+    @conditional(lambda view, request, **kwargs: collection_version(SiteSettings.objects.all()))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response(SITE_SETTINGS)
+    @conditional(lambda view, request, pk=None, **kwargs: object_version(SiteSettings.objects.all(), pk))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 class CategoryViewSet(viewsets.ModelViewSet):
     # --- MUDANÇA CRÍTICA AQUI ---
     # Antes estava: queryset = Category.objects.all()
@@ -46,23 +67,154 @@ class CategoryViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['show_on_home', 'slug']
 
+    # Segurança extra: o cache é local a cada processo, então expira sozinho
+    # mesmo que a invalidação tenha acontecido em outro worker
+    TREE_CACHE_TIMEOUT = 60 * 15
+
+    @staticmethod
+    def tree_origin(request):
+        # As URLs das imagens são absolutas: uma árvore por origem (esquema + host),
+        # todas na mesma chave para a invalidação apagar tudo de uma vez
+        return request.build_absolute_uri('/')
+
+    def get_tree(self):
+        origin = self.tree_origin(self.request)
+        trees = cache.get(CATEGORY_TREE_CACHE_KEY) or {}
+        if origin not in trees:
+            tree = build_category_tree(Category.objects.order_by('path'), {'request': self.request})
+            trees = {**trees, origin: tree}
+            cache.set(CATEGORY_TREE_CACHE_KEY, trees, self.TREE_CACHE_TIMEOUT)
+        return trees[origin]
+
+    # A árvore inteira aparece em qualquer resposta: a versão é a de todas as categorias
+    @cached_response(CATEGORIES)
+    @conditional(lambda view, request, **kwargs: collection_version(Category.objects.all()))
+    def list(self, request, *args, **kwargs):
+        tree = self.get_tree()
+        if any(field in request.query_params for field in self.filterset_fields):
+            # Com filtros, só descobrimos quais raízes passam (1 query indexada)
+            root_ids = set(self.filter_queryset(self.get_queryset()).values_list('id', flat=True))
+            tree = [node for node in tree if node['id'] in root_ids]
+        return Response(tree)
+
+    @cached_response(CATEGORIES)
+    @conditional(lambda view, request, **kwargs: collection_version(Category.objects.all()))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = ProductCursorPagination
     
     # AGORA VAI FUNCIONAR: 'filters' foi importado lá em cima
-    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductSearchFilter]
     
-    filterset_fields = {
-        'category__slug': ['exact'],
-        'promotional_price': ['isnull', 'lt'], 
-        'base_price': ['lt', 'gt'],
-        'attributes__value': ['exact'],
-    }
+    filterset_class = ProductFilter
     
     ordering_fields = ['id', 'base_price', 'created_at'] 
-    search_fields = ['name', 'description']
+
+    def get_serializer_class(self):
+        # Listagem usa o serializer enxuto; detalhe/escrita usam o completo
+        if self.action == 'list':
+            return ProductListSerializer
+        return ProductSerializer
+
+    def get_queryset(self):
+        if self.action == 'list':
+            return Product.objects.for_listing()
+        return Product.objects.for_detail()
+
+    # Respostas em cache por query string; invalidadas pelos signals de store/response_cache.py.
+    # ETag/Last-Modified: com a versão igual à do cliente, 304 sem serializar (no HIT, sem query).
+    @cached_response(PRODUCTS)
+    @conditional(lambda view, request, **kwargs: collection_version(view.filter_queryset(Product.objects.all())))
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response(PRODUCT, per_object=True)
+    @conditional(lambda view, request, pk=None, **kwargs: object_version(Product.objects.all(), pk))
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        Contagens por atributo para o resultado atual:
+        /products/facets/?category_tree=aneis&attributes=3,7
+        Uma query traz os ids do resultado sem o filtro de atributos;
+        o resto é feito com os bitmaps do FacetIndex.
+        """
+        params = request.query_params.copy()
+        selected = facets.parse_selection(params.pop('attributes', []))
+        match = params.pop('attributes_match', [facets.MATCH_FACET])[-1]
+        if match not in facets.MATCH_MODES:
+            return Response({'attributes_match': f"Use um de: {', '.join(facets.MATCH_MODES)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        filterset = ProductFilter(params, queryset=Product.objects.all(), request=request)
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+        queryset = ProductSearchFilter().filter_queryset(request, filterset.qs, self)
+        base_ids = queryset.order_by().values_list('id', flat=True)
+        return Response(facets.get_index().counts(base_ids, selected, match))
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """
+        Catálogo inteiro (ou filtrado, com os mesmos parâmetros da listagem) em
+        streaming: /products/export/?export_format=csv|jsonl
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in exports.FORMATS:
+            return Response({'export_format': f"Use um de: {', '.join(exports.FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        filterset = ProductFilter(request.query_params, queryset=Product.objects.all(), request=request)
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+        queryset = ProductSearchFilter().filter_queryset(request, filterset.qs, self)
+        return exports.streaming_response(exports.PRODUCT_COLUMNS, exports.product_rows(queryset), export_format, 'produtos', request)
+
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAdminUser], parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        """
+        Importação em lote (multipart, campo 'file', .csv ou .jsonl): cria ou
+        atualiza pelo slug. Para catálogos muito grandes, prefira
+        `manage.py import_products`, que não fica preso ao tempo da requisição.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'file': 'Envie o arquivo no campo "file".'}, status=status.HTTP_400_BAD_REQUEST)
+        import_format = request.data.get('import_format') or importer.guess_format(upload.name)
+        if import_format not in importer.FORMATS:
+            return Response({'import_format': f"Use um de: {', '.join(importer.FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        # Fotos só por URL https dos hosts de IMPORT_IMAGE_HOSTS; caminhos locais só no comando
+        result = importer.ProductImporter(image_hosts=settings.IMPORT_IMAGE_HOSTS).run(
+            importer.read_rows(importer.text_stream(upload), import_format)
+        )
+        return Response(result)
+
+    SUGGEST_MAX_LIMIT = 10
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """
+        Autocomplete da Navbar: /products/suggest/?q=anel&limit=5
+        Responde direto do índice de prefixos em memória, sem tocar no banco.
+        """
+        return Response(self.suggestion_results(suggest.get_index(), request))
+
+    @classmethod
+    def suggestion_results(cls, index, request):
+        # Também usado pela versão assíncrona (store/async_views.py)
+        try:
+            limit = min(int(request.query_params.get('limit', 5)), cls.SUGGEST_MAX_LIMIT)
+        except ValueError:
+            limit = 5
+        results = index.suggest(request.query_params.get('q', ''), limit=max(limit, 1))
+        for item in results:
+            if item['cover_image']:
+                item['cover_image'] = request.build_absolute_uri(item['cover_image'])
+        return results
 
 class CustomRequestViewSet(viewsets.ModelViewSet):
     serializer_class = CustomRequestSerializer
@@ -78,7 +230,7 @@ class CustomRequestViewSet(viewsets.ModelViewSet):
 
 # NOVA VIEWSET
 class ProductImageViewSet(viewsets.ModelViewSet):
-    queryset = ProductImage.objects.all()
+    queryset = ProductImage.objects.select_related('product')
     serializer_class = ProductImageSerializer
     permission_classes = [IsAdminOrReadOnly]
 
@@ -86,6 +238,10 @@ class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
     # 1. SEGURANÇA MÁXIMA: Só entra se tiver crachá (Token)
     permission_classes = [IsAuthenticated]
+    # Listagem paginada e filtrada no banco (?status=, ?created_after=, ?customer=, ?guest_email=, ?search=)
+    pagination_class = OrderCursorPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = OrderFilter
 
     # 2. Filtro de Segurança (Cada um vê o seu)
     def get_queryset(self):
@@ -93,11 +249,23 @@ class OrderViewSet(viewsets.ModelViewSet):
         
         # Admin vê tudo
         if user.is_staff:
-            return Order.objects.all().order_by('-created_at')
+            return Order.objects.with_items()
             
         # Usuário normal vê apenas os pedidos DELE
         # (Não precisamos mais checar if is_authenticated, o permission_classes já garantiu isso)
-        return Order.objects.filter(customer=user).order_by('-created_at')
+        return Order.objects.with_items().filter(customer=user)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """
+        Pedidos em streaming, uma linha por item, com os filtros da listagem:
+        /orders/export/?export_format=csv&status=paid&created_after=2026-01-01
+        """
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in exports.FORMATS:
+            return Response({'export_format': f"Use um de: {', '.join(exports.FORMATS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        orders = self.filter_queryset(Order.objects.all())
+        return exports.streaming_response(exports.ORDER_COLUMNS, exports.order_rows(orders), export_format, 'pedidos', request)
 
     # 3. Associar o Usuário ao Pedido Automaticamente
     def perform_create(self, serializer):
@@ -116,26 +284,26 @@ class SendSMSCodeView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request):
-        user = request.user
+        # Profile sempre do banco: o request.user pode vir do user_cache, uma cópia
+        # de até AUTH_USER_CACHE_TTL segundos feita por este processo
+        profile = Profile.objects.get(user=request.user)
         phone = request.data.get('phone')
-        
+        fields = ['verification_code']
+
         if phone:
-            user.profile.phone = phone
-            user.profile.save()
+            profile.phone = phone
+            fields.append('phone')
 
         # Gera código de 6 dígitos
         code = str(random.randint(100000, 999999))
-        user.profile.verification_code = code
-        user.profile.save()
+        profile.verification_code = code
+        # Só os campos alterados: não sobrescreve o que outra requisição gravou
+        profile.save(update_fields=fields)
 
-        # --- LÓGICA DO SMS FAKE ---
-        print("\n" + "="*30)
-        print(f"📱 [SMS FAKE] Para: {user.profile.phone}")
-        print(f"🔑 CÓDIGO: {code}")
-        print("="*30 + "\n")
-        # --------------------------
+        # O envio fica com o worker (manage.py run_worker); a resposta não espera o provedor
+        enqueue(send_sms_code, phone=profile.phone, code=code)
 
-        return Response({"message": "Código enviado (verifique o console do servidor)"})
+        return Response({"message": "Código enviado (verifique o console do worker)"})
 
 # View para Verificar Código
 class VerifySMSCodeView(APIView):
@@ -143,12 +311,13 @@ class VerifySMSCodeView(APIView):
 
     def post(self, request):
         code = request.data.get('code')
-        user = request.user
+        # Do banco, não do user_cache: o código pode ter sido gerado em outro processo
+        profile = Profile.objects.get(user=request.user)
 
-        if user.profile.verification_code == code:
-            user.profile.is_phone_verified = True
-            user.profile.verification_code = None # Limpa o código
-            user.profile.save()
+        if code and profile.verification_code == code:
+            profile.is_phone_verified = True
+            profile.verification_code = None # Limpa o código
+            profile.save(update_fields=['is_phone_verified', 'verification_code'])
             return Response({"message": "Telefone verificado com sucesso!"})
         
         return Response({"error": "Código inválido"}, status=status.HTTP_400_BAD_REQUEST)
@@ -180,4 +349,18 @@ class AddressViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         # Ao criar, associa automaticamente ao usuário logado
-        serializer.save(user=self.request.user)
\ No newline at end of file
+        serializer.save(user=self.request.user)
+
+
+# --- DASHBOARD DO ADMIN ---
+class AdminStatsView(APIView):
+    """Vendas, ticket médio, série diária e mais vendidos, lidos do consolidado DailySales."""
+    permission_classes = [IsAdminUser]
+    MAX_DAYS = 365
+
+    def get(self, request):
+        try:
+            days = min(max(int(request.query_params.get('days', 30)), 1), self.MAX_DAYS)
+        except ValueError:
+            days = 30
+        return Response(stats.summary(days=days))
@@ -1,20 +1,49 @@
 "use client";
 
+import { useEffect, useState } from "react";
 import { DollarSign, ShoppingBag, Package, TrendingUp } from "lucide-react";
+import { getAdminStats } from "@/services/api";
+
+// Formato devolvido por /admin/stats/
+interface DayStats {
+  date: string;
+  revenue: string;
+  orders: number;
+}
+
+interface AdminStats {
+  today: { revenue: string; orders: number; average_ticket: string };
+  period: { days: number; revenue: string; orders: number; items_sold: number; average_ticket: string };
+  active_products: number;
+  series: DayStats[];
+  top_products: { id: number; name: string; quantity: number; revenue: string }[];
+}
+
+const formatMoney = (value: string) =>
+  Number(value).toLocaleString("pt-BR", { style: "currency", currency: "BRL" });
 
 export default function DashboardPage() {
+  const [stats, setStats] = useState<AdminStats | null>(null);
+
+  useEffect(() => {
+    getAdminStats(30).then(setStats).catch(() => setStats(null));
+  }, []);
+
+  const cards = [
+    { title: "Vendas Hoje", value: stats ? formatMoney(stats.today.revenue) : "-", icon: DollarSign, color: "bg-blue-500" },
+    { title: "Pedidos Hoje", value: stats ? String(stats.today.orders) : "-", icon: ShoppingBag, color: "bg-emerald-500" },
+    { title: "Produtos", value: stats ? String(stats.active_products) : "-", icon: Package, color: "bg-purple-500" },
+    { title: "Ticket Médio (30d)", value: stats ? formatMoney(stats.period.average_ticket) : "-", icon: TrendingUp, color: "bg-orange-500" },
+  ];
+  const maxRevenue = stats ? Math.max(1, ...stats.series.map((day) => Number(day.revenue))) : 1;
+
   return (
     <div>
       <h1 className="text-3xl font-serif text-gray-800 mb-8">Visão Geral</h1>
 
-      {/* Cards de Estatísticas (Dados Fictícios por enquanto) */}
+      {/* Cards de Estatísticas */}
       <div className="grid grid-cols-1 md:grid-cols-4 gap-6 mb-8">
-        {[
-          { title: "Vendas Hoje", value: "R$ 1.250", icon: DollarSign, color: "bg-blue-500" },
-          { title: "Pedidos", value: "12", icon: ShoppingBag, color: "bg-emerald-500" },
-          { title: "Produtos", value: "45", icon: Package, color: "bg-purple-500" },
-          { title: "Ticket Médio", value: "R$ 310", icon: TrendingUp, color: "bg-orange-500" },
-        ].map((stat, index) => (
+        {cards.map((stat, index) => (
           <div key={index} className="bg-white p-6 rounded-xl shadow-sm border border-gray-100 flex items-center">
             <div className={`p-4 rounded-full text-white mr-4 ${stat.color}`}>
               <stat.icon className="w-6 h-6" />
@@ -27,11 +56,39 @@ export default function DashboardPage() {
         ))}
       </div>
 
-      {/* Área de conteúdo futuro */}
-      <div className="bg-white rounded-xl shadow-sm border border-gray-100 p-8 h-96 flex flex-col items-center justify-center text-gray-400">
-        <TrendingUp className="w-16 h-16 mb-4 opacity-20" />
-        <p>Em breve: Gráfico de vendas dos últimos 30 dias.</p>
+      <div className="grid grid-cols-1 lg:grid-cols-3 gap-6">
+        {/* Vendas dos últimos 30 dias */}
+        <div className="lg:col-span-2 bg-white rounded-xl shadow-sm border border-gray-100 p-8">
+          <div className="flex justify-between items-baseline mb-6">
+            <h2 className="text-lg font-bold text-gray-800">Vendas dos últimos 30 dias</h2>
+            {stats && <span className="text-sm text-gray-500">{formatMoney(stats.period.revenue)} em {stats.period.orders} pedidos</span>}
+          </div>
+          <div className="h-64 flex items-end gap-1">
+            {stats?.series.map((day) => (
+              <div
+                key={day.date}
+                title={`${day.date}: ${formatMoney(day.revenue)} (${day.orders} pedidos)`}
+                className="flex-1 bg-blue-500/80 hover:bg-blue-600 rounded-t"
+                style={{ height: `${(Number(day.revenue) / maxRevenue) * 100}%` }}
+              />
+            ))}
+          </div>
+        </div>
+
+        {/* Mais vendidos */}
+        <div className="bg-white rounded-xl shadow-sm border border-gray-100 p-8">
+          <h2 className="text-lg font-bold text-gray-800 mb-6">Mais vendidos</h2>
+          <ul className="space-y-4">
+            {stats?.top_products.map((product) => (
+              <li key={product.id} className="flex justify-between text-sm">
+                <span className="text-gray-700">{product.name}</span>
+                <span className="text-gray-500">{product.quantity} un. · {formatMoney(product.revenue)}</span>
+              </li>
+            ))}
+            {stats && stats.top_products.length === 0 && <li className="text-sm text-gray-400">Nenhuma venda no período.</li>}
+          </ul>
+        </div>
       </div>
     </div>
   );
-}
\ No newline at end of file
+}
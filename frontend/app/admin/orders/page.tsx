@@ -2,8 +2,8 @@
 
 import { useEffect, useState } from "react";
 import Link from "next/link";
-import { Search, Eye, ShoppingBag } from "lucide-react";
-import { getOrders } from "@/services/api";
+import { Search, Eye, ShoppingBag, Download } from "lucide-react";
+import { getOrders, downloadOrdersExport } from "@/services/api";
 
 interface Order {
   id: number;
@@ -16,34 +16,52 @@ interface Order {
 
 export default function AdminOrdersPage() {
   const [orders, setOrders] = useState<Order[]>([]);
+  const [nextUrl, setNextUrl] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState("");
+  const [statusFilter, setStatusFilter] = useState("");
+  const [createdAfter, setCreatedAfter] = useState("");
+  const [createdBefore, setCreatedBefore] = useState("");
 
+  // Busca e filtros rodam no servidor; espera o usuário parar de digitar
   useEffect(() => {
-    loadData();
-  }, []);
+    const timer = setTimeout(() => loadData(), 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm, statusFilter, createdAfter, createdBefore]);
+
+  function currentFilters() {
+    const params: Record<string, string> = {};
+    if (searchTerm) params.search = searchTerm;
+    if (statusFilter) params.status = statusFilter;
+    if (createdAfter) params.created_after = createdAfter;
+    if (createdBefore) params.created_before = createdBefore;
+    return params;
+  }
 
   async function loadData() {
     setLoading(true);
-    const data = await getOrders();
-    setOrders(data);
+    const data = await getOrders(currentFilters());
+    setOrders(data.results);
+    setNextUrl(data.next);
     setLoading(false);
   }
 
+  async function loadMore() {
+    if (!nextUrl) return;
+    const data = await getOrders({}, nextUrl);
+    setOrders([...orders, ...data.results]);
+    setNextUrl(data.next);
+  }
+
   // Mapa de cores e textos para os status
   const statusMap: Record<string, { label: string; color: string }> = {
     pending: { label: "Pendente", color: "bg-yellow-100 text-yellow-800" },
     paid: { label: "Pago", color: "bg-emerald-100 text-emerald-800" },
     shipped: { label: "Enviado", color: "bg-blue-100 text-blue-800" },
     delivered: { label: "Entregue", color: "bg-purple-100 text-purple-800" },
-    cancelled: { label: "Cancelado", color: "bg-red-100 text-red-800" },
+    canceled: { label: "Cancelado", color: "bg-red-100 text-red-800" },
   };
 
-  const filteredOrders = orders.filter(order => 
-    order.id.toString().includes(searchTerm) || 
-    order.customer_email.toLowerCase().includes(searchTerm.toLowerCase())
-  );
-
   return (
     <div>
       <h1 className="text-3xl font-serif text-gray-800 mb-2">Pedidos</h1>
@@ -59,13 +77,31 @@ export default function AdminOrdersPage() {
           value={searchTerm}
           onChange={(e) => setSearchTerm(e.target.value)}
         />
+        <select
+          className="text-sm text-gray-700 border border-gray-200 rounded p-2"
+          value={statusFilter} onChange={(e) => setStatusFilter(e.target.value)}
+        >
+          <option value="">Todos os status</option>
+          {Object.entries(statusMap).map(([value, info]) => (
+            <option key={value} value={value}>{info.label}</option>
+          ))}
+        </select>
+        <input type="date" className="text-sm text-gray-700 border border-gray-200 rounded p-2" value={createdAfter} onChange={(e) => setCreatedAfter(e.target.value)} />
+        <input type="date" className="text-sm text-gray-700 border border-gray-200 rounded p-2" value={createdBefore} onChange={(e) => setCreatedBefore(e.target.value)} />
+        <button
+          onClick={() => downloadOrdersExport(currentFilters())}
+          className="inline-flex items-center gap-2 text-sm font-bold text-gray-700 border border-gray-200 rounded p-2 hover:bg-gray-50 transition"
+          title="Exportar pedidos filtrados (CSV)"
+        >
+          <Download className="w-4 h-4" /> CSV
+        </button>
       </div>
 
       {/* Tabela */}
       <div className="bg-white rounded-xl shadow-sm border border-gray-100 overflow-hidden">
         {loading ? (
           <div className="p-12 text-center text-gray-400">Carregando vendas...</div>
-        ) : filteredOrders.length === 0 ? (
+        ) : orders.length === 0 ? (
           <div className="p-12 text-center flex flex-col items-center text-gray-400">
             <ShoppingBag className="w-10 h-10 mb-3 opacity-50" />
             <p>Nenhum pedido encontrado.</p>
@@ -84,7 +120,7 @@ export default function AdminOrdersPage() {
                 </tr>
               </thead>
               <tbody className="divide-y divide-gray-100">
-                {filteredOrders.map((order) => {
+                {orders.map((order) => {
                   const statusInfo = statusMap[order.status] || { label: order.status, color: "bg-gray-100" };
                   const date = new Date(order.created_at).toLocaleDateString('pt-BR');
 
@@ -113,6 +149,11 @@ export default function AdminOrdersPage() {
                 })}
               </tbody>
             </table>
+            {nextUrl && (
+              <button onClick={loadMore} className="w-full py-4 text-sm font-bold text-gray-600 hover:bg-gray-50 transition">
+                Carregar mais
+              </button>
+            )}
           </div>
         )}
       </div>
@@ -2,7 +2,7 @@
 
 import { useEffect, useState } from "react";
 import Link from "next/link";
-import { Plus, Pencil, Trash2, Search, AlertCircle } from "lucide-react";
+import { Plus, Pencil, Trash2, Search, AlertCircle, Loader2 } from "lucide-react";
 import { getProducts, deleteProduct } from "@/services/api";
 
 interface Product {
@@ -10,27 +10,44 @@ interface Product {
   name: string;
   base_price: string;
   category_name: string; // O serializer já manda esse campo
-  images: { image: string }[];
+  cover_image: string | null;
 }
 
 export default function AdminProductsPage() {
   const [products, setProducts] = useState<Product[]>([]);
   const [loading, setLoading] = useState(true);
   const [searchTerm, setSearchTerm] = useState("");
+  // A listagem é paginada por cursor: 'next' aponta para a próxima página
+  const [next, setNext] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
-  // Carrega produtos ao abrir
+  // Carrega produtos ao abrir e a cada busca (com um pequeno atraso para não
+  // disparar uma requisição por tecla)
   useEffect(() => {
-    loadData();
-  }, []);
+    const timer = setTimeout(() => loadData(searchTerm), 300);
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
 
-  async function loadData() {
+  async function loadData(term: string) {
     setLoading(true);
-    const data = await getProducts();
-    // Ordena pelo ID decrescente (mais novos primeiro)
-    setProducts(data.sort((a: Product, b: Product) => b.id - a.id));
+    // A busca é feita no servidor, sobre o catálogo inteiro; sem busca, os
+    // mais novos vêm primeiro
+    const params: Record<string, string> = term.trim() ? { search: term.trim() } : { ordering: "-id" };
+    const page = await getProducts(params);
+    setProducts(page.results);
+    setNext(page.next);
     setLoading(false);
   }
 
+  async function loadMore() {
+    if (!next) return;
+    setLoadingMore(true);
+    const page = await getProducts({}, next);
+    setProducts((current) => [...current, ...page.results]);
+    setNext(page.next);
+    setLoadingMore(false);
+  }
+
   // Função de Excluir
   async function handleDelete(id: number) {
     if (confirm("Tem certeza que deseja excluir este produto?")) {
@@ -46,7 +63,7 @@ export default function AdminProductsPage() {
   }
 
   // Filtro simples no front (para listas pequenas/médias é instantâneo)
-  const filteredProducts = products.filter(p => 
+  const products = products.filter(p => 
     p.name.toLowerCase().includes(searchTerm.toLowerCase())
   );
 
@@ -83,7 +100,7 @@ export default function AdminProductsPage() {
       <div className="bg-white rounded-xl shadow-sm border border-gray-100 overflow-hidden">
         {loading ? (
           <div className="p-12 text-center text-gray-400">Carregando estoque...</div>
-        ) : filteredProducts.length === 0 ? (
+        ) : products.length === 0 ? (
           <div className="p-12 text-center flex flex-col items-center text-gray-400">
             <AlertCircle className="w-10 h-10 mb-3 opacity-50" />
             <p>Nenhum produto encontrado.</p>
@@ -101,12 +118,12 @@ export default function AdminProductsPage() {
                 </tr>
               </thead>
               <tbody className="divide-y divide-gray-100">
-                {filteredProducts.map((product) => (
+                {products.map((product) => (
                   <tr key={product.id} className="hover:bg-gray-50 transition">
                     <td className="px-6 py-4">
                       <div className="w-12 h-12 bg-gray-100 rounded-lg overflow-hidden border border-gray-200">
-                        {product.images[0] ? (
-                          <img src={product.images[0].image} alt="" className="w-full h-full object-cover" />
+                        {product.cover_image ? (
+                          <img src={product.cover_image} alt="" className="w-full h-full object-cover" />
                         ) : (
                           <div className="w-full h-full flex items-center justify-center text-xs text-gray-400">Sem foto</div>
                         )}
@@ -144,6 +161,17 @@ export default function AdminProductsPage() {
           </div>
         )}
       </div>
+
+      {next && !loading && (
+        <button
+          onClick={loadMore}
+          disabled={loadingMore}
+          className="mt-6 w-full py-3 text-sm font-bold text-gray-600 border border-gray-200 rounded-lg hover:bg-gray-50 transition disabled:opacity-50 flex items-center justify-center gap-2"
+        >
+          {loadingMore && <Loader2 className="w-4 h-4 animate-spin" />}
+          Carregar mais
+        </button>
+      )}
     </div>
   );
 }
\ No newline at end of file
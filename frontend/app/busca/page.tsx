@@ -3,39 +3,49 @@
 import { useEffect, useState, Suspense } from "react";
 import { useSearchParams } from "next/navigation";
 import Link from "next/link";
-import { api } from "@/services/api"; // Certifique-se de importar o axios instance corretamente
+import { Loader2 } from "lucide-react";
+import { getProducts } from "@/services/api";
 
 // Componente interno que usa useSearchParams
 function SearchContent() {
   const searchParams = useSearchParams();
   const query = searchParams.get("q"); // Pega o termo "ouro" da URL
-  const [products, setProducts] = useState([]);
+  const [products, setProducts] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
+  // Cursor da próxima página de resultados
+  const [next, setNext] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     async function fetchSearch() {
       if (query) {
         setLoading(true);
-        try {
-          // Usa o endpoint de produtos com o filtro ?search=
-          const response = await api.get(`/products/?search=${query}`);
-          setProducts(response.data);
-        } catch (error) {
-          console.error("Erro na busca:", error);
-        } finally {
-          setLoading(false);
-        }
+        // Usa o endpoint de produtos com o filtro ?search= (erros viram página vazia)
+        const page = await getProducts({ search: query });
+        setProducts(page.results);
+        setNext(page.next);
+        setLoading(false);
       }
     }
     fetchSearch();
   }, [query]);
 
+  async function loadMore() {
+    if (!next) return;
+    setLoadingMore(true);
+    const page = await getProducts({}, next);
+    setProducts((current) => [...current, ...page.results]);
+    setNext(page.next);
+    setLoadingMore(false);
+  }
+
   return (
     <div className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-12">
       <h1 className="text-3xl font-serif text-gray-900 mb-2">
         Resultados para "{query}"
       </h1>
-      <p className="text-gray-500 mb-8">{products.length} produtos encontrados</p>
+      {/* Sem contagem total na paginação por cursor: "+" indica que há mais páginas */}
+      <p className="text-gray-500 mb-8">{products.length}{next ? "+" : ""} produtos encontrados</p>
 
       {loading ? (
         <div className="text-center py-20">Carregando...</div>
@@ -49,7 +59,7 @@ function SearchContent() {
              <Link key={product.id} href={`/produto/${product.id}/${product.slug}`} className="group block">
                {/* Reutilizando o visual do card simples */}
                <div className="aspect-square bg-gray-100 rounded-lg overflow-hidden mb-2 relative">
-                 <img src={product.images[0]?.image} alt={product.name} className="w-full h-full object-cover group-hover:scale-105 transition duration-500" />
+                 <img src={product.cover_image} alt={product.name} className="w-full h-full object-cover group-hover:scale-105 transition duration-500" />
                </div>
                <h3 className="font-medium text-gray-900">{product.name}</h3>
                <p className="text-sm text-gray-500">R$ {product.base_price}</p>
@@ -57,6 +67,17 @@ function SearchContent() {
           ))}
         </div>
       )}
+
+      {next && !loading && (
+        <button
+          onClick={loadMore}
+          disabled={loadingMore}
+          className="mt-8 w-full py-3 text-sm font-bold text-gray-600 border border-gray-200 rounded-lg hover:bg-gray-50 transition disabled:opacity-50 flex items-center justify-center gap-2"
+        >
+          {loadingMore && <Loader2 className="w-4 h-4 animate-spin" />}
+          Carregar mais
+        </button>
+      )}
     </div>
   );
 }
@@ -3,14 +3,18 @@
 import { useEffect, useState } from "react";
 import { useParams } from "next/navigation";
 import Link from "next/link";
-import { ArrowLeft } from "lucide-react";
+import { ArrowLeft, Loader2 } from "lucide-react";
 import { api } from "@/services/api"; // Usar api direta para filtros customizados
-import ProductFilters from "@/components/ProductFilters"; // <--- Importe
+import ProductFilters, { Facet } from "@/components/ProductFilters"; // <--- Importe
 
 export default function CategoryPage() {
   const params = useParams();
   const [products, setProducts] = useState<any[]>([]);
+  const [facets, setFacets] = useState<Facet[]>([]);
   const [loading, setLoading] = useState(true);
+  // Cursor da próxima página (já carrega os filtros aplicados)
+  const [next, setNext] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // Pega o último slug (ex: 'solitarios')
   const slugArray = Array.isArray(params.slug) ? params.slug : [params.slug];
@@ -20,22 +24,26 @@ export default function CategoryPage() {
   async function fetchProducts(filters: any = {}) {
     setLoading(true);
     try {
-      // Monta a URL base: /products/?category__slug=aneis
-      let url = `/products/?category__slug=${targetSlug}`;
+      // Monta a query base: category_tree=aneis (inclui as subcategorias)
+      let query = `category_tree=${targetSlug}`;
 
       // Adiciona filtros extras se existirem
-      if (filters.min_price) url += `&base_price__gt=${filters.min_price}`;
-      if (filters.max_price) url += `&base_price__lt=${filters.max_price}`;
+      if (filters.min_price) query += `&base_price__gt=${filters.min_price}`;
+      if (filters.max_price) query += `&base_price__lt=${filters.max_price}`;
       
-      // Filtro de Atributo (Material)
-      if (filters.material && filters.material.length > 0) {
-        // Exemplo simples: pega o primeiro selecionado (Django filter simples)
-        // Para múltiplo necessitaria de lógica "in" mais complexa no backend
-        url += `&attributes__value=${filters.material[0]}`;
+      // Atributos: OU dentro do mesmo atributo, E entre atributos diferentes
+      if (filters.attributes && filters.attributes.length > 0) {
+        query += `&attributes=${filters.attributes.join(",")}`;
       }
 
-      const response = await api.get(url);
-      setProducts(response.data);
+      // Produtos e contagens das facetas para o mesmo filtro
+      const [response, facetsResponse] = await Promise.all([
+        api.get(`/products/?${query}`),
+        api.get(`/products/facets/?${query}`),
+      ]);
+      setProducts(response.data.results);
+      setNext(response.data.next);
+      setFacets(facetsResponse.data);
     } catch (error) {
       console.error("Erro ao buscar", error);
     } finally {
@@ -43,6 +51,20 @@ export default function CategoryPage() {
     }
   }
 
+  async function loadMore() {
+    if (!next) return;
+    setLoadingMore(true);
+    try {
+      const response = await api.get(next);
+      setProducts((current) => [...current, ...response.data.results]);
+      setNext(response.data.next);
+    } catch (error) {
+      console.error("Erro ao buscar", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  }
+
   // Carrega inicial
   useEffect(() => {
     if (targetSlug) fetchProducts();
@@ -66,7 +88,7 @@ export default function CategoryPage() {
           
           {/* COLUNA 1: FILTROS (Sidebar) */}
           <div className="hidden lg:block">
-            <ProductFilters onFilterChange={(f) => fetchProducts(f)} />
+            <ProductFilters facets={facets} onFilterChange={(f) => fetchProducts(f)} />
           </div>
 
           {/* COLUNA 2: PRODUTOS */}
@@ -80,7 +102,7 @@ export default function CategoryPage() {
                  {products.map((product) => (
                     <Link key={product.id} href={`/produto/${product.id}/${product.slug}`} className="group block">
                       <div className="aspect-[4/5] bg-gray-50 rounded-xl overflow-hidden mb-3 relative">
-                        <img src={product.images[0]?.image} className="w-full h-full object-cover group-hover:scale-105 transition" />
+                        <img src={product.cover_image} className="w-full h-full object-cover group-hover:scale-105 transition" />
                       </div>
                       <h3 className="font-serif text-lg">{product.name}</h3>
                       <p className="font-bold">R$ {product.base_price}</p>
@@ -88,6 +110,17 @@ export default function CategoryPage() {
                  ))}
                </div>
              )}
+
+             {next && !loading && (
+               <button
+                 onClick={loadMore}
+                 disabled={loadingMore}
+                 className="mt-8 w-full py-3 text-sm font-bold text-gray-600 border border-gray-200 rounded-lg hover:bg-gray-50 transition disabled:opacity-50 flex items-center justify-center gap-2"
+               >
+                 {loadingMore && <Loader2 className="w-4 h-4 animate-spin" />}
+                 Carregar mais
+               </button>
+             )}
           </div>
         </div>
 
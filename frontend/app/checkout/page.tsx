@@ -182,6 +182,8 @@ export default function CheckoutPage() {
         total: cartTotal,
         items_data: safeItems.map(item => ({
           product_id: item.id,
+          // Variação escolhida na página do produto (ver ProductActions)
+          options: item.options ?? [],
           quantity: item.quantity,
           price: typeof item.base_price === 'string' ? parseFloat(item.base_price) : item.price
         }))
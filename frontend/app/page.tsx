@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useState } from "react";
-import { getProducts, getCategories, getProductsByCategory } from "@/services/api";
+import { getNewArrivals, getOffers, getCategories, getProductsByCategory } from "@/services/api";
 import ProductRow from "@/components/ProductRow";
 import Link from "next/link";
 
@@ -11,7 +11,7 @@ interface Product {
   slug: string;
   base_price: string;
   promotional_price?: string | null;
-  images: any[];
+  cover_image: string | null;
 }
 
 export default function Home() {
@@ -30,28 +30,22 @@ export default function Home() {
     async function loadHomeData() {
       setLoading(true);
       
-      // 1. Busca todos os produtos para filtrar Novidades e Ofertas
-      const allProducts = await getProducts();
-      
-      // Lógica Novidades: Os últimos cadastrados (Inverte o array e pega 5)
-      // Como o ID cresce, os ultimos IDs são os mais novos
-      const sortedByNew = [...allProducts].sort((a, b) => b.id - a.id);
-      setNewArrivals(sortedByNew);
-
-      // Lógica Ofertas: Produtos com promotional_price
-      const productsWithOffers = allProducts.filter((p: Product) => p.promotional_price);
-      setOffers(productsWithOffers);
+      // 1. Novidades e Ofertas: a primeira página de cada listagem, já
+      // ordenada (mais novos primeiro) e filtrada pelo servidor
+      const [arrivals, productsWithOffers] = await Promise.all([getNewArrivals(), getOffers()]);
+      setNewArrivals(arrivals.results);
+      setOffers(productsWithOffers.results);
 
       // 2. Busca produtos das categorias específicas para as linhas de baixo
       // (No futuro, o Admin Panel vai definir quais slugs aparecem aqui)
       const dataCat1 = await getProductsByCategory('aneis');
-      setCat1Products(dataCat1);
+      setCat1Products(dataCat1.results);
 
       const dataCat2 = await getProductsByCategory('colares');
-      setCat2Products(dataCat2);
+      setCat2Products(dataCat2.results);
 
       const dataCat3 = await getProductsByCategory('brincos');
-      setCat3Products(dataCat3);
+      setCat3Products(dataCat3.results);
 
       setLoading(false);
     }
@@ -51,6 +51,9 @@ function ProfileContent() {
   // Estados de Dados
   const [addresses, setAddresses] = useState<any[]>([]);
   const [orders, setOrders] = useState<Order[]>([]);
+  // Próxima página do cursor (a API devolve { next, previous, results })
+  const [ordersNext, setOrdersNext] = useState<string | null>(null);
+  const [loadingMoreOrders, setLoadingMoreOrders] = useState(false);
   
   // Estados de Loading
   const [loadingAddr, setLoadingAddr] = useState(false);
@@ -93,12 +96,29 @@ function ProfileContent() {
     if (activeTab === 'orders') {
       setLoadingOrders(true);
       getOrders()
-        .then(setOrders)
+        .then((data) => {
+          setOrders(data.results);
+          setOrdersNext(data.next);
+        })
         .catch(console.error)
         .finally(() => setLoadingOrders(false));
     }
   }, [activeTab]);
 
+  const loadMoreOrders = async () => {
+    if (!ordersNext) return;
+    setLoadingMoreOrders(true);
+    try {
+      const data = await getOrders({}, ordersNext);
+      setOrders((current) => [...current, ...data.results]);
+      setOrdersNext(data.next);
+    } catch (error) {
+      console.error(error);
+    } finally {
+      setLoadingMoreOrders(false);
+    }
+  };
+
   const handleSaveAddress = async () => {
     if (!newAddr.street || !newAddr.zip_code) return alert("Preencha os dados obrigatórios");
     try {
@@ -257,6 +277,15 @@ function ProfileContent() {
                           </div>
                        );
                     })}
+                    {ordersNext && (
+                       <button
+                          onClick={loadMoreOrders}
+                          disabled={loadingMoreOrders}
+                          className="w-full py-3 text-sm font-bold text-gray-600 border border-gray-200 rounded-lg hover:bg-gray-50 transition disabled:opacity-50"
+                       >
+                          {loadingMoreOrders ? <Loader2 className="w-4 h-4 animate-spin mx-auto"/> : "Carregar mais"}
+                       </button>
+                    )}
                  </div>
               )}
             </div>
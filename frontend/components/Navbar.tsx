@@ -20,7 +20,7 @@ interface ProductSuggestion {
   name: string;
   slug: string;
   base_price: string;
-  images: { image: string }[];
+  cover_image: string | null;
 }
 
 export default function Navbar() {
@@ -55,8 +55,9 @@ export default function Navbar() {
     const delayDebounceFn = setTimeout(async () => {
       if (searchTerm.length >= 2) {
         try {
-          const response = await api.get(`/products/?search=${searchTerm}`);
-          setSuggestions(response.data.slice(0, 5));
+          // Endpoint leve: só id, nome, slug e capa dos 5 primeiros
+          const response = await api.get(`/products/suggest/?q=${encodeURIComponent(searchTerm)}&limit=5`);
+          setSuggestions(response.data);
           setShowSuggestions(true);
         } catch (error) {
           console.error("Erro no autocomplete:", error);
@@ -177,8 +178,8 @@ export default function Navbar() {
                           className="flex items-center gap-3 p-3 hover:bg-emerald-50 transition border-b border-gray-50 last:border-0 group"
                         >
                           <div className="w-10 h-10 rounded bg-gray-200 overflow-hidden flex-shrink-0">
-                            {product.images?.[0]?.image ? (
-                               <img src={product.images[0].image} alt={product.name} className="w-full h-full object-cover" />
+                            {product.cover_image ? (
+                               <img src={product.cover_image} alt={product.name} className="w-full h-full object-cover" />
                             ) : (
                                <div className="w-full h-full flex items-center justify-center text-[8px] text-gray-500">Foto</div>
                             )}
@@ -2,28 +2,43 @@
 
 import { useState } from "react";
 
+// Formato devolvido por /products/facets/
+export interface FacetValue {
+  id: number;
+  value: string;
+  count: number;
+  selected: boolean;
+}
+
+export interface Facet {
+  attribute: string;
+  name: string;
+  values: FacetValue[];
+}
+
 interface ProductFiltersProps {
+  facets: Facet[];
   onFilterChange: (filters: any) => void;
 }
 
-export default function ProductFilters({ onFilterChange }: ProductFiltersProps) {
+export default function ProductFilters({ facets, onFilterChange }: ProductFiltersProps) {
   const [minPrice, setMinPrice] = useState("");
   const [maxPrice, setMaxPrice] = useState("");
-  const [material, setMaterial] = useState<string[]>([]);
+  const [attributes, setAttributes] = useState<number[]>([]);
 
   const handleApply = () => {
     onFilterChange({
       min_price: minPrice,
       max_price: maxPrice,
-      material: material
+      attributes: attributes
     });
   };
 
-  const toggleMaterial = (value: string) => {
-    if (material.includes(value)) {
-      setMaterial(material.filter(m => m !== value));
+  const toggleAttribute = (id: number) => {
+    if (attributes.includes(id)) {
+      setAttributes(attributes.filter(a => a !== id));
     } else {
-      setMaterial([...material, value]);
+      setAttributes([...attributes, id]);
     }
   };
 
@@ -33,41 +48,44 @@ export default function ProductFilters({ onFilterChange }: ProductFiltersProps)
       <div>
         <h3 className="text-sm font-bold uppercase tracking-widest mb-4">Preço</h3>
         <div className="flex items-center gap-2 mb-4">
-          <input 
-            type="number" placeholder="Min" 
+          <input
+            type="number" placeholder="Min"
             className="w-full p-2 border border-gray-200 rounded text-sm"
             value={minPrice} onChange={(e) => setMinPrice(e.target.value)}
           />
           <span className="text-gray-400">-</span>
-          <input 
-            type="number" placeholder="Max" 
+          <input
+            type="number" placeholder="Max"
             className="w-full p-2 border border-gray-200 rounded text-sm"
             value={maxPrice} onChange={(e) => setMaxPrice(e.target.value)}
           />
         </div>
       </div>
 
-      {/* Filtro de Material (Hardcoded por enquanto, depois pode vir da API) */}
-      <div>
-        <h3 className="text-sm font-bold uppercase tracking-widest mb-4">Material</h3>
-        <div className="space-y-2">
-          {['Ouro 18k', 'Prata 925', 'Ouro Branco', 'Ouro Rosé'].map((mat) => (
-            <label key={mat} className="flex items-center gap-2 cursor-pointer group">
-              <div className={`w-4 h-4 border rounded flex items-center justify-center transition ${material.includes(mat) ? 'bg-black border-black' : 'border-gray-300 group-hover:border-gray-500'}`}>
-                {material.includes(mat) && <div className="w-2 h-2 bg-white rounded-full" />}
-              </div>
-              <input 
-                type="checkbox" className="hidden"
-                checked={material.includes(mat)}
-                onChange={() => toggleMaterial(mat)}
-              />
-              <span className="text-sm text-gray-600">{mat}</span>
-            </label>
-          ))}
+      {/* Facetas (Material, Aro...) com contagem vinda da API */}
+      {facets.map((facet) => (
+        <div key={facet.attribute}>
+          <h3 className="text-sm font-bold uppercase tracking-widest mb-4">{facet.name}</h3>
+          <div className="space-y-2">
+            {facet.values.map((val) => (
+              <label key={val.id} className={`flex items-center gap-2 cursor-pointer group ${val.count === 0 && !attributes.includes(val.id) ? 'opacity-40' : ''}`}>
+                <div className={`w-4 h-4 border rounded flex items-center justify-center transition ${attributes.includes(val.id) ? 'bg-black border-black' : 'border-gray-300 group-hover:border-gray-500'}`}>
+                  {attributes.includes(val.id) && <div className="w-2 h-2 bg-white rounded-full" />}
+                </div>
+                <input
+                  type="checkbox" className="hidden"
+                  checked={attributes.includes(val.id)}
+                  onChange={() => toggleAttribute(val.id)}
+                />
+                <span className="text-sm text-gray-600">{val.value}</span>
+                <span className="text-xs text-gray-400 ml-auto">({val.count})</span>
+              </label>
+            ))}
+          </div>
         </div>
-      </div>
+      ))}
 
-      <button 
+      <button
         onClick={handleApply}
         className="w-full bg-black text-white py-2 rounded text-sm font-bold hover:bg-gray-800 transition"
       >
@@ -75,4 +93,4 @@ export default function ProductFilters({ onFilterChange }: ProductFiltersProps)
       </button>
     </div>
   );
-}
\ No newline at end of file
+}
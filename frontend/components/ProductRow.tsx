@@ -9,7 +9,7 @@ interface Product {
   slug: string;
   base_price: string;
   promotional_price?: string | null;
-  images: { image: string }[];
+  cover_image: string | null;
 }
 
 interface ProductRowProps {
@@ -40,7 +40,7 @@ export default function ProductRow({ title, products, seeMoreLink }: ProductRowP
       {/* Grid de 5 Produtos (Responsivo: 1 no mobile, 2 no tablet, 5 no desktop) */}
       <div className="grid grid-cols-2 md:grid-cols-3 lg:grid-cols-5 gap-6 px-4 sm:px-0">
         {products.slice(0, 5).map((product) => {
-           const cover = product.images.length > 0 ? product.images[0].image : null;
+           const cover = product.cover_image;
            const hasDiscount = product.promotional_price && parseFloat(product.promotional_price) < parseFloat(product.base_price);
            
            return (
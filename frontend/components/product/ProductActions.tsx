@@ -44,6 +44,11 @@ export default function ProductActions({ attributes, productName, price, product
       return;
     }
 
+    // Ids dos valores escolhidos (ex: Aro 16), para reservar a variação certa no checkout
+    const options = attributes
+      .filter(attr => selectedAttributes[attr.attribute_name] === attr.value)
+      .map(attr => attr.id);
+
     addToCart({
       id: productId,
       name: productName,
@@ -51,6 +56,7 @@ export default function ProductActions({ attributes, productName, price, product
       image: productImage,
       quantity: 1,
       selectedSize: JSON.stringify(selectedAttributes),
+      options,
       engraving: engravingText
     });
   };
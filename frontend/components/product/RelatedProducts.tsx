@@ -5,7 +5,7 @@ interface Product {
   name: string;
   slug: string;
   base_price: string;
-  images: { image: string }[];
+  cover_image: string | null;
 }
 
 export default function RelatedProducts({ products }: { products: Product[] }) {
@@ -18,8 +18,8 @@ export default function RelatedProducts({ products }: { products: Product[] }) {
         {products.map((p) => (
           <Link key={p.id} href={`/produto/${p.slug}`} className="group">
             <div className="aspect-square bg-gray-50 rounded-lg overflow-hidden mb-3 border border-gray-100">
-              {p.images[0] ? (
-                <img src={p.images[0].image} alt={p.name} className="w-full h-full object-cover group-hover:scale-105 transition duration-500" />
+              {p.cover_image ? (
+                <img src={p.cover_image} alt={p.name} className="w-full h-full object-cover group-hover:scale-105 transition duration-500" />
               ) : (
                 <div className="w-full h-full flex items-center justify-center text-gray-300 text-sm">Sem foto</div>
               )}
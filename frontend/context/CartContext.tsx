@@ -11,6 +11,9 @@ export interface CartItem {
   quantity: number;
   // Detalhes extras importantes para joias
   selectedSize?: string;
+  // Ids (AttributeValue) dos atributos escolhidos: o checkout manda como 'options'
+  // para o backend achar a variação de estoque
+  options?: number[];
   engraving?: string;
   base_price?: string | number; // Adicionado para compatibilidade com backend se necessário
 }
@@ -81,13 +81,26 @@ api.interceptors.response.use(
 
 // --- FUNÇÕES DE BUSCA (Mantidas Iguais) ---
 
-export const getProducts = async () => {
+// Listagens de produtos são paginadas por cursor: cada chamada devolve uma página
+// { results, next }. Para a seguinte, passe a URL 'next' devolvida pela anterior.
+export interface Page<T = any> {
+  results: T[];
+  next: string | null;
+}
+
+const EMPTY_PAGE: Page = { results: [], next: null };
+
+export const getProductsPage = async (params: Record<string, string> = {}, nextUrl?: string): Promise<Page> => {
+  const response = nextUrl ? await api.get(nextUrl) : await api.get("/products/", { params });
+  return { results: response.data.results, next: response.data.next };
+};
+
+export const getProducts = async (params: Record<string, string> = {}, nextUrl?: string): Promise<Page> => {
   try {
-    const response = await api.get("/products/");
-    return response.data;
+    return await getProductsPage(params, nextUrl);
   } catch (error) {
     console.error("Erro ao buscar produtos:", error);
-    return [];
+    return EMPTY_PAGE;
   }
 };
 
@@ -111,13 +124,12 @@ export const getHomeCategories = async () => {
   }
 };
 
-export const getProductsByCategory = async (slug: string) => {
+export const getProductsByCategory = async (slug: string, nextUrl?: string): Promise<Page> => {
   try {
-    const response = await api.get(`/products/?category__slug=${slug}`);
-    return response.data;
+    return await getProductsPage({ category_tree: slug }, nextUrl);
   } catch (error) {
     console.error(`Erro ao buscar produtos da categoria ${slug}:`, error);
-    return [];
+    return EMPTY_PAGE;
   }
 };
 
@@ -132,26 +144,25 @@ export const getProductById = async (id: string | number) => {
 };
 
 export const getRelatedProducts = async () => {
-  return getProducts(); 
+  return (await getProducts()).results;
 };
 
-export const getNewArrivals = async () => {
+export const getNewArrivals = async (nextUrl?: string): Promise<Page> => {
   try {
-    const response = await api.get('/products/?ordering=-id');
-    return response.data;
+    return await getProductsPage({ ordering: '-id' }, nextUrl);
   } catch (error) {
     console.error('Erro ao buscar novidades:', error);
-    return [];
+    return EMPTY_PAGE;
   }
 };
 
-export const getOffers = async () => {
+// O filtro é do servidor: todas as páginas trazem só produtos em promoção
+export const getOffers = async (nextUrl?: string): Promise<Page> => {
   try {
-    const response = await api.get('/products/');
-    return response.data.filter((p: any) => p.promotional_price && parseFloat(p.promotional_price) > 0);
+    return await getProductsPage({ promotional_price__gt: '0' }, nextUrl);
   } catch (error) {
     console.error('Erro ao buscar ofertas:', error);
-    return [];
+    return EMPTY_PAGE;
   }
 };
 
@@ -235,12 +246,37 @@ export const deleteAddress = async (id: number) => {
 };
 
 // --- PEDIDOS ---
-export const getOrders = async () => {
+// Lista paginada por cursor: { next, previous, results }.
+// Filtros: status, created_after, created_before, customer, guest_email, search.
+// Para a página seguinte, passe a URL 'next' devolvida pela anterior.
+export const getOrders = async (params: Record<string, string> = {}, nextUrl?: string) => {
   try {
-    const response = await api.get("/orders/");
+    const response = nextUrl ? await api.get(nextUrl) : await api.get("/orders/", { params });
     return response.data;
   } catch (error) {
     console.error("Erro ao buscar pedidos:", error);
     throw error;
   }
+};
+
+// Números do dashboard (consolidado diário calculado no servidor)
+export const getAdminStats = async (days = 30) => {
+  try {
+    const response = await api.get("/admin/stats/", { params: { days } });
+    return response.data;
+  } catch (error) {
+    console.error("Erro ao buscar estatísticas:", error);
+    throw error;
+  }
+};
+
+// Exportação (CSV/JSONL gerado em streaming pelo servidor) com os mesmos filtros da listagem
+export const downloadOrdersExport = async (params: Record<string, string> = {}, exportFormat = "csv") => {
+  const response = await api.get("/orders/export/", { params: { ...params, export_format: exportFormat }, responseType: "blob" });
+  const url = URL.createObjectURL(response.data);
+  const link = document.createElement("a");
+  link.href = url;
+  link.download = `pedidos.${exportFormat}`;
+  link.click();
+  URL.revokeObjectURL(url);
 };
\ No newline at end of file